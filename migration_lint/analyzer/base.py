@@ -20,6 +20,11 @@ IGNORE_LINK = "https://pandadoc.github.io/migration-lint/rules/#ignoring-stateme
 class BaseLinter:
     """Base class for migration linters."""
 
+    def prepare(self, migrations_sql: Sequence[str]) -> None:
+        """Prepare for linting the given migrations (e.g. precompute
+        something for all of them at once).
+        """
+
     @abc.abstractmethod
     def lint(
         self,
@@ -58,6 +63,15 @@ class Analyzer:
 
         logger.info("")
 
+        for linter in self.linters:
+            linter.prepare(
+                [
+                    migration.raw_sql
+                    for migration in metadata.migrations
+                    if MANUALLY_IGNORE_ANNOTATION not in migration.raw_sql
+                ]
+            )
+
         errors = []
         for migration in metadata.migrations:
             logger.info(green(f"Analyzing migration: {migration.path}\n"))
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 from io import StringIO
-from typing import List
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 from migration_lint import logger
 from migration_lint.analyzer.base import BaseLinter
 from migration_lint.extractor.model import ExtendedSourceDiff
+from migration_lint.sql.cache import ClassificationCache
 from migration_lint.sql.constants import StatementType
-from migration_lint.sql.parser import classify_migration
+from migration_lint.sql.parser import (
+    ClassifierSession,
+    classify_migrations,
+    iter_classify_migration,
+)
 from migration_lint.util.colors import blue
 
 
@@ -22,6 +27,34 @@ class CompatibilityLinter(BaseLinter):
     See {DOCS_URL} for details.
     """
 
+    def __init__(
+        self,
+        cache: Optional[ClassificationCache] = None,
+        session: Optional[ClassifierSession] = None,
+        jobs: int = 1,
+    ) -> None:
+        self.cache = cache
+        self.session = session
+        self.jobs = jobs
+        self.classified: Dict[
+            str, Union[Sequence[Tuple[str, StatementType]], Exception]
+        ] = {}
+
+    def prepare(self, migrations_sql: Sequence[str]) -> None:
+        """Classify migrations in parallel if there are several jobs."""
+
+        if self.jobs <= 1:
+            return
+
+        results = classify_migrations(
+            migrations_sql,
+            cache=self.cache,
+            session=self.session,
+            jobs=self.jobs,
+            return_exceptions=True,
+        )
+        self.classified = dict(zip(migrations_sql, results))
+
     def lint(
         self,
         migration_sql: str,
@@ -32,14 +65,30 @@ class CompatibilityLinter(BaseLinter):
 
         errors = []
 
-        classification_result = classify_migration(migration_sql)
+        classification_result: Iterable[Tuple[str, StatementType]]
+        precomputed = self.classified.pop(migration_sql, None)
+        if precomputed is None:
+            classification_result = iter_classify_migration(
+                migration_sql, cache=self.cache, session=self.session
+            )
+        elif isinstance(precomputed, Exception):
+            raise precomputed
+        else:
+            classification_result = precomputed
 
         statement_types = set()
+        data_migration_sql = None
         logger.info(blue("Migration contains statements:\n"))
         for statement_sql, statement_type in classification_result:
             statement_types.add(statement_type)
             logger.info(f"- {statement_type.colorized}: {statement_sql}")
 
+            if (
+                statement_type == StatementType.DATA_MIGRATION
+                and data_migration_sql is None
+            ):
+                data_migration_sql = statement_sql
+
             if statement_type == StatementType.UNSUPPORTED:
                 errors.append(f"- Statement can't be identified: {statement_sql}")
 
@@ -86,14 +135,9 @@ class CompatibilityLinter(BaseLinter):
             StatementType.BACKWARD_COMPATIBLE in statement_types
             or StatementType.BACKWARD_INCOMPATIBLE in statement_types
         ):
-            statement_sql = [
-                r[0]
-                for r in classification_result
-                if r[1] == StatementType.DATA_MIGRATION
-            ][0]
             errors.append(
                 (
-                    f"- Seems like you have data migration along with schema migration: {statement_sql}"
+                    f"- Seems like you have data migration along with schema migration: {data_migration_sql}"
                     "\n\n\tPlease, separate changes in different merge requests.\n"
                 )
             )
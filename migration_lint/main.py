@@ -6,6 +6,15 @@ from migration_lint import logger
 from migration_lint.analyzer import Analyzer, CompatibilityLinter, SquawkLinter
 from migration_lint.extractor import Extractor, DjangoExtractor
 from migration_lint.source_loader import SourceLoader, LocalLoader
+from migration_lint.sql.backend import (
+    ParserBackend,
+    ParserBackendUnavailable,
+    SqlfluffBackend,
+)
+from migration_lint.sql.budget import DEFAULT_PARSE_MAX_DEPTH, DEFAULT_PARSE_TIMEOUT
+from migration_lint.sql.cache import ClassificationCache, DEFAULT_MAX_SIZE
+from migration_lint.sql.parser import ClassifierSession
+from migration_lint.sql.stats import RULE_STATS_FILE
 from migration_lint.util.env import get_bool_env
 
 
@@ -90,29 +99,137 @@ from migration_lint.util.env import get_bool_env
     help="Don't fail the whole linter if extraction went fine, but info about particular migration couldn't be found",
     default=os.getenv("MIGRATION_LINTER_IGNORE_EXTRACTOR_NOT_FOUND", False),
 )
+# Classification cache
+@click.option(
+    "--cache-dir",
+    "cache_dir",
+    help="directory to cache migrations classification results in between runs",
+    default=os.getenv("MIGRATION_LINTER_CACHE_DIR"),
+)
+@click.option(
+    "--cache-max-size",
+    "cache_max_size",
+    help="classification cache size limit in bytes",
+    type=int,
+    default=os.getenv("MIGRATION_LINTER_CACHE_MAX_SIZE", DEFAULT_MAX_SIZE),
+)
+@click.option(
+    "--jobs",
+    "jobs",
+    help="number of processes to classify migrations in parallel",
+    type=int,
+    default=os.getenv("MIGRATION_LINTER_JOBS", 1),
+)
+@click.option(
+    "--scan-function-bodies",
+    "scan_function_bodies",
+    is_flag=True,
+    help="report dangerous DDL statements found in function and DO bodies",
+    default=get_bool_env("MIGRATION_LINTER_SCAN_FUNCTION_BODIES", False),
+)
+@click.option(
+    "--parser-backend",
+    "parser_backend",
+    help="SQL parser backend (pglast requires `pglast` extra)",
+    type=click.Choice(ParserBackend.names(), case_sensitive=False),
+    default=os.getenv("MIGRATION_LINTER_PARSER_BACKEND", SqlfluffBackend.NAME),
+)
+@click.option(
+    "--parse-timeout",
+    "parse_timeout",
+    help="time limit for parsing a single statement in seconds (0 for no limit)",
+    type=float,
+    default=os.getenv("MIGRATION_LINTER_PARSE_TIMEOUT", DEFAULT_PARSE_TIMEOUT),
+)
+@click.option(
+    "--parse-max-depth",
+    "parse_max_depth",
+    help="parser recursion depth limit for a single statement (0 for no limit)",
+    type=int,
+    default=os.getenv("MIGRATION_LINTER_PARSE_MAX_DEPTH", DEFAULT_PARSE_MAX_DEPTH),
+)
+@click.option(
+    "--cache-stats",
+    "cache_stats",
+    is_flag=True,
+    help="report hits and misses of in-memory classification caches",
+    default=get_bool_env("MIGRATION_LINTER_CACHE_STATS", False),
+)
+@click.option(
+    "--check-rule-order",
+    "check_rule_order",
+    is_flag=True,
+    help="check that ordering the rules by their hits doesn't change results",
+    default=get_bool_env("MIGRATION_LINTER_CHECK_RULE_ORDER", False),
+)
 def main(
     loader_type: str,
     extractor_type: str,
     squawk_config_path: str,
     squawk_pg_version: str,
+    cache_dir: str,
+    cache_max_size: int,
+    jobs: int,
+    scan_function_bodies: bool,
+    parser_backend: str,
+    parse_timeout: float,
+    parse_max_depth: int,
+    cache_stats: bool,
+    check_rule_order: bool,
     **kwargs,
 ) -> None:
     logger.info("Start analysis..")
 
     loader = SourceLoader.get(loader_type)(**kwargs)
     extractor = Extractor.get(extractor_type)(**kwargs)
+    # Classifications depend on these settings, so they're cached separately.
+    namespace = []
+    if scan_function_bodies:
+        namespace.append("scan_bodies")
+    if parser_backend != SqlfluffBackend.NAME:
+        namespace.append(parser_backend)
+    # NOTE: cached classifications would skip the rules order check.
+    cache = (
+        ClassificationCache(
+            cache_dir,
+            max_size=cache_max_size,
+            namespace=",".join(namespace),
+        )
+        if cache_dir and not check_rule_order
+        else None
+    )
+    try:
+        session = ClassifierSession(
+            jobs=jobs,
+            scan_bodies=scan_function_bodies,
+            backend=parser_backend,
+            parse_timeout=parse_timeout or None,
+            parse_max_depth=parse_max_depth or None,
+            rule_stats_path=(
+                os.path.join(cache_dir, RULE_STATS_FILE) if cache_dir else None
+            ),
+            check_rule_order=check_rule_order,
+        )
+    except ParserBackendUnavailable as e:
+        raise click.BadParameter(str(e), param_hint="'--parser-backend'") from e
     analyzer = Analyzer(
         loader=loader,
         extractor=extractor,
         linters=[
-            CompatibilityLinter(),
+            CompatibilityLinter(cache=cache, session=session, jobs=jobs),
             SquawkLinter(
                 config_path=squawk_config_path,
                 pg_version=squawk_pg_version,
             ),
         ],
     )
-    analyzer.analyze()
+    try:
+        analyzer.analyze()
+    finally:
+        session.save_rule_stats()
+        if cache_stats:
+            for name, (hits, misses) in session.cache_stats().items():
+                logger.info(f"Cache of {name}: {hits} hits, {misses} misses.")
 
 
 if __name__ == "__main__":
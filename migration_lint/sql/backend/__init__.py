@@ -0,0 +1,15 @@
+from migration_lint.sql.backend.base import (
+    BaseParserBackend,
+    ParserBackend,
+    ParserBackendUnavailable,
+)
+from migration_lint.sql.backend.pg_query import PgQueryBackend
+from migration_lint.sql.backend.sqlfluff import SqlfluffBackend
+
+__all__ = (
+    "BaseParserBackend",
+    "ParserBackend",
+    "ParserBackendUnavailable",
+    "PgQueryBackend",
+    "SqlfluffBackend",
+)
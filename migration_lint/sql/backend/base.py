@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import abc
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, cast
+
+from sqlfluff.core.parser import BaseSegment
+
+if TYPE_CHECKING:
+    from migration_lint.sql.parser import ClassifierSession
+
+
+class ParserBackendUnavailable(ImportError):
+    """Optional dependencies of a parser backend aren't installed."""
+
+
+class ParserBackend(type):
+    """Metaclass for parser backends.
+
+    This metaclass register all its instances in the registry.
+    """
+
+    backends: Dict[str, ParserBackend] = {}
+
+    def __new__(
+        mcls,
+        name: str,
+        bases: tuple[ParserBackend, ...],
+        classdict: Dict[str, Any],
+    ) -> ParserBackend:
+        cls = cast(ParserBackend, type.__new__(mcls, name, bases, classdict))
+
+        if len(bases) > 0:
+            # Not the base class.
+            if not hasattr(cls, "NAME"):
+                raise NotImplementedError(
+                    f"parser backend {cls.__name__} doesn't provide name",
+                )
+
+            mcls.backends[cls.NAME] = cls
+
+        return cls
+
+    @classmethod
+    def names(mcls) -> Sequence[str]:
+        """Get the names of all registered parser backends."""
+
+        return list(mcls.backends.keys())
+
+    @classmethod
+    def get(mcls, name: str) -> ParserBackend:
+        """Get a registered parser backend by its name."""
+
+        return mcls.backends[name]
+
+
+class BaseParserBackend(metaclass=ParserBackend):
+    """Base class for parser backends.
+
+    Backends parse single statements into trees of sqlfluff segments or
+    objects with the same interface, which are used by the classification
+    rules (`recursive_crawl`, `raw`, `raw_normalized`, `pos_marker` and
+    `get_type`).
+    """
+
+    def __init__(self, session: ClassifierSession) -> None:
+        self.session = session
+
+    @abc.abstractmethod
+    def parse_statement(self, raw_sql: str) -> Optional[List[BaseSegment]]:
+        """Parse a single SQL statement.
+
+        Returns `None` if the statement isn't supported by the backend, so it
+        should be parsed by the fallback one. Raises `RuntimeError` if the
+        statement can't be parsed.
+        """
+
+        raise NotImplementedError()
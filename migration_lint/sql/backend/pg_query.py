@@ -0,0 +1,449 @@
+from __future__ import annotations
+
+import bisect
+import json
+import re
+import sys
+from collections import Counter
+from typing import (
+    TYPE_CHECKING,
+    AbstractSet,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from sqlfluff.core.parser import BaseSegment
+
+from migration_lint.sql.backend.base import BaseParserBackend, ParserBackendUnavailable
+from migration_lint.sql.fast_path import NEWLINES_RE, code_span
+from migration_lint.sql.ir import SegmentIR, StatementIR
+
+if TYPE_CHECKING:
+    from migration_lint.sql.parser import ClassifierSession
+
+# Possibly qualified and quoted name, e.g. `public."Table"`.
+QUALIFIED_NAME_RE = re.compile(
+    r"""
+    (?:"(?:[^"]|"")*"|[^\W\d][\w$]*)
+    (?:\s*\.\s*(?:"(?:[^"]|"")*"|[^\W\d][\w$]*))*
+    """,
+    re.VERBOSE,
+)
+
+# A part of a qualified name, quoted or not.
+NAME_PART_RE = re.compile(r'"((?:[^"]|"")*)"|[^\W\d][\w$]*')
+
+# sqlfluff types of statements by the types of libpg_query objects.
+DROP_STATEMENTS = {
+    "OBJECT_TABLE": "drop_table_statement",
+    "OBJECT_SEQUENCE": "drop_sequence_statement",
+    "OBJECT_TYPE": "drop_type_statement",
+    "OBJECT_INDEX": "drop_index_statement",
+    "OBJECT_FUNCTION": "drop_function_statement",
+    "OBJECT_TRIGGER": "drop_trigger",
+}
+
+SIMPLE_STATEMENTS = {
+    "TruncateStmt": "truncate_table",
+    "IndexStmt": "create_index_statement",
+    "ReindexStmt": "reindex_statement_segment",
+    "CreateSeqStmt": "create_sequence_statement",
+    "AlterSeqStmt": "alter_sequence_statement",
+    "CreateStmt": "create_table_statement",
+    "CreateStatsStmt": "create_statistics_statement",
+    "CompositeTypeStmt": "create_type_statement",
+    "CreateEnumStmt": "create_type_statement",
+    "CreateRangeStmt": "create_type_statement",
+    "AlterEnumStmt": "alter_type_statement",
+    "CreateTrigStmt": "create_trigger",
+}
+
+DML_STATEMENTS = {
+    "InsertStmt": "insert_statement",
+    "UpdateStmt": "update_statement",
+    "DeleteStmt": "delete_statement",
+}
+
+TRANSACTION_KINDS = {
+    "TRANS_STMT_BEGIN",
+    "TRANS_STMT_START",
+    "TRANS_STMT_COMMIT",
+    "TRANS_STMT_ROLLBACK",
+}
+
+SET_KINDS = {"VAR_SET_VALUE", "VAR_SET_DEFAULT", "VAR_SET_CURRENT"}
+
+RESET_KINDS = {"VAR_RESET", "VAR_RESET_ALL"}
+
+# Objects with names, which don't have a location in the parse tree.
+NAMED_OBJECTS = {
+    "AlterTableCmd": ("name",),
+    "Constraint": ("conname",),
+    "IndexStmt": ("idxname",),
+    "IndexElem": ("name",),
+    "RenameStmt": ("subname", "newname"),
+}
+
+# Tokens the names of `NAMED_OBJECTS` follow in the statement, e.g.
+# `CONSTRAINT c_name`, `RENAME c_name TO c_new` or `ON t_name (c_name, ...)`.
+NAME_PREFIXES = {
+    "ALTER",
+    "COLUMN",
+    "CONCURRENTLY",
+    "CONSTRAINT",
+    "DROP",
+    "EXISTS",
+    "FUNCTION",
+    "INDEX",
+    "LOCAL",
+    "PROCEDURE",
+    "RENAME",
+    "RESET",
+    "SESSION",
+    "SET",
+    "TO",
+    "(",
+    ",",
+    ".",
+}
+
+# NOTE: sqlfluff lower-cases naked identifiers in the normalized text, except
+# the ones in a few positions, e.g. the names of data types and functions
+# (but not their qualifiers), constraints referenced by `ALTER TABLE` and
+# parameters of `SET`. Words, which aren't keywords, are identifiers, so all
+# of them are lower-cased, except the ones in these positions.
+
+# Subtypes of `AlterTableCmd` referencing constraints by their names.
+CONSTRAINT_COMMANDS = {"AT_DropConstraint", "AT_ValidateConstraint"}
+
+
+class PgQueryBackend(BaseParserBackend):
+    """A parser backend based on PostgreSQL's own parser (libpg_query via
+    pglast, see `pglast` extra).
+
+    libpg_query parse tree is mapped to a flat compact statement representation
+    (see `migration_lint.sql.ir`): the statement of the same sqlfluff type with
+    keywords, table references, data types and nested select statements,
+    which is enough for the rules.
+    Statements, which aren't mapped, are left to the fallback backend.
+    """
+
+    NAME = "pglast"
+
+    def __init__(self, session: ClassifierSession) -> None:
+        super().__init__(session)
+        try:
+            from pglast import parser
+        except ImportError as e:
+            raise ParserBackendUnavailable(
+                f"{self.NAME} parser backend requires `pglast` extra, install it "
+                'with `pip install "migration-lint[pglast]"`'
+            ) from e
+        self.parser = parser
+        dialect = session.config.get("dialect_obj")
+        self.reserved_keywords = dialect.sets("reserved_keywords")
+        self.keywords = dialect.sets("unreserved_keywords") | self.reserved_keywords
+
+    def parse_statement(self, raw_sql: str) -> Optional[List[BaseSegment]]:
+        """Parse a single SQL statement."""
+
+        sql = NEWLINES_RE.sub("\n", raw_sql.strip())
+        try:
+            parse_tree = json.loads(self.parser.parse_sql_json(sql))
+        except self.parser.ParseError:
+            # Let the fallback backend report the error.
+            return None
+
+        tokens, errors = self.session.lexer.lex(sql)
+        if errors:
+            return None
+
+        statement = build_statement(
+            sql, parse_tree, tokens, self.keywords, self.reserved_keywords
+        )
+        if statement is None:
+            return None
+
+        return [cast(BaseSegment, statement)]
+
+
+def build_statement(
+    sql: str,
+    parse_tree: Dict[str, Any],
+    tokens: Sequence[BaseSegment],
+    keywords: AbstractSet[str],
+    reserved_keywords: AbstractSet[str],
+) -> Optional[StatementIR]:
+    """Build a statement segment from libpg_query parse tree (in JSON format)
+    and sqlfluff lexer tokens of the statement (`keywords` include
+    `reserved_keywords`).
+    """
+
+    statements = parse_tree.get("stmts", [])
+    if len(statements) != 1:
+        return None
+
+    ((node_name, node),) = statements[0]["stmt"].items()
+    root_type = get_root_type(node_name, node)
+    if root_type is None:
+        return None
+
+    values_select = None
+    if node_name == "InsertStmt":
+        values_select = node.get("selectStmt", {}).get("SelectStmt")
+        if values_select is not None and "valuesLists" not in values_select:
+            values_select = None
+
+    segments = []
+    identifier_spans: List[Tuple[int, int]] = []
+    # Spans of the identifiers, which aren't lower-cased in the normalized text.
+    kept_spans: List[Tuple[int, int]] = []
+    names: Counter[str] = Counter()
+    kept_names: Counter[str] = Counter()
+    has_select = False
+    for key, obj in walk(node, node_name):
+        location = obj.get("location", -1)
+        if "relname" in obj:
+            # RangeVar.
+            match = QUALIFIED_NAME_RE.match(sql, location) if location > 0 else None
+            if match is not None:
+                raw = match.group()
+                normalized = normalize_name(raw)
+                segments.append(
+                    SegmentIR(
+                        "table_reference",
+                        raw,
+                        location,
+                        normalized=None if normalized == raw else normalized,
+                    )
+                )
+                identifier_spans.append(match.span())
+        elif "names" in obj and "typemod" in obj:
+            # TypeName.
+            match = QUALIFIED_NAME_RE.match(sql, location) if location > 0 else None
+            if match is not None:
+                raw = match.group()
+                if obj.get("typmods"):
+                    raw += "(...)"
+                if obj.get("arrayBounds"):
+                    raw += "[]"
+                segments.append(SegmentIR("data_type", raw, location))
+                qualifiers_span, name_span = split_name(match)
+                identifier_spans.append(qualifiers_span)
+                kept_spans.append(name_span)
+        elif key == "FuncCall" and location > 0:
+            match = QUALIFIED_NAME_RE.match(sql, location)
+            if match is not None:
+                qualifiers_span, name_span = split_name(match)
+                identifier_spans.append(qualifiers_span)
+                kept_spans.append(name_span)
+        elif key in ("ColumnDef", "ColumnRef", "ResTarget") and location > 0:
+            match = QUALIFIED_NAME_RE.match(sql, location)
+            if match is not None:
+                identifier_spans.append(match.span())
+        elif key in ("DefElem", "FunctionParameter") and location > 0:
+            # Names of options and parameters.
+            match = QUALIFIED_NAME_RE.match(sql, location)
+            if match is not None:
+                kept_spans.append(match.span())
+        elif key == "A_Const" and node_name == "VariableSetStmt" and location > 0:
+            # Values of `SET`, reserved keywords (e.g. `ON`) stay keywords.
+            match = QUALIFIED_NAME_RE.match(sql, location)
+            if match is not None and match.group().upper() not in reserved_keywords:
+                identifier_spans.append(match.span())
+        elif key == "SelectStmt" and obj is not node and obj is not values_select:
+            has_select = True
+
+        for name_key in NAMED_OBJECTS.get(key or "", ()):
+            if isinstance(obj.get(name_key), str):
+                if (
+                    key == "AlterTableCmd" and obj.get("subtype") in CONSTRAINT_COMMANDS
+                ) or (
+                    key == "RenameStmt"
+                    and obj.get("renameType") == "OBJECT_TABCONSTRAINT"
+                ):
+                    kept_names[obj[name_key]] += 1
+                else:
+                    names[obj[name_key]] += 1
+
+    if node_name in ("CreateFunctionStmt", "CreateTrigStmt") and node.get("funcname"):
+        kept_names[node["funcname"][-1].get("String", {}).get("sval", "")] += 1
+    elif node_name == "VariableSetStmt" and isinstance(node.get("name"), str):
+        kept_names[node["name"]] += 1
+
+    if has_select:
+        segments.append(SegmentIR("select_statement", "", 0))
+
+    identifier_spans.extend(name_spans(tokens, names))
+    kept_name_spans = list(name_spans(tokens, kept_names))
+    identifier_spans.extend(kept_name_spans)
+    identifier_spans.sort()
+    kept_spans.extend(kept_name_spans)
+    kept_spans.sort()
+    lowered = set()
+    offset = 0
+    for token in tokens:
+        if token.is_type("word"):
+            if token.raw.upper() in keywords and not in_spans(offset, identifier_spans):
+                segments.append(SegmentIR("keyword", token.raw, offset))
+            elif not in_spans(offset, kept_spans):
+                lowered.add(id(token))
+        offset += len(token.raw)
+
+    segments.sort(key=lambda segment: segment.pos_marker)
+
+    text = "".join(
+        token.raw.lower() if id(token) in lowered else token.raw_normalized()
+        for token in code_span(tokens)
+    )
+    return StatementIR(
+        "statement",
+        sql,
+        0,
+        [SegmentIR(root_type, sql, 0, segments, normalized=text)],
+        normalized=text,
+    )
+
+
+def get_root_type(node_name: str, node: Dict[str, Any]) -> Optional[str]:
+    """Get sqlfluff type of the statement by libpg_query parse tree, or `None`
+    if the statement isn't mapped.
+    """
+
+    if node_name in SIMPLE_STATEMENTS:
+        return SIMPLE_STATEMENTS[node_name]
+
+    if node_name in DML_STATEMENTS:
+        return None if "withClause" in node else DML_STATEMENTS[node_name]
+
+    if node_name == "SelectStmt":
+        if (
+            "withClause" in node
+            or "intoClause" in node
+            or node.get("op", "SETOP_NONE") != "SETOP_NONE"
+        ):
+            return None
+        return "select_statement"
+
+    if node_name == "AlterTableStmt":
+        object_type = node.get("objtype", node.get("relkind"))
+        if object_type == "OBJECT_TABLE":
+            return "alter_table_statement"
+        if object_type == "OBJECT_INDEX":
+            return "alter_index_statement"
+        return None
+
+    if node_name == "RenameStmt":
+        rename_type = node.get("renameType")
+        if rename_type == "OBJECT_TABLE" or (
+            rename_type in ("OBJECT_COLUMN", "OBJECT_TABCONSTRAINT")
+            and node.get("relationType") == "OBJECT_TABLE"
+        ):
+            return "alter_table_statement"
+        if rename_type == "OBJECT_INDEX":
+            return "alter_index_statement"
+        return None
+
+    if node_name == "DropStmt":
+        return DROP_STATEMENTS.get(node.get("removeType", ""))
+
+    if node_name == "CreateFunctionStmt":
+        return None if node.get("is_procedure") else "create_function_statement"
+
+    if node_name == "VacuumStmt":
+        return None if node.get("is_vacuumcmd") else "analyze_statement"
+
+    if node_name == "VariableSetStmt":
+        kind = node.get("kind", "VAR_SET_VALUE")
+        if kind in SET_KINDS:
+            return "set_statement"
+        if kind in RESET_KINDS:
+            return "reset_statement"
+        return None
+
+    if node_name == "TransactionStmt":
+        if node.get("kind", "TRANS_STMT_BEGIN") in TRANSACTION_KINDS:
+            return "transaction_statement"
+        return None
+
+    return None
+
+
+def walk(
+    value: Any,
+    key: Optional[str] = None,
+) -> Iterator[Tuple[Optional[str], Dict[str, Any]]]:
+    """Iterate objects of libpg_query parse tree (in JSON format) with the
+    keys they are stored by (node names for nodes of any type).
+    """
+
+    if isinstance(value, dict):
+        yield key, value
+        for child_key, child in value.items():
+            yield from walk(child, child_key)
+    elif isinstance(value, list):
+        for item in value:
+            yield from walk(item, key)
+
+
+def name_spans(
+    tokens: Sequence[BaseSegment],
+    names: Counter[str],
+) -> Iterator[Tuple[int, int]]:
+    """Find spans of the names (with their counts), which don't have
+    a location in the parse tree: each one is the first unquoted word equal to
+    the name, which follows one of `NAME_PREFIXES`.
+    """
+
+    names = names.copy()
+    previous = None
+    offset = 0
+    for token in tokens:
+        if (
+            token.is_type("word")
+            and names[token.raw.lower()] > 0
+            and previous in NAME_PREFIXES
+        ):
+            names[token.raw.lower()] -= 1
+            yield offset, offset + len(token.raw)
+        if token.is_code:
+            previous = token.raw.upper()
+        offset += len(token.raw)
+
+
+def in_spans(offset: int, spans: List[Tuple[int, int]]) -> bool:
+    """Check if the offset is inside one of the sorted spans."""
+
+    i = bisect.bisect_right(spans, (offset, sys.maxsize))
+    return i > 0 and spans[i - 1][0] <= offset < spans[i - 1][1]
+
+
+def split_name(match: re.Match) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """Split spans of a qualified name into the ones of its qualifiers and its
+    last part.
+    """
+
+    *_, last_part = NAME_PART_RE.finditer(match.string, match.start(), match.end())
+    return (match.start(), last_part.start()), last_part.span()
+
+
+def normalize_name(raw: str) -> str:
+    """Normalize a qualified name the same way as sqlfluff: unquote quoted
+    parts and lower-case the rest.
+    """
+
+    return NAME_PART_RE.sub(normalize_name_part, raw)
+
+
+def normalize_name_part(match: re.Match) -> str:
+    """Normalize a part of a qualified name."""
+
+    if match.group(1) is not None:
+        return match.group(1).replace('""', '"')
+    return match.group().lower()
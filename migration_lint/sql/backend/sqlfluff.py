@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from sqlfluff.core.parser import BaseSegment
+
+from migration_lint.sql.backend.base import BaseParserBackend
+
+
+class SqlfluffBackend(BaseParserBackend):
+    """A parser backend based on sqlfluff postgres grammar.
+
+    It supports all the statements the rules are written for, so it's used as
+    a fallback for other backends.
+    """
+
+    NAME = "sqlfluff"
+
+    def parse_statement(self, raw_sql: str) -> Optional[List[BaseSegment]]:
+        """Parse a single SQL statement."""
+
+        return list(self.session.parse(raw_sql.strip()).recursive_crawl("statement"))
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import re
+from typing import List
+
+from migration_lint.sql.splitter import (
+    COMMENT_RE,
+    TOKEN_RE,
+    skip_block_comment,
+    split_statements,
+)
+
+# NOTE: dollar-quoted function and DO bodies are lexed by sqlfluff as a single
+# literal, so they are never parsed deeply, and the rules classify such
+# statements by their root type only. Bodies are only looked into by the
+# optional shallow scan below.
+
+# Statements with bodies, which are scanned.
+BODY_STATEMENT_RE = re.compile(
+    r"^\s*(?:CREATE\s+(?:OR\s+REPLACE\s+)?(?:FUNCTION|PROCEDURE)|DO)\b",
+    re.IGNORECASE,
+)
+
+# Start of a DDL statement inside of a body.
+BODY_DDL_RE = re.compile(
+    r"\b(?:ALTER|CREATE|DROP|TRUNCATE)\s+(?=[A-Za-z])",
+    re.IGNORECASE,
+)
+
+
+# String literals, which are masked when looking for DDL statements.
+STRING_RE = re.compile(r"[Ee]'(?:[^'\\]|\\.|'')*'?|'(?:[^']|'')*'?", re.DOTALL)
+
+
+def has_body(raw_sql: str) -> bool:
+    """Check if the statement is a function, procedure or DO statement."""
+
+    return BODY_STATEMENT_RE.match(COMMENT_RE.sub("", raw_sql)) is not None
+
+
+def dollar_quoted_bodies(raw_sql: str) -> List[str]:
+    """Get contents of top-level dollar-quoted strings."""
+
+    bodies = []
+    pos = 0
+    while True:
+        match = TOKEN_RE.search(raw_sql, pos)
+        if match is None:
+            break
+
+        token = match.group()
+        if token == "/*":
+            pos = skip_block_comment(raw_sql, match.end())
+        elif token.startswith("$"):
+            end = raw_sql.find(token, match.end())
+            if end == -1:
+                break
+            bodies.append(raw_sql[match.end() : end])
+            pos = end + len(token)
+        else:
+            pos = match.end()
+
+    return bodies
+
+
+def body_ddl_statements(raw_sql: str) -> List[str]:
+    """Get DDL statements from the bodies of a function, procedure or DO
+    statement.
+
+    This is a shallow lexical scan: procedural code before a DDL statement
+    (e.g. `BEGIN`, `IF ... THEN`) is skipped, dynamic SQL isn't recognized.
+    """
+
+    if not has_body(raw_sql):
+        return []
+
+    statements = []
+    for body in dollar_quoted_bodies(raw_sql):
+        for chunk in split_statements(body):
+            chunk = COMMENT_RE.sub(" ", chunk)
+            match = BODY_DDL_RE.search(STRING_RE.sub(mask, chunk))
+            if match is not None:
+                statements.append(chunk[match.start() :])
+
+    return statements
+
+
+def mask(match: re.Match) -> str:
+    """Replace the match by spaces, keeping positions."""
+
+    return " " * len(match.group())
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import contextlib
+import signal
+import sys
+import threading
+from typing import Any, Iterator, Optional, Set
+
+from migration_lint import logger
+
+# Default wall-clock time limit for parsing a single statement (in seconds).
+DEFAULT_PARSE_TIMEOUT = 10.0
+
+# Default limit of the parser recursion depth (in Python frames).
+DEFAULT_PARSE_MAX_DEPTH = 1000
+
+# Reason reported for statements exceeding the budget.
+BUDGET_EXCEEDED = "parse budget exceeded"
+
+# Warnings about the limits not applied, they're logged once per process.
+_warnings: Set[str] = set()
+
+
+class ParseBudgetExceeded(RuntimeError):
+    """Parsing of a statement exceeded its time or recursion budget."""
+
+
+@contextlib.contextmanager
+def parse_budget(
+    timeout: Optional[float],
+    max_depth: Optional[int],
+) -> Iterator[None]:
+    """Limit wall-clock time and recursion depth of the code inside, raising
+    `ParseBudgetExceeded` when any of the limits is exceeded.
+
+    The limits are enforced with an interval timer (SIGALRM) and the
+    interpreter recursion limit, so they only apply in the main thread, and
+    the time limit isn't applied if the platform doesn't support it or an
+    interval timer is already set. Limits not applied are logged once.
+    """
+
+    if threading.current_thread() is not threading.main_thread():
+        if timeout is not None or max_depth is not None:
+            _warn_once("Parse budget isn't applied outside of the main thread.")
+        yield
+        return
+
+    use_timer = False
+    previous_handler: Any = None
+    if timeout is not None:
+        if not hasattr(signal, "setitimer"):
+            _warn_once("Parse time limit isn't applied: no interval timers.")
+        elif signal.getitimer(signal.ITIMER_REAL) != (0.0, 0.0):
+            _warn_once("Parse time limit isn't applied: interval timer is set.")
+        else:
+            use_timer = True
+            previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    previous_limit = sys.getrecursionlimit()
+    if max_depth is not None:
+        sys.setrecursionlimit(stack_depth() + max_depth)
+
+    try:
+        yield
+    except RecursionError as e:
+        raise ParseBudgetExceeded("recursion limit exceeded") from e
+    finally:
+        if use_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        sys.setrecursionlimit(previous_limit)
+
+
+def stack_depth() -> int:
+    """Get the current depth of the Python stack."""
+
+    depth = 0
+    frame = sys._getframe()
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back  # type: ignore[assignment]
+    return depth
+
+
+def _warn_once(message: str) -> None:
+    if message not in _warnings:
+        _warnings.add(message)
+        logger.warning(message)
+
+
+def _raise_timeout(signum: int, frame: Any) -> None:
+    raise ParseBudgetExceeded("time limit exceeded")
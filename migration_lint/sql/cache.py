@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from importlib import metadata
+from typing import Generic, Hashable, List, Optional, Sequence, Tuple, TypeVar
+
+import sqlfluff
+
+from migration_lint import logger
+from migration_lint.sql.constants import StatementType
+from migration_lint.sql.rules import (
+    BACKWARD_INCOMPATIBLE_OPERATIONS,
+    BACKWARD_COMPATIBLE_OPERATIONS,
+    DATA_MIGRATION_OPERATIONS,
+    RESTRICTED_OPERATIONS,
+    IGNORED_OPERATIONS,
+)
+
+# Bump this version when the classification logic changes in a way that
+# isn't reflected by the rules themselves.
+CACHE_VERSION = 2
+
+# Default cache size limit (in bytes).
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+ENTRY_SUFFIX = ".json"
+
+T = TypeVar("T")
+
+
+def package_version() -> str:
+    """Get the installed migration-lint version (empty if it's not installed,
+    e.g. when running from the source tree).
+    """
+
+    try:
+        return metadata.version("migration-lint")
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+def rules_digest() -> str:
+    """Get a digest of the classification rules."""
+
+    rules = (
+        IGNORED_OPERATIONS,
+        DATA_MIGRATION_OPERATIONS,
+        BACKWARD_COMPATIBLE_OPERATIONS,
+        BACKWARD_INCOMPATIBLE_OPERATIONS,
+        RESTRICTED_OPERATIONS,
+    )
+    return hashlib.sha256(repr(rules).encode()).hexdigest()
+
+
+def write_atomically(path: str, data: bytes) -> None:
+    """Write a file via a temporary one in the same directory, so readers
+    never see it partially written. The temporary file is removed if writing
+    fails.
+    """
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ClassificationCache:
+    """Content-addressed on-disk cache of migrations classification results.
+
+    Entries are keyed by the migration SQL, the migration-lint and sqlfluff
+    versions and the classification rules, so any change of them invalidates
+    the entry.
+    Results of differently configured sessions (e.g. with function bodies
+    scanning) must be kept in different `namespace`s. The
+    total size of the cache is limited by `max_size` bytes, the least recently
+    used entries are evicted first. The size is tracked in memory between
+    evictions, so the cache directory is only scanned once the limit may be
+    exceeded.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = DEFAULT_MAX_SIZE,
+        namespace: str = "",
+    ) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.salt = (
+            f"{CACHE_VERSION}:{package_version()}:{sqlfluff.__version__}"
+            f":{rules_digest()}:{namespace}"
+        )
+        # Estimated total size of the entries (`None` until the first scan).
+        self.size: Optional[int] = None
+
+    def key(self, raw_sql: str) -> str:
+        """Get the cache key for the given migration SQL."""
+
+        return hashlib.sha256(f"{self.salt}:{raw_sql}".encode()).hexdigest()
+
+    def get(self, raw_sql: str) -> Optional[List[Tuple[str, StatementType]]]:
+        """Get cached classification result for the given migration SQL."""
+
+        entry_path = self._entry_path(self.key(raw_sql))
+        try:
+            with open(entry_path, encoding="utf-8") as f:
+                entry = json.load(f)
+            result = [
+                (statement, StatementType(statement_type))
+                for statement, statement_type in entry
+            ]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError):
+            logger.debug(f"Dropping broken cache entry: {entry_path}")
+            self._remove(entry_path)
+            return None
+
+        # Mark the entry as recently used.
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+        return result
+
+    def set(
+        self,
+        raw_sql: str,
+        result: Sequence[Tuple[str, StatementType]],
+    ) -> None:
+        """Store classification result for the given migration SQL."""
+
+        entry = json.dumps(
+            [(statement, statement_type.value) for statement, statement_type in result]
+        ).encode()
+        try:
+            write_atomically(self._entry_path(self.key(raw_sql)), entry)
+        except OSError as e:
+            logger.debug(f"Can't write cache entry: {e}")
+            return
+
+        # NOTE: overwritten entries are counted twice, so the size is
+        # overestimated until the next scan, which only evicts earlier.
+        if self.size is None or self.size + len(entry) > self.max_size:
+            self.evict()
+        else:
+            self.size += len(entry)
+
+    def evict(self) -> None:
+        """Remove the least recently used entries exceeding the size limit."""
+
+        entries = []
+        total_size = 0
+        try:
+            with os.scandir(self.path) as it:
+                for dir_entry in it:
+                    if not dir_entry.name.endswith(ENTRY_SUFFIX):
+                        continue
+                    stat = dir_entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+                    total_size += stat.st_size
+        except OSError:
+            return
+
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total_size <= self.max_size:
+                break
+            self._remove(entry_path)
+            total_size -= size
+        self.size = total_size
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}{ENTRY_SUFFIX}")
+
+    @staticmethod
+    def _remove(entry_path: str) -> None:
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+
+
+class LRUCache(Generic[T]):
+    """A bounded in-memory cache evicting the least recently used items.
+
+    Counts `hits` and `misses` of lookups.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.items: OrderedDict[Hashable, T] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[T]:
+        """Get an item by the key."""
+
+        item = self.items.get(key)
+        if item is not None:
+            self.items.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+        return item
+
+    def set(self, key: Hashable, item: T) -> None:
+        """Store an item by the key."""
+
+        self.items[key] = item
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.items)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import AbstractSet, List, Optional, cast
+
+from sqlfluff.core.dialects import Dialect, load_raw_dialect
+from sqlfluff.core.parser import Ref
+from sqlfluff.core.parser.grammar.base import BaseGrammar
+from sqlfluff.core.parser.matchable import Matchable
+
+# NOTE: most of the statements supported by the dialect (grants, comments,
+# views, etc.) are never matched by the rules, but the parser still tries
+# them for every statement. The reduced dialect only has the statements of
+# the types used by the rules, the others become unparsable and are parsed
+# by the full dialect. The order of the statements is kept, so the ones left
+# are matched exactly the same way.
+
+
+def reduced_dialect(name: str, types: AbstractSet[str]) -> Optional[Dialect]:
+    """Build the dialect, which only parses the statements of the given types
+    (and selects).
+
+    Returns `None` if the statements grammar isn't built the expected way
+    (e.g. by another sqlfluff version), so the full dialect is used instead.
+    """
+
+    raw_dialect = load_raw_dialect(name)
+    statement = raw_dialect.get_segment("StatementSegment")
+    match_grammar = statement.match_grammar
+    # NOTE: sqlfluff has no public interface to iterate grammar options.
+    if not isinstance(match_grammar, BaseGrammar) or not isinstance(
+        getattr(match_grammar, "_elements", None), list
+    ):
+        return None
+
+    removed: List[Matchable] = []
+    for element in match_grammar._elements:
+        if not isinstance(element, Ref):
+            continue
+        ref = getattr(element, "_ref", None)
+        if not isinstance(ref, str):
+            return None
+        if not is_statement_of_types(raw_dialect, ref, types):
+            removed.append(element)
+
+    dialect = raw_dialect.copy_as(name)
+    # NOTE: segment classes are replaced the same way as grammars, though
+    # `Dialect.replace` is annotated with grammars only.
+    dialect.replace(
+        StatementSegment=cast(
+            Matchable,
+            type(
+                "StatementSegment",
+                (statement,),
+                {"match_grammar": match_grammar.copy(remove=removed)},
+            ),
+        )
+    )
+    return dialect.expand()
+
+
+def is_statement_of_types(
+    dialect: Dialect,
+    name: str,
+    types: AbstractSet[str],
+) -> bool:
+    """Check if the dialect element is a statement of one of the given types.
+
+    Grammars (e.g. `SelectableGrammar`) are considered matching.
+    """
+
+    try:
+        segment = dialect.get_segment(name)
+    except (TypeError, ValueError):
+        return True
+
+    return segment.class_is_type(*types)
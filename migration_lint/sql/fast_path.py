@@ -0,0 +1,842 @@
+from __future__ import annotations
+
+import dataclasses
+import re
+from typing import AbstractSet, Callable, List, Optional, Sequence, Tuple
+
+from sqlfluff.core import Lexer
+from sqlfluff.core.parser import BaseSegment
+
+from migration_lint.sql.constants import StatementType
+
+
+@dataclasses.dataclass
+class FastClassification:
+    """A statement classified by the fast path.
+
+    - `text` -- normalized statement text (same as sqlfluff's `raw_normalized`);
+    - `root_type` -- sqlfluff type of the statement;
+    - `statement_type` -- statement classification.
+    """
+
+    text: str
+    root_type: str
+    statement_type: StatementType
+
+
+# NOTE: the decisions below must give the same results as the rules from
+# `migration_lint.sql.rules`, which is checked by the differential tests
+# (see tests/test_fast_path.py). Statements are matched by a small grammar
+# of complete token sequences, anything else is parsed. sqlfluff lower-cases
+# naked identifiers in the normalized text, so the grammar records them.
+# Words, which are kept as is only in some positions (e.g. function and
+# parameter names), must be in lower case already.
+
+TRANSACTION_STATEMENTS = {
+    ("BEGIN",),
+    ("BEGIN", "TRANSACTION"),
+    ("BEGIN", "WORK"),
+    ("COMMIT",),
+    ("COMMIT", "TRANSACTION"),
+    ("COMMIT", "WORK"),
+    ("END",),
+    ("END", "TRANSACTION"),
+    ("END", "WORK"),
+}
+
+# Keywords that follow SET, but aren't a configuration parameter.
+SET_SPECIAL_KEYWORDS = {
+    "CONSTRAINTS",
+    "NAMES",
+    "ROLE",
+    "SCHEMA",
+    "SESSION",
+    "TIME",
+    "TRANSACTION",
+}
+
+# Keywords that may start a nested statement, which could be matched by other
+# rules (e.g. `INSERT ... SELECT` is ignored).
+NESTED_STATEMENT_KEYWORDS = {
+    "SELECT",
+    "INSERT",
+    "UPDATE",
+    "DELETE",
+    "VALUES",
+    "WITH",
+    "SET",
+}
+
+# DROP statements (by leading keywords) with unconditional classification.
+DROP_STATEMENTS = {
+    "SEQUENCE": ("drop_sequence_statement", StatementType.BACKWARD_INCOMPATIBLE),
+    "TABLE": ("drop_table_statement", StatementType.BACKWARD_INCOMPATIBLE),
+    "TYPE": ("drop_type_statement", StatementType.BACKWARD_INCOMPATIBLE),
+}
+
+# Built-in data types, optionally followed by their modifiers (e.g.
+# `VARCHAR(32)`).
+DATA_TYPES = {
+    "BIGINT",
+    "BIGSERIAL",
+    "BOOL",
+    "BOOLEAN",
+    "BYTEA",
+    "CHAR",
+    "DATE",
+    "DECIMAL",
+    "FLOAT",
+    "INT",
+    "INTEGER",
+    "INTERVAL",
+    "JSON",
+    "JSONB",
+    "NUMERIC",
+    "REAL",
+    "SERIAL",
+    "SMALLINT",
+    "SMALLSERIAL",
+    "TEXT",
+    "TIMESTAMPTZ",
+    "UUID",
+    "VARCHAR",
+}
+
+# Built-in data types of several words.
+DATA_TYPES_SEQUENCES = (
+    ("DOUBLE", "PRECISION"),
+    ("CHARACTER", "VARYING"),
+    ("CHARACTER",),
+    ("TIMESTAMP",),
+    ("TIME",),
+)
+
+# Value keywords (e.g. column defaults).
+VALUE_KEYWORDS = {"NULL", "TRUE", "FALSE", "CURRENT_DATE", "CURRENT_TIMESTAMP"}
+
+COMPARISON_OPERATORS = (
+    ("<", ">"),
+    ("!", "="),
+    ("<", "="),
+    (">", "="),
+    ("<",),
+    (">",),
+    ("=",),
+)
+
+NEWLINES_RE = re.compile(r"\r\n|\r")
+
+
+def fast_classify(lexer: Lexer, raw_sql: str) -> Optional[FastClassification]:
+    """Classify a single statement by its keywords without parsing, if the
+    statement is unambiguous.
+    """
+
+    tokens, errors = lexer.lex(NEWLINES_RE.sub("\n", raw_sql))
+    if errors:
+        return None
+
+    code_tokens = code_span(tokens)
+    if not code_tokens:
+        return None
+
+    stream = TokenStream(
+        [token for token in code_tokens if token.is_code],
+        lexer.config.get("dialect_obj").sets("reserved_keywords"),
+    )
+    classified = classify_tokens(stream)
+    if classified is None or not stream.at_end():
+        return None
+
+    identifiers = {id(stream.tokens[i]) for i in stream.identifiers}
+    root_type, statement_type = classified
+    return FastClassification(
+        text="".join(
+            token.raw.lower() if id(token) in identifiers else token.raw_normalized()
+            for token in code_tokens
+        ),
+        root_type=root_type,
+        statement_type=statement_type,
+    )
+
+
+def code_span(tokens: Sequence[BaseSegment]) -> Sequence[BaseSegment]:
+    """Get tokens from the first code token to the last one."""
+
+    code_positions = [i for i, token in enumerate(tokens) if token.is_code]
+    if not code_positions:
+        return []
+
+    return tokens[code_positions[0] : code_positions[-1] + 1]
+
+
+class TokenStream:
+    """Code tokens of a statement consumed by the fast path grammar.
+
+    - `words` -- words of the tokens in upper case, raw text of the others;
+    - `identifiers` -- positions of naked identifiers.
+    """
+
+    def __init__(
+        self,
+        tokens: Sequence[BaseSegment],
+        reserved_keywords: AbstractSet[str],
+    ) -> None:
+        self.tokens = tokens
+        self.reserved_keywords = reserved_keywords
+        self.words = [
+            token.raw.upper() if token.is_type("word") else token.raw
+            for token in tokens
+        ]
+        self.pos = 0
+        self.identifiers: List[int] = []
+
+    def at_end(self) -> bool:
+        return self.pos == len(self.tokens)
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        """Get a word by its offset from the current position, if present."""
+
+        pos = self.pos + offset
+        return self.words[pos] if pos < len(self.words) else None
+
+    def is_type(self, *types: str) -> bool:
+        return not self.at_end() and self.tokens[self.pos].is_type(*types)
+
+    def keyword(self, *keywords: str) -> bool:
+        """Consume the sequence of keywords (or punctuation), if present."""
+
+        end = self.pos + len(keywords)
+        if tuple(self.words[self.pos : end]) != keywords:
+            return False
+        self.pos = end
+        return True
+
+    def one_of(self, keywords: AbstractSet[str]) -> Optional[str]:
+        """Consume one of the keywords, if present."""
+
+        word = self.peek()
+        if word is None or word not in keywords or not self.is_type("word"):
+            return None
+        self.pos += 1
+        return word
+
+    def identifier(self) -> bool:
+        """Consume a quoted or a naked identifier."""
+
+        if self.is_type("double_quote"):
+            self.pos += 1
+            return True
+        if not self.is_type("word") or self.words[self.pos] in self.reserved_keywords:
+            return False
+        self.identifiers.append(self.pos)
+        self.pos += 1
+        return True
+
+    def lower_word(self) -> bool:
+        """Consume a word in lower case, it's normalized the same way in any
+        position.
+        """
+
+        if not self.is_type("word"):
+            return False
+        raw = self.tokens[self.pos].raw
+        if raw != raw.lower() or self.words[self.pos] in self.reserved_keywords:
+            return False
+        self.pos += 1
+        return True
+
+    def raw_identifier(self) -> bool:
+        """Consume a quoted identifier or a word in lower case (for positions,
+        where naked identifiers aren't normalized).
+        """
+
+        if self.is_type("double_quote"):
+            self.pos += 1
+            return True
+        return self.lower_word()
+
+    def literal(self) -> bool:
+        """Consume a string or a (signed) number."""
+
+        if self.is_type("single_quote", "numeric_literal"):
+            self.pos += 1
+            return True
+        if self.peek() == "-" and self.peek(1) is not None:
+            self.pos += 1
+            if self.is_type("numeric_literal"):
+                self.pos += 1
+                return True
+            self.pos -= 1
+        return False
+
+    def separated(self, element: Callable[[], bool]) -> bool:
+        """Consume comma separated elements."""
+
+        if not element():
+            return False
+        while self.keyword(","):
+            if not element():
+                return False
+        return True
+
+    def bracketed(self, element: Callable[[], bool]) -> bool:
+        """Consume comma separated elements in brackets."""
+
+        return self.keyword("(") and self.separated(element) and self.keyword(")")
+
+
+def classify_tokens(tokens: TokenStream) -> Optional[Tuple[str, StatementType]]:
+    """Classify a statement by its code tokens.
+
+    Returns the statement root type and its classification, or `None` if the
+    statement can't be classified with certainty. The tokens must be consumed
+    completely for the classification to be valid.
+    """
+
+    if tuple(tokens.words) in TRANSACTION_STATEMENTS:
+        tokens.pos = len(tokens.words)
+        return "transaction_statement", StatementType.IGNORED
+
+    if tokens.keyword("SET"):
+        return match_set(tokens)
+    if tokens.keyword("INSERT", "INTO"):
+        return match_insert(tokens)
+    if tokens.keyword("UPDATE"):
+        return match_update(tokens)
+    if tokens.keyword("DELETE", "FROM"):
+        return match_delete(tokens)
+    if tokens.keyword("CREATE"):
+        return match_create(tokens)
+    if tokens.keyword("ALTER", "SEQUENCE"):
+        tokens.keyword("IF", "EXISTS")
+        if name(tokens) and sequence_options(tokens, restart=True):
+            return "alter_sequence_statement", StatementType.BACKWARD_COMPATIBLE
+        return None
+    if tokens.keyword("DROP"):
+        return match_drop(tokens)
+
+    return None
+
+
+def match_set(tokens: TokenStream) -> Optional[Tuple[str, StatementType]]:
+    """Match `SET [SESSION | LOCAL] parameter { TO | = } value [, ...]`."""
+
+    tokens.one_of({"SESSION", "LOCAL"})
+    if tokens.peek() in SET_SPECIAL_KEYWORDS or not tokens.lower_word():
+        return None
+    if tokens.one_of({"TO"}) is None and not tokens.keyword("="):
+        return None
+    if not tokens.separated(lambda: tokens.literal() or tokens.lower_word()):
+        return None
+
+    return "set_statement", StatementType.IGNORED
+
+
+def match_insert(tokens: TokenStream) -> Optional[Tuple[str, StatementType]]:
+    """Match `INSERT INTO table [(columns)] VALUES (values) [, ...]`."""
+
+    if not name(tokens):
+        return None
+    if tokens.peek() == "(" and not tokens.bracketed(tokens.identifier):
+        return None
+    if not tokens.keyword("VALUES"):
+        return None
+    if not tokens.separated(
+        lambda: tokens.bracketed(
+            lambda: value(tokens) or tokens.keyword("DEFAULT"),
+        )
+    ):
+        return None
+
+    return "insert_statement", StatementType.DATA_MIGRATION
+
+
+def match_update(tokens: TokenStream) -> Optional[Tuple[str, StatementType]]:
+    """Match `UPDATE table SET column = value [, ...] [WHERE condition]`."""
+
+    if not name(tokens) or not tokens.keyword("SET"):
+        return None
+    if not tokens.separated(
+        lambda: tokens.identifier() and tokens.keyword("=") and value(tokens)
+    ):
+        return None
+    if tokens.keyword("WHERE") and not condition(tokens):
+        return None
+
+    return "update_statement", StatementType.DATA_MIGRATION
+
+
+def match_delete(tokens: TokenStream) -> Optional[Tuple[str, StatementType]]:
+    """Match `DELETE FROM table [WHERE condition]`."""
+
+    if not name(tokens):
+        return None
+    if tokens.keyword("WHERE") and not condition(tokens):
+        return None
+
+    return "delete_statement", StatementType.DATA_MIGRATION
+
+
+def match_create(tokens: TokenStream) -> Optional[Tuple[str, StatementType]]:
+    """Match CREATE statements."""
+
+    if tokens.keyword("OR", "REPLACE"):
+        if tokens.keyword("FUNCTION"):
+            return match_create_function(tokens)
+        return None
+    if tokens.keyword("FUNCTION"):
+        return match_create_function(tokens)
+    if tokens.keyword("TRIGGER"):
+        return match_create_trigger(tokens)
+    if tokens.keyword("SEQUENCE"):
+        tokens.keyword("IF", "NOT", "EXISTS")
+        if name(tokens) and sequence_options(tokens, restart=False):
+            return "create_sequence_statement", StatementType.BACKWARD_COMPATIBLE
+        return None
+
+    unique = tokens.keyword("UNIQUE")
+    if tokens.keyword("INDEX"):
+        return match_create_index(tokens)
+    if unique:
+        return None
+
+    tokens.one_of({"TEMP", "TEMPORARY", "UNLOGGED"})
+    if tokens.keyword("TABLE"):
+        return match_create_table(tokens)
+
+    return None
+
+
+def match_create_table(tokens: TokenStream) -> Optional[Tuple[str, StatementType]]:
+    """Match `CREATE TABLE [IF NOT EXISTS] table (elements) [WITH (params)]`."""
+
+    tokens.keyword("IF", "NOT", "EXISTS")
+    if not name(tokens) or not tokens.bracketed(lambda: table_element(tokens)):
+        return None
+    if tokens.keyword("WITH") and not storage_parameters(tokens):
+        return None
+
+    return "create_table_statement", StatementType.BACKWARD_COMPATIBLE
+
+
+def match_create_index(tokens: TokenStream) -> Optional[Tuple[str, StatementType]]:
+    """Match `CREATE [UNIQUE] INDEX [CONCURRENTLY] [[IF NOT EXISTS] name] ON
+    [ONLY] table [USING method] (elements) [INCLUDE (columns)] [WITH (params)]
+    [WHERE condition]`.
+    """
+
+    concurrently = tokens.keyword("CONCURRENTLY")
+    if tokens.keyword("IF", "NOT", "EXISTS"):
+        if not tokens.identifier():
+            return None
+    elif tokens.peek() != "ON" and not tokens.identifier():
+        return None
+    if not tokens.keyword("ON"):
+        return None
+    tokens.keyword("ONLY")
+    if not name(tokens):
+        return None
+    if tokens.keyword("USING") and not tokens.identifier():
+        return None
+    if not tokens.bracketed(lambda: index_element(tokens)):
+        return None
+    if tokens.keyword("INCLUDE") and not tokens.bracketed(tokens.identifier):
+        return None
+    if tokens.keyword("WITH") and not storage_parameters(tokens):
+        return None
+    if tokens.keyword("WHERE") and not condition(tokens):
+        return None
+
+    if concurrently:
+        return "create_index_statement", StatementType.BACKWARD_COMPATIBLE
+    return "create_index_statement", StatementType.RESTRICTED
+
+
+def match_create_function(
+    tokens: TokenStream,
+) -> Optional[Tuple[str, StatementType]]:
+    """Match `CREATE [OR REPLACE] FUNCTION name ([arguments]) RETURNS type
+    options`, where the options include the function body.
+    """
+
+    if not name(tokens, normalized=False) or not tokens.keyword("("):
+        return None
+    if not tokens.keyword(")"):
+        if not tokens.separated(lambda: function_argument(tokens)):
+            return None
+        if not tokens.keyword(")"):
+            return None
+    if not tokens.keyword("RETURNS"):
+        return None
+    tokens.keyword("SETOF")
+    if tokens.one_of({"TRIGGER", "VOID"}) is None and not data_type(tokens):
+        return None
+
+    body = False
+    while not tokens.at_end():
+        if tokens.keyword("AS"):
+            if body or not tokens.is_type("dollar_quote", "single_quote"):
+                return None
+            tokens.pos += 1
+            body = True
+        elif not function_option(tokens):
+            return None
+    if not body:
+        return None
+
+    return "create_function_statement", StatementType.BACKWARD_COMPATIBLE
+
+
+def match_create_trigger(tokens: TokenStream) -> Optional[Tuple[str, StatementType]]:
+    """Match `CREATE TRIGGER name { BEFORE | AFTER | INSTEAD OF } event [OR
+    ...] ON table [FOR [EACH] { ROW | STATEMENT }] EXECUTE { FUNCTION |
+    PROCEDURE } function ([arguments])`.
+    """
+
+    if not tokens.identifier():
+        return None
+    if tokens.one_of({"BEFORE", "AFTER"}) is None and not tokens.keyword(
+        "INSTEAD", "OF"
+    ):
+        return None
+    if not trigger_event(tokens):
+        return None
+    while tokens.keyword("OR"):
+        if not trigger_event(tokens):
+            return None
+    if not tokens.keyword("ON") or not name(tokens):
+        return None
+    if tokens.keyword("FOR"):
+        tokens.keyword("EACH")
+        if tokens.one_of({"ROW", "STATEMENT"}) is None:
+            return None
+    if (
+        not tokens.keyword("EXECUTE")
+        or tokens.one_of({"FUNCTION", "PROCEDURE"}) is None
+    ):
+        return None
+    if not name(tokens, normalized=False) or not tokens.keyword("("):
+        return None
+    if not tokens.keyword(")"):
+        if not tokens.separated(tokens.literal) or not tokens.keyword(")"):
+            return None
+
+    return "create_trigger", StatementType.BACKWARD_COMPATIBLE
+
+
+def match_drop(tokens: TokenStream) -> Optional[Tuple[str, StatementType]]:
+    """Match DROP statements."""
+
+    if tokens.keyword("INDEX"):
+        concurrently = tokens.keyword("CONCURRENTLY")
+        tokens.keyword("IF", "EXISTS")
+        if not tokens.separated(lambda: name(tokens)):
+            return None
+        tokens.one_of({"CASCADE", "RESTRICT"})
+        if concurrently:
+            return "drop_index_statement", StatementType.BACKWARD_COMPATIBLE
+        return "drop_index_statement", StatementType.RESTRICTED
+
+    if tokens.keyword("TRIGGER"):
+        tokens.keyword("IF", "EXISTS")
+        if not tokens.identifier() or not tokens.keyword("ON") or not name(tokens):
+            return None
+        tokens.one_of({"CASCADE", "RESTRICT"})
+        return "drop_trigger", StatementType.BACKWARD_COMPATIBLE
+
+    if tokens.keyword("FUNCTION"):
+        tokens.keyword("IF", "EXISTS")
+        if not tokens.separated(lambda: function_signature(tokens)):
+            return None
+        tokens.one_of({"CASCADE", "RESTRICT"})
+        return "drop_function_statement", StatementType.BACKWARD_COMPATIBLE
+
+    statement = tokens.one_of(DROP_STATEMENTS.keys())
+    if statement is None:
+        return None
+    tokens.keyword("IF", "EXISTS")
+    # NOTE: type names are kept as is, unlike tables and sequences names.
+    if not tokens.separated(
+        lambda: name(tokens, normalized=False) if statement == "TYPE" else name(tokens)
+    ):
+        return None
+    tokens.one_of({"CASCADE", "RESTRICT"})
+    return DROP_STATEMENTS[statement]
+
+
+def name(tokens: TokenStream, normalized: bool = True) -> bool:
+    """Match a (qualified) object name.
+
+    Names, which aren't `normalized` (e.g. function names), must be in lower
+    case.
+    """
+
+    identifier = tokens.identifier if normalized else tokens.raw_identifier
+    if not identifier():
+        return False
+    while tokens.keyword("."):
+        if not identifier():
+            return False
+    return True
+
+
+def data_type(tokens: TokenStream) -> bool:
+    """Match a built-in data type with optional modifiers and array brackets."""
+
+    if tokens.one_of(DATA_TYPES) is None:
+        for words in DATA_TYPES_SEQUENCES:
+            if tokens.keyword(*words):
+                break
+        else:
+            return False
+        if words[0] in ("TIMESTAMP", "TIME") and tokens.one_of({"WITH", "WITHOUT"}):
+            if not tokens.keyword("TIME", "ZONE"):
+                return False
+
+    if tokens.peek() == "(" and not tokens.bracketed(
+        lambda: tokens.is_type("numeric_literal") and tokens.literal()
+    ):
+        return False
+    while tokens.keyword("[", "]"):
+        pass
+    return True
+
+
+def value(tokens: TokenStream) -> bool:
+    """Match a literal, a value keyword or a call of a function without
+    arguments (e.g. `now()`).
+    """
+
+    if tokens.literal():
+        if tokens.keyword("::"):
+            return data_type(tokens)
+        return True
+    if tokens.one_of(VALUE_KEYWORDS) is not None:
+        return True
+    return tokens.peek(1) == "(" and tokens.lower_word() and tokens.keyword("(", ")")
+
+
+def condition(tokens: TokenStream) -> bool:
+    """Match comparisons of columns joined by AND / OR."""
+
+    if not predicate(tokens):
+        return False
+    while tokens.one_of({"AND", "OR"}) is not None:
+        if not predicate(tokens):
+            return False
+    return True
+
+
+def predicate(tokens: TokenStream) -> bool:
+    """Match `column { operator value | IS [NOT] { NULL | TRUE | FALSE } }`."""
+
+    if not name(tokens):
+        return False
+    if tokens.keyword("IS"):
+        tokens.keyword("NOT")
+        return tokens.one_of({"NULL", "TRUE", "FALSE"}) is not None
+    if not any(tokens.keyword(*operator) for operator in COMPARISON_OPERATORS):
+        return False
+    return value(tokens)
+
+
+def table_element(tokens: TokenStream) -> bool:
+    """Match a column definition or a table constraint."""
+
+    if tokens.keyword("CONSTRAINT"):
+        if not tokens.identifier():
+            return False
+        return table_constraint(tokens)
+    if tokens.peek() in ("PRIMARY", "UNIQUE", "FOREIGN"):
+        return table_constraint(tokens)
+
+    if not tokens.identifier() or not data_type(tokens):
+        return False
+    while tokens.peek() not in (",", ")", None):
+        if not column_constraint(tokens):
+            return False
+    return True
+
+
+def table_constraint(tokens: TokenStream) -> bool:
+    """Match `PRIMARY KEY (columns)`, `UNIQUE (columns)` or `FOREIGN KEY
+    (columns) REFERENCES ...`.
+    """
+
+    if tokens.keyword("PRIMARY", "KEY") or tokens.keyword("UNIQUE"):
+        return tokens.bracketed(tokens.identifier)
+    if tokens.keyword("FOREIGN", "KEY"):
+        return tokens.bracketed(tokens.identifier) and references(tokens)
+    return False
+
+
+def column_constraint(tokens: TokenStream) -> bool:
+    """Match a column constraint."""
+
+    if tokens.keyword("CONSTRAINT") and not tokens.identifier():
+        return False
+    if (
+        tokens.keyword("NOT", "NULL")
+        or tokens.keyword("NULL")
+        or tokens.keyword("PRIMARY", "KEY")
+        or tokens.keyword("UNIQUE")
+        or tokens.keyword("GENERATED", "ALWAYS", "AS", "IDENTITY")
+        or tokens.keyword("GENERATED", "BY", "DEFAULT", "AS", "IDENTITY")
+    ):
+        return True
+    if tokens.keyword("DEFAULT"):
+        return value(tokens)
+    if tokens.peek() == "REFERENCES":
+        return references(tokens)
+    return False
+
+
+def references(tokens: TokenStream) -> bool:
+    """Match `REFERENCES table [(columns)] [ON { DELETE | UPDATE } action]
+    [[NOT] DEFERRABLE] [INITIALLY { DEFERRED | IMMEDIATE }]`.
+    """
+
+    if not tokens.keyword("REFERENCES") or not name(tokens):
+        return False
+    if tokens.peek() == "(" and not tokens.bracketed(tokens.identifier):
+        return False
+    while tokens.keyword("ON"):
+        if tokens.one_of({"DELETE", "UPDATE"}) is None:
+            return False
+        if not (
+            tokens.one_of({"CASCADE", "RESTRICT"}) is not None
+            or tokens.keyword("NO", "ACTION")
+            or tokens.keyword("SET", "NULL")
+            or tokens.keyword("SET", "DEFAULT")
+        ):
+            return False
+    if not tokens.keyword("NOT", "DEFERRABLE"):
+        tokens.keyword("DEFERRABLE")
+    if tokens.keyword("INITIALLY"):
+        return tokens.one_of({"DEFERRED", "IMMEDIATE"}) is not None
+    return True
+
+
+def index_element(tokens: TokenStream) -> bool:
+    """Match `{ column | function(columns) } [ASC | DESC] [NULLS { FIRST |
+    LAST }]`.
+    """
+
+    if tokens.peek(1) == "(":
+        if not tokens.lower_word() or not tokens.bracketed(tokens.identifier):
+            return False
+    elif not tokens.identifier():
+        return False
+    tokens.one_of({"ASC", "DESC"})
+    if tokens.keyword("NULLS"):
+        return tokens.one_of({"FIRST", "LAST"}) is not None
+    return True
+
+
+def storage_parameters(tokens: TokenStream) -> bool:
+    """Match `(parameter = value [, ...])`."""
+
+    return tokens.bracketed(
+        lambda: (
+            tokens.lower_word()
+            and tokens.keyword("=")
+            and (tokens.literal() or tokens.lower_word())
+        )
+    )
+
+
+def sequence_options(tokens: TokenStream, restart: bool) -> bool:
+    """Match sequence options (at least one, if `restart` is allowed, i.e.
+    for ALTER SEQUENCE).
+    """
+
+    matched = False
+    while not tokens.at_end():
+        if tokens.keyword("AS"):
+            option = data_type(tokens)
+        elif tokens.keyword("INCREMENT"):
+            tokens.keyword("BY")
+            option = tokens.literal()
+        elif tokens.one_of({"MINVALUE", "MAXVALUE", "CACHE"}) is not None:
+            option = tokens.literal()
+        elif tokens.keyword("NO"):
+            option = tokens.one_of({"MINVALUE", "MAXVALUE", "CYCLE"}) is not None
+        elif tokens.keyword("CYCLE"):
+            option = True
+        elif tokens.keyword("START"):
+            tokens.keyword("WITH")
+            option = tokens.literal()
+        elif restart and tokens.keyword("RESTART"):
+            # NOTE: sqlfluff doesn't parse `RESTART` without a value.
+            tokens.keyword("WITH")
+            option = tokens.literal()
+        elif tokens.keyword("OWNED", "BY"):
+            option = tokens.keyword("NONE") or name(tokens)
+        else:
+            option = False
+        if not option:
+            return False
+        matched = True
+
+    return matched or not restart
+
+
+def function_argument(tokens: TokenStream) -> bool:
+    """Match `[name] type`."""
+
+    if data_type(tokens) and tokens.peek() in (",", ")"):
+        return True
+    return tokens.lower_word() and data_type(tokens)
+
+
+def function_signature(tokens: TokenStream) -> bool:
+    """Match `name [([types])]`."""
+
+    if not name(tokens, normalized=False):
+        return False
+    if tokens.keyword("("):
+        if tokens.keyword(")"):
+            return True
+        return tokens.separated(lambda: data_type(tokens)) and tokens.keyword(")")
+    return True
+
+
+def function_option(tokens: TokenStream) -> bool:
+    """Match a function option (except the body)."""
+
+    if tokens.keyword("LANGUAGE"):
+        return tokens.lower_word()
+    if (
+        tokens.one_of({"IMMUTABLE", "STABLE", "VOLATILE", "STRICT", "LEAKPROOF"})
+        is not None
+        or tokens.keyword("NOT", "LEAKPROOF")
+        or tokens.keyword("CALLED", "ON", "NULL", "INPUT")
+        or tokens.keyword("RETURNS", "NULL", "ON", "NULL", "INPUT")
+    ):
+        return True
+    if tokens.keyword("SECURITY"):
+        return tokens.one_of({"DEFINER", "INVOKER"}) is not None
+    if tokens.keyword("PARALLEL"):
+        return tokens.one_of({"SAFE", "UNSAFE", "RESTRICTED"}) is not None
+    if tokens.one_of({"COST", "ROWS"}) is not None:
+        return tokens.literal()
+    if tokens.keyword("SET"):
+        if not tokens.lower_word():
+            return False
+        if tokens.keyword("FROM", "CURRENT"):
+            return True
+        if tokens.one_of({"TO"}) is None and not tokens.keyword("="):
+            return False
+        return tokens.separated(lambda: tokens.literal() or tokens.lower_word())
+    return False
+
+
+def trigger_event(tokens: TokenStream) -> bool:
+    """Match `{ INSERT | UPDATE [OF columns] | DELETE | TRUNCATE }`."""
+
+    if tokens.keyword("UPDATE"):
+        if tokens.keyword("OF"):
+            return tokens.separated(tokens.identifier)
+        return True
+    return tokens.one_of({"INSERT", "DELETE", "TRUNCATE"}) is not None
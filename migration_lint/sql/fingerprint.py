@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import dataclasses
+import re
+from typing import AbstractSet, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from sqlfluff.core import Lexer
+from sqlfluff.core.parser import BaseSegment
+
+from migration_lint.sql.fast_path import NEWLINES_RE, code_span
+from migration_lint.sql.model import SegmentLocator
+
+# NOTE: statements of the same structure (e.g. `ALTER TABLE t_name ADD COLUMN
+# c_name text NULL` for different tables and columns) are parsed the same way
+# and matched by the same rules, so they're classified once per structure.
+# Keywords and words used by the rules (e.g. `alembic_version`) are kept in
+# fingerprints as is, other words (identifiers) and literals are replaced by
+# placeholders. Identifiers keep their shape (letters, digits, `$`), as the
+# grammar tells some of them apart by it.
+# sqlfluff lowercases unquoted identifiers in the normalized text depending on
+# their role, so the case of the tokens is taken from the parsed statements
+# of the same structure too (see `Fingerprint`).
+
+# Types of literal tokens, which are replaced by placeholders.
+LITERAL_TYPES = {
+    "single_quote",
+    "escaped_single_quote",
+    "unicode_single_quote",
+    "bit_string_literal",
+    "dollar_quote",
+    "numeric_literal",
+    "double_quote",
+}
+
+LETTERS_RE = re.compile(r"[^\W\d]+")
+DIGITS_RE = re.compile(r"\d+")
+
+
+def locator_words(locators: Iterable[SegmentLocator]) -> Set[str]:
+    """Get words matched by the locators (in upper case)."""
+
+    words: Set[str] = set()
+    for locator in locators:
+        if locator.raw:
+            words.add(locator.raw.upper())
+        words |= locator_words(locator.children or ())
+        if locator.only_with is not None:
+            words |= locator_words(
+                (locator.only_with.locator, locator.only_with.match_by)
+            )
+
+    return words
+
+
+@dataclasses.dataclass
+class Fingerprint:
+    """Fingerprint of a single statement.
+
+    - `tokens` -- normalized texts of the statement tokens (in their original
+      case) and whether they are code tokens;
+    - `shape` -- structural fingerprint of the statement.
+    """
+
+    tokens: List[Tuple[str, bool]]
+    shape: str
+
+    def case(self, text: str) -> Optional[Dict[int, bool]]:
+        """Get the case of the code tokens in the normalized text of the
+        statement (e.g. the parsed one): whether the tokens not in lower case
+        are lowercased, by the token indexes among the code tokens.
+
+        Returns `None` if the text doesn't match the tokens.
+        """
+
+        case = {}
+        offset = 0
+        index = 0
+        for token, is_code in self.tokens:
+            normalized = text[offset : offset + len(token)]
+            if is_code and token != token.lower():
+                if normalized not in (token, token.lower()):
+                    return None
+                case[index] = normalized != token
+            elif normalized != token:
+                return None
+            offset += len(token)
+            if is_code:
+                index += 1
+
+        return case if offset == len(text) else None
+
+    def text(self, case: Mapping[int, bool]) -> Optional[str]:
+        """Get normalized text of the statement by the case of the code tokens
+        of a statement of the same shape (see `case`).
+
+        Returns `None` if the case of some tokens isn't known.
+        """
+
+        text = []
+        index = 0
+        for token, is_code in self.tokens:
+            if is_code and token != token.lower():
+                lowered = case.get(index)
+                if lowered is None:
+                    return None
+                text.append(token.lower() if lowered else token)
+            else:
+                text.append(token)
+            if is_code:
+                index += 1
+
+        return "".join(text)
+
+
+def fingerprint(
+    lexer: Lexer,
+    raw_sql: str,
+    words: AbstractSet[str],
+) -> Optional[Fingerprint]:
+    """Get fingerprint of a single statement, keeping the given words
+    (in upper case) as is.
+
+    Returns `None` if the statement can't be lexed.
+    """
+
+    tokens, errors = lexer.lex(NEWLINES_RE.sub("\n", raw_sql))
+    if errors:
+        return None
+
+    code_tokens = code_span(tokens)
+    if not code_tokens:
+        return None
+
+    return Fingerprint(
+        [(token.raw_normalized(), token.is_code) for token in code_tokens],
+        " ".join(token_shape(token, words) for token in code_tokens if token.is_code),
+    )
+
+
+def token_shape(token: BaseSegment, words: AbstractSet[str]) -> str:
+    """Get the shape of a code token for fingerprints."""
+
+    if token.is_type("word"):
+        word = token.raw.upper()
+        if word in words:
+            return word
+        return "?" + DIGITS_RE.sub("0", LETTERS_RE.sub("a", word))
+
+    if token.is_type(*LITERAL_TYPES):
+        return "?" + token.get_type()
+
+    return token.raw
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+from typing import (
+    AbstractSet,
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from sqlfluff.core.parser import BaseSegment
+
+from migration_lint.sql.model import SegmentLocator
+
+# Types sets of the segments, shared by all the segments with the same types.
+_types_sets: Dict[FrozenSet[str], FrozenSet[str]] = {}
+
+
+class SegmentIR:
+    """A segment of the compact statement representation.
+
+    Provides the part of sqlfluff segments interface used by the rules, so
+    the locators are matched against it the same way. Only the segments of
+    the types used by the rules are kept, positions are offsets in the
+    statement.
+
+    - `type` -- the segment type;
+    - `types` -- all the types the segment matches (sqlfluff segments match
+      the types of their base classes too, e.g. boolean literals are
+      keywords);
+    - `normalized` -- normalized raw SQL, if it differs from raw SQL;
+    - `descendant_types` -- all the types of the descendants, so subtrees
+      without the types looked for aren't crawled.
+    """
+
+    __slots__ = (
+        "type",
+        "types",
+        "raw",
+        "pos_marker",
+        "segments",
+        "normalized",
+        "descendant_types",
+    )
+
+    descendant_types: FrozenSet[str]
+
+    def __init__(
+        self,
+        type: str,
+        raw: str,
+        pos_marker: int,
+        segments: Sequence[SegmentIR] = (),
+        normalized: Optional[str] = None,
+        types: Optional[FrozenSet[str]] = None,
+    ) -> None:
+        self.type = type
+        self.types = types if types is not None else intern_types({type})
+        self.raw = raw
+        self.pos_marker = pos_marker
+        self.segments = tuple(segments)
+        self.normalized = normalized
+        descendant_types: Set[str] = set()
+        for segment in self.segments:
+            descendant_types |= segment.types
+            descendant_types |= segment.descendant_types
+        self.descendant_types = intern_types(descendant_types)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.type} {self.raw!r}>"
+
+    def get_type(self) -> str:
+        return self.type
+
+    def is_type(self, *seg_type: str) -> bool:
+        return not self.types.isdisjoint(seg_type)
+
+    def raw_normalized(self) -> str:
+        return self.raw if self.normalized is None else self.normalized
+
+    def recursive_crawl(self, *seg_type: str) -> Iterator[SegmentIR]:
+        if self.is_type(*seg_type):
+            yield self
+        if self.descendant_types.isdisjoint(seg_type):
+            return
+        for segment in self.segments:
+            yield from segment.recursive_crawl(*seg_type)
+
+
+class StatementIR(SegmentIR):
+    """A compact representation of a parsed statement.
+
+    It's much smaller than sqlfluff tree, picklable and is classified by the
+    same rules, so it can be cached and shipped to other processes.
+    """
+
+    __slots__ = ("_arrays",)
+
+    def __getstate__(self) -> Tuple[None, Dict[str, Any]]:
+        # The arrays are keyed by segments identity, so they're rebuilt after
+        # unpickling.
+        return None, {slot: getattr(self, slot) for slot in SegmentIR.__slots__}
+
+    @property
+    def arrays(self) -> SegmentArrays:
+        """Segments of the statement in arrays (see `SegmentArrays`), built
+        once.
+        """
+
+        arrays = getattr(self, "_arrays", None)
+        if arrays is None:
+            arrays = self._arrays = SegmentArrays(self)
+        return arrays
+
+    @property
+    def root_type(self) -> str:
+        """sqlfluff type of the statement, e.g. `alter_table_statement`."""
+
+        return self.segments[0].type if self.segments else self.type
+
+    @property
+    def text(self) -> str:
+        """Normalized statement text."""
+
+        return self.raw_normalized()
+
+    @property
+    def table(self) -> Optional[str]:
+        """The first table referenced by the statement (its target)."""
+
+        for segment in self.recursive_crawl("table_reference"):
+            return segment.raw_normalized()
+        return None
+
+    @property
+    def columns(self) -> List[str]:
+        """Columns referenced by the statement."""
+
+        return [
+            segment.raw_normalized()
+            for segment in self.recursive_crawl("column_reference")
+        ]
+
+    @property
+    def keywords(self) -> List[Tuple[int, str]]:
+        """Keywords of the statement with their offsets, in order."""
+
+        return [
+            (segment.pos_marker, segment.raw)
+            for segment in self.recursive_crawl("keyword")
+        ]
+
+    @property
+    def data_types(self) -> List[str]:
+        """Data types used in the statement."""
+
+        return [segment.raw for segment in self.recursive_crawl("data_type")]
+
+
+class SegmentArrays:
+    """Segments of a statement in parallel arrays (in the order of
+    `recursive_crawl`), so the locators are matched by scanning the arrays
+    instead of crawling the tree.
+
+    - `types` and `descendant_types` -- interned types of the segments and
+      their descendants;
+    - `ends` -- indexes right after the subtrees of the segments, so the
+      subtrees without the types looked for are skipped;
+    - `raws` -- raw SQL of the segments in upper case;
+    - `offsets` -- offsets of the segments in the statement;
+    - `segments` -- the segments, their indexes are looked up by the segment
+      identity in `indexes`.
+    """
+
+    __slots__ = (
+        "types",
+        "descendant_types",
+        "ends",
+        "raws",
+        "offsets",
+        "segments",
+        "indexes",
+    )
+
+    def __init__(self, statement: SegmentIR) -> None:
+        self.types: List[FrozenSet[str]] = []
+        self.descendant_types: List[FrozenSet[str]] = []
+        self.ends: List[int] = []
+        self.raws: List[str] = []
+        self.offsets: List[int] = []
+        self.segments: List[SegmentIR] = []
+        self.indexes: Dict[int, int] = {}
+        self.add(statement)
+
+    def add(self, segment: SegmentIR) -> None:
+        i = len(self.segments)
+        self.types.append(segment.types)
+        self.descendant_types.append(segment.descendant_types)
+        self.ends.append(i + 1)
+        self.raws.append(segment.raw.upper())
+        self.offsets.append(segment.pos_marker)
+        self.segments.append(segment)
+        self.indexes[id(segment)] = i
+        for child in segment.segments:
+            self.add(child)
+        self.ends[i] = len(self.segments)
+
+    def crawl(self, segment: SegmentIR, seg_type: str) -> Iterator[SegmentIR]:
+        """Iterate the segment (one of the statement segments) and its
+        descendants of the given type, like `recursive_crawl`.
+        """
+
+        i = self.indexes[id(segment)]
+        end = self.ends[i]
+        while i < end:
+            if seg_type in self.types[i]:
+                yield self.segments[i]
+            i = i + 1 if seg_type in self.descendant_types[i] else self.ends[i]
+
+    def find_keyword(
+        self,
+        segment: SegmentIR,
+        raw: Optional[str] = None,
+        min_position: Optional[int] = None,
+    ) -> Optional[SegmentIR]:
+        """Find the first keyword of the segment (one of the statement
+        segments) with the given raw SQL (in upper case) starting with the
+        given position.
+        """
+
+        i = self.indexes[id(segment)]
+        end = self.ends[i]
+        while i < end:
+            if (
+                "keyword" in self.types[i]
+                and (raw is None or self.raws[i] == raw)
+                and (min_position is None or self.offsets[i] >= min_position)
+            ):
+                return self.segments[i]
+            i = i + 1 if "keyword" in self.descendant_types[i] else self.ends[i]
+
+        return None
+
+    def keyword_raws(self) -> List[str]:
+        """Get raw SQL of the statement keywords in upper case."""
+
+        return [raw for raw, types in zip(self.raws, self.types) if "keyword" in types]
+
+
+# A statement, parsed by sqlfluff or represented compactly.
+Segment = Union[BaseSegment, SegmentIR]
+
+
+def locator_types(locators: Iterable[SegmentLocator]) -> FrozenSet[str]:
+    """Get all the segment types used by the locators."""
+
+    types = set()
+    for locator in locators:
+        types.add(locator.type)
+        types |= locator_types(locator.children or ())
+        if locator.only_with is not None:
+            types |= locator_types(
+                (locator.only_with.locator, locator.only_with.match_by)
+            )
+
+    return frozenset(types)
+
+
+def segment_types(segment: Segment) -> FrozenSet[str]:
+    """Get the types of the segment and all its descendants."""
+
+    if isinstance(segment, SegmentIR):
+        return segment.types | segment.descendant_types
+    return segment.class_types | segment.descendant_type_set
+
+
+def contains_type(segment: Segment, seg_type: str) -> bool:
+    """Check if the segment or one of its descendants is of the given type,
+    without crawling.
+    """
+
+    if isinstance(segment, SegmentIR):
+        return seg_type in segment.types or seg_type in segment.descendant_types
+    return segment.is_type(seg_type) or seg_type in segment.descendant_type_set
+
+
+def intern_types(types: AbstractSet[str]) -> FrozenSet[str]:
+    """Get the shared set of the given types."""
+
+    key = frozenset(types)
+    return _types_sets.setdefault(key, key)
+
+
+def statement_ir(statement: BaseSegment, types: AbstractSet[str]) -> StatementIR:
+    """Build a compact representation of the parsed statement, keeping the
+    segments of the given types.
+    """
+
+    assert statement.pos_marker is not None
+    return StatementIR(
+        statement.get_type(),
+        statement.raw,
+        statement.pos_marker.source_slice.start,
+        prune(statement.segments, types),
+        normalized=statement.raw_normalized(),
+        types=intern_types(statement.class_types & types | {statement.get_type()}),
+    )
+
+
+def prune(
+    segments: Iterable[BaseSegment],
+    types: AbstractSet[str],
+) -> List[SegmentIR]:
+    """Convert the segments of the given types, attaching their descendants
+    of the given types to them.
+    """
+
+    result = []
+    for segment in segments:
+        matched = segment.class_types & types
+        if not matched and segment.descendant_type_set.isdisjoint(types):
+            continue
+
+        children = prune(segment.segments, types)
+        if not matched:
+            result.extend(children)
+            continue
+
+        assert segment.pos_marker is not None
+        segment_types = intern_types(matched)
+        raw = segment.raw
+        normalized = segment.raw_normalized()
+        result.append(
+            SegmentIR(
+                segment.get_type(),
+                raw,
+                segment.pos_marker.source_slice.start,
+                children,
+                normalized=None if normalized == raw else normalized,
+                types=segment_types,
+            )
+        )
+
+    return result
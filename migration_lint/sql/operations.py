@@ -1,26 +1,118 @@
-from typing import Optional, List
+from __future__ import annotations
 
-from sqlfluff.core.parser import BaseSegment, PositionMarker
-from sqlfluff.dialects.dialect_ansi import StatementSegment
+from typing import Any, Dict, Hashable, Iterator, Optional, Sequence, Tuple
 
-from migration_lint.sql.model import SegmentLocator
+from migration_lint.sql.ir import (
+    SegmentArrays,
+    Segment,
+    SegmentIR,
+    StatementIR,
+    contains_type,
+)
+from migration_lint.sql.model import ConditionalMatch, SegmentLocator
+
+
+class MatchMemo:
+    """Results of `find_matching_segment` within a classification pass.
+
+    Results (found segments and misses alike) are kept by the segment and
+    locator identity and the position to match from. The memo keeps the
+    segments alive, so it must be dropped when the pass ends.
+    """
+
+    def __init__(self) -> None:
+        self.results: Dict[
+            Tuple[int, int, Hashable],
+            Tuple[Segment, SegmentLocator, Optional[Segment]],
+        ] = {}
+
+    def find(
+        self,
+        segment: Segment,
+        locator: SegmentLocator,
+        min_position: Optional[Any],
+        arrays: Optional[SegmentArrays],
+    ) -> Optional[Segment]:
+        """Find matching segment, reusing the results of the pass."""
+
+        if locator.ignore_order:
+            min_position = None
+        key = (
+            id(segment),
+            id(locator),
+            # NOTE: sqlfluff position markers aren't hashable.
+            getattr(min_position, "working_loc", min_position),
+        )
+        entry = self.results.get(key)
+        if entry is None or entry[0] is not segment or entry[1] is not locator:
+            found = _find_matching_segment(
+                segment, locator, min_position, None, arrays, self
+            )
+            entry = self.results[key] = (segment, locator, found)
+        return entry[2]
 
 
 def find_matching_segment(
-    segment: BaseSegment,
+    segment: Segment,
     locator: SegmentLocator,
-    min_position: Optional[PositionMarker] = None,
-    context: Optional[List[StatementSegment]] = None,
-) -> Optional[BaseSegment]:
+    min_position: Optional[Any] = None,
+    context: Optional[Sequence[Segment]] = None,
+    arrays: Optional[SegmentArrays] = None,
+    memo: Optional[MatchMemo] = None,
+) -> Optional[Segment]:
     """Find matching segment by the given locator starting with the given
     position.
+
+    Works with sqlfluff trees and compact statement representations (see
+    `migration_lint.sql.ir`) alike. Segments without descendants of the
+    locator type aren't crawled at all. Compact representations are matched
+    by scanning the arrays of their statement (`arrays`, the arrays of the
+    statement by default) instead of crawling. Results of crawling are
+    reused within the pass of `memo`, unless they depend on the context.
     """
 
-    for found in segment.recursive_crawl(locator.type):
+    if not contains_type(segment, locator.type):
+        return None
+
+    if arrays is None and isinstance(segment, StatementIR):
+        arrays = segment.arrays
+    if (
+        arrays is not None
+        and isinstance(segment, SegmentIR)
+        and locator.type == "keyword"
+        and not locator.children
+        and locator.only_with is None
+    ):
+        return arrays.find_keyword(
+            segment,
+            raw=locator.raw.upper() if locator.raw else None,
+            min_position=None if locator.ignore_order else min_position,
+        )
+
+    if memo is not None and not (locator.only_with and context):
+        return memo.find(segment, locator, min_position, arrays)
+
+    return _find_matching_segment(segment, locator, min_position, context, arrays, memo)
+
+
+def _find_matching_segment(
+    segment: Segment,
+    locator: SegmentLocator,
+    min_position: Optional[Any],
+    context: Optional[Sequence[Segment]],
+    arrays: Optional[SegmentArrays],
+    memo: Optional[MatchMemo],
+) -> Optional[Segment]:
+    crawl: Iterator[Segment]
+    if arrays is not None and isinstance(segment, SegmentIR):
+        crawl = arrays.crawl(segment, locator.type)
+    else:
+        crawl = segment.recursive_crawl(locator.type)
+    for found in crawl:
         if (
             not locator.ignore_order
-            and min_position
-            and found.pos_marker
+            and min_position is not None
+            and found.pos_marker is not None
             and found.pos_marker < min_position
         ):
             continue
@@ -36,6 +128,8 @@ def find_matching_segment(
                     segment=found,
                     locator=child_locator,
                     min_position=min_position,
+                    arrays=arrays,
+                    memo=memo,
                 )
                 if (
                     not child_locator.inverted
@@ -50,32 +144,64 @@ def find_matching_segment(
         # unsafe segment still can be safe if paired with specific
         only_with_match = locator.only_with is None
         if locator.only_with and context:
-            match_by_original = find_matching_segment(
-                segment, locator.only_with.match_by
+            only_with_match = match_context(
+                segment, locator.only_with, context, memo=memo
             )
-            for context_statement in context:
-                # searching in the same migration
-                found_context_segment = find_matching_segment(
-                    context_statement, locator.only_with.locator
-                )
-                if not found_context_segment:
-                    continue
-
-                # matching in context
-                # (for example checking table that being created
-                # is the same as being altered)
-                match_by_context = find_matching_segment(
-                    found_context_segment, locator.only_with.match_by
-                )
-                if (
-                    match_by_original
-                    and match_by_context
-                    and match_by_original.raw_normalized()
-                    == match_by_context.raw_normalized()
-                ):
-                    only_with_match = True
 
         if attrs_match and children_match and only_with_match:
             return found
 
     return None
+
+
+def match_context(
+    segment: Segment,
+    condition: ConditionalMatch,
+    context: Sequence[Segment],
+    memo: Optional[MatchMemo] = None,
+) -> bool:
+    """Check if the condition is met by one of the context statements."""
+
+    match_by_original = find_matching_segment(segment, condition.match_by, memo=memo)
+    if not match_by_original:
+        return False
+
+    for context_statement in context:
+        # searching in the same migration
+        found_context_segment = find_matching_segment(
+            context_statement, condition.locator, memo=memo
+        )
+        if not found_context_segment:
+            continue
+
+        # matching in context
+        # (for example checking table that being created
+        # is the same as being altered)
+        match_by_context = find_matching_segment(
+            found_context_segment, condition.match_by, memo=memo
+        )
+        if (
+            match_by_context
+            and match_by_original.raw_normalized() == match_by_context.raw_normalized()
+        ):
+            return True
+
+    return False
+
+
+def locator_key(locator: SegmentLocator) -> Hashable:
+    """Get a hashable key of the locator."""
+
+    return (
+        locator.type,
+        locator.raw,
+        tuple(locator_key(child) for child in locator.children or ()),
+        locator.inverted,
+        locator.ignore_order,
+        None
+        if locator.only_with is None
+        else (
+            locator_key(locator.only_with.locator),
+            locator_key(locator.only_with.match_by),
+        ),
+    )
@@ -1,11 +1,55 @@
-from typing import Tuple, Sequence, List
+from __future__ import annotations
 
-from sqlfluff.api.simple import get_simple_config
-from sqlfluff.core import Linter
+import dataclasses
+import hashlib
+import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterator,
+    Tuple,
+    Sequence,
+    List,
+    Optional,
+    Set,
+    Union,
+)
+
+from sqlfluff.core import FluffConfig, Lexer, Linter
+from sqlfluff.core.linter.common import ParsedVariant
+from sqlfluff.core.parser import BaseSegment
 from sqlfluff.dialects.dialect_ansi import StatementSegment
 
+from migration_lint.sql.backend import BaseParserBackend, ParserBackend
+from migration_lint.sql.bodies import body_ddl_statements
+from migration_lint.sql.budget import (
+    BUDGET_EXCEEDED,
+    DEFAULT_PARSE_MAX_DEPTH,
+    DEFAULT_PARSE_TIMEOUT,
+    ParseBudgetExceeded,
+    parse_budget,
+)
+from migration_lint.sql.cache import ClassificationCache, LRUCache
 from migration_lint.sql.constants import StatementType
-from migration_lint.sql.operations import find_matching_segment
+from migration_lint.sql.dialect import reduced_dialect
+from migration_lint.sql.fast_path import FastClassification, fast_classify
+from migration_lint.sql.fingerprint import Fingerprint, fingerprint, locator_words
+from migration_lint.sql.ir import (
+    Segment,
+    StatementIR,
+    locator_types,
+    segment_types,
+    statement_ir,
+)
+from migration_lint.sql.model import ConditionalMatch, SegmentLocator
+from migration_lint.sql.operations import MatchMemo, find_matching_segment
+from migration_lint.sql.payload import DEFAULT_PAYLOAD_MAX_ROWS, elide_payload
+from migration_lint.sql.prefilter import KeywordPrefilter
+from migration_lint.sql.stats import RuleOrderMismatch, RuleStats
 from migration_lint.sql.rules import (
     BACKWARD_INCOMPATIBLE_OPERATIONS,
     BACKWARD_COMPATIBLE_OPERATIONS,
@@ -13,40 +57,997 @@ from migration_lint.sql.rules import (
     RESTRICTED_OPERATIONS,
     IGNORED_OPERATIONS,
 )
+from migration_lint.sql.splitter import split_statements
+from migration_lint.sql.summary import ConditionKey, StatementSummary
+from migration_lint.sql.trie import RuleTrie
+
+# Default number of statements summaries kept by a session.
+DEFAULT_STATEMENTS_CACHE_SIZE = 4096
+
+# Number of migrations context indexes kept by a session.
+CONTEXTS_CACHE_SIZE = 16
+
+# Default minimal number of statements in a migration to parse it in parallel.
+DEFAULT_PARALLEL_MIN_STATEMENTS = 1000
+
+# Number of statement batches per worker process, so the work is spread
+# evenly when statements differ in complexity.
+BATCHES_PER_JOB = 4
+
+# Types of DDL statements from function bodies, which are reported.
+BODY_REPORTED_TYPES = (StatementType.BACKWARD_INCOMPATIBLE, StatementType.RESTRICTED)
+
+
+class ClassifierSession:
+    """A reusable classification session.
+
+    Holds a parse-only sqlfluff configuration (no lint rules, no templating)
+    and the classification rules, so they are built once and shared by all
+    the classified migrations.
+
+    Migrations are parsed statement by statement, statements summaries are
+    cached by their text, so the same statement is never parsed twice within
+    the session. Trivial statements aren't parsed at all if `fast_path` is
+    enabled (see `migration_lint.sql.fast_path`).
+
+    If `jobs` is greater than 1, migrations with at least
+    `parallel_min_statements` statements are parsed in a pool of `jobs`
+    worker processes, which return compact statement summaries (see
+    `migration_lint.sql.summary`) instead of parsed trees.
+
+    Data payload (long `VALUES` lists, `COPY` data) is elided before parsing
+    (see `migration_lint.sql.payload`), unless `payload_max_rows` is `None`.
+
+    Function and DO bodies are opaque for the rules. If `scan_bodies` is
+    enabled, they are shallowly scanned for DDL statements, and backward
+    incompatible or restricted ones are reported right after the statement
+    containing them (see `migration_lint.sql.bodies`).
+
+    Statements are parsed by the `backend` parser backend (see
+    `migration_lint.sql.backend`), falling back to sqlfluff for statements
+    not supported by it.
+
+    Parsed statements are classified by their compact representations (see
+    `migration_lint.sql.ir`), which keep only the segments used by the rules.
+
+    If `fingerprints` is enabled, classifications of statements, which don't
+    depend on the other statements, are also cached by their structural
+    fingerprints, so statements differing only in identifiers and literals
+    are parsed once (see `migration_lint.sql.fingerprint`).
+
+    Parsing of a single statement is limited by `parse_timeout` seconds and
+    `parse_max_depth` recursion depth (`None` for no limit), statements
+    exceeding the budget are unsupported (see `migration_lint.sql.budget`).
+
+    If `reduced_grammar` is enabled, statements are parsed by the dialect
+    reduced to the statements used by the rules first, falling back to the
+    full dialect for statements it can't parse, or for all the statements
+    if the dialect can't be reduced (see `migration_lint.sql.dialect`).
+
+    Rules of the same category are tried in the order of their hits counted
+    in the previous runs and persisted at `rule_stats_path`, if any (see
+    `migration_lint.sql.stats`). If `check_rule_order` is enabled, every
+    statement is also classified with the rules in the declaration order,
+    raising `RuleOrderMismatch` if the results differ. The fast path and the
+    statements and fingerprints caches are disabled then, so no statement
+    skips the check.
+    """
+
+    def __init__(
+        self,
+        dialect: str = "postgres",
+        statements_cache_size: int = DEFAULT_STATEMENTS_CACHE_SIZE,
+        fast_path: bool = True,
+        jobs: int = 1,
+        parallel_min_statements: int = DEFAULT_PARALLEL_MIN_STATEMENTS,
+        payload_max_rows: Optional[int] = DEFAULT_PAYLOAD_MAX_ROWS,
+        scan_bodies: bool = False,
+        backend: str = "sqlfluff",
+        fingerprints: bool = True,
+        parse_timeout: Optional[float] = DEFAULT_PARSE_TIMEOUT,
+        parse_max_depth: Optional[int] = DEFAULT_PARSE_MAX_DEPTH,
+        reduced_grammar: bool = True,
+        rule_stats_path: Optional[str] = None,
+        check_rule_order: bool = False,
+    ) -> None:
+        if check_rule_order:
+            fast_path = False
+            fingerprints = False
+            statements_cache_size = 0
+        self.dialect = dialect
+        # NOTE: the config is only used for parsing, the rule pack is never
+        # built, so no rules are configured.
+        self.config = FluffConfig(
+            overrides={"dialect": dialect, "templater": "raw"},
+        )
+        self.linter = Linter(config=self.config)
+        self.operations: Sequence[Tuple[StatementType, Sequence[SegmentLocator]]] = (
+            (StatementType.IGNORED, IGNORED_OPERATIONS),
+            (StatementType.DATA_MIGRATION, DATA_MIGRATION_OPERATIONS),
+            (StatementType.BACKWARD_COMPATIBLE, BACKWARD_COMPATIBLE_OPERATIONS),
+            (StatementType.BACKWARD_INCOMPATIBLE, BACKWARD_INCOMPATIBLE_OPERATIONS),
+            (StatementType.RESTRICTED, RESTRICTED_OPERATIONS),
+        )
+        self.context_types = {
+            locator.only_with.locator.type
+            for _, operations_locators in self.operations
+            for locator in operations_locators
+            if locator.only_with is not None
+        }
+        self.rules: List[Tuple[StatementType, SegmentLocator]] = [
+            (statement_type, locator)
+            for statement_type, operations_locators in self.operations
+            for locator in operations_locators
+        ]
+        self.rules_types = frozenset(locator.type for _, locator in self.rules)
+        self.rule_stats = RuleStats(len(self.rules), rule_stats_path)
+        # NOTE: the ranks are fixed for the session, so statements are
+        # classified the same way in the worker processes.
+        self.rules_ranks = self.rule_stats.ranks(
+            [
+                category
+                for category, (_, operations_locators) in enumerate(self.operations)
+                for _ in operations_locators
+            ]
+        )
+        self.check_rule_order = check_rule_order
+        self.rules_index: Dict[Tuple[FrozenSet[str], int], Tuple[int, ...]] = {}
+        self.prefilter = KeywordPrefilter([locator for _, locator in self.rules])
+        self.rules_trie = RuleTrie([locator for _, locator in self.rules])
+        self.conditions: List[ConditionalMatch] = []
+        # Indexes of the rules conditions in `conditions`.
+        self.rules_conditions: List[Optional[int]] = []
+        for _, locator in self.rules:
+            if locator.only_with is None:
+                self.rules_conditions.append(None)
+                continue
+            self.rules_conditions.append(len(self.conditions))
+            self.conditions.append(locator.only_with)
+        self.ir_types = locator_types(
+            locator
+            for _, operations_locators in self.operations
+            for locator in operations_locators
+        ) | {"column_reference"}
+        self.reduced_grammar = reduced_grammar
+        self.reduced_linter: Optional[Linter] = None
+        reduced_dialect_obj = (
+            reduced_dialect(dialect, self.ir_types) if reduced_grammar else None
+        )
+        if reduced_dialect_obj is not None:
+            reduced_config = self.config.copy()
+            # NOTE: `FluffConfig.set_value` coerces values to strings and
+            # numbers, so the dialect object is set directly.
+            reduced_config._configs["core"]["dialect_obj"] = reduced_dialect_obj
+            self.reduced_linter = Linter(config=reduced_config)
+        self.lexer = Lexer(config=self.config)
+        self.fast_path = fast_path
+        self.jobs = jobs
+        self.parallel_min_statements = parallel_min_statements
+        self.payload_max_rows = payload_max_rows
+        self.scan_bodies = scan_bodies
+        self.backend = backend
+        self.backends: List[BaseParserBackend] = [ParserBackend.get(backend)(self)]
+        if backend != "sqlfluff":
+            self.backends.append(ParserBackend.get("sqlfluff")(self))
+        self.statements_cache: LRUCache[List[StatementSummary]] = LRUCache(
+            statements_cache_size
+        )
+        self.fingerprints = fingerprints
+        self.parse_timeout = parse_timeout
+        self.parse_max_depth = parse_max_depth
+        dialect_obj = self.config.get("dialect_obj")
+        self.fingerprint_words = (
+            dialect_obj.sets("unreserved_keywords")
+            | dialect_obj.sets("reserved_keywords")
+            | locator_words(
+                locator
+                for _, operations_locators in self.operations
+                for locator in operations_locators
+            )
+        )
+        self.shapes_cache: LRUCache[
+            Tuple[
+                Tuple[Tuple[StatementType, Optional[ConditionKey]], ...],
+                Dict[int, bool],
+            ]
+        ] = LRUCache(statements_cache_size)
+        self.contexts_cache: LRUCache[FrozenSet[ConditionKey]] = LRUCache(
+            CONTEXTS_CACHE_SIZE
+        )
 
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Sessions are shipped to worker processes by their settings only,
+        # workers never start nested pools.
+        return (
+            ClassifierSession,
+            (
+                self.dialect,
+                self.statements_cache.max_size,
+                self.fast_path,
+                1,
+                self.parallel_min_statements,
+                self.payload_max_rows,
+                self.scan_bodies,
+                self.backend,
+                self.fingerprints,
+                self.parse_timeout,
+                self.parse_max_depth,
+                self.reduced_grammar,
+                self.rule_stats.path,
+                self.check_rule_order,
+            ),
+        )
+
+    def parse(self, raw_sql: str) -> BaseSegment:
+        """Parse SQL into a sqlfluff tree."""
+
+        if self.reduced_linter is not None:
+            parsed = render_and_parse(self.reduced_linter, raw_sql)
+            if (
+                parsed
+                and parsed.tree
+                and next(parsed.tree.recursive_crawl("unparsable"), None) is None
+            ):
+                return parsed.tree
+
+        parsed = render_and_parse(self.linter, raw_sql)
+        if not parsed or not parsed.tree:
+            raise RuntimeError(f"Can't parse SQL from string: {raw_sql}")
+
+        unparsable_parts = [part for part in parsed.tree.recursive_crawl("unparsable")]
+        if unparsable_parts:
+            errors = [
+                str(e.description)
+                for e in parsed.lexing_violations + parsed.parsing_violations
+            ]
+            raise RuntimeError(
+                f"Can't parse SQL from string: {raw_sql}\n"
+                f"Errors: \n" + "\n- ".join(errors)
+            )
 
-def classify_migration(raw_sql: str) -> Sequence[Tuple[str, StatementType]]:
-    """Classify migration statements."""
+        return parsed.tree
+
+    def parse_statement(self, raw_sql: str) -> List[BaseSegment]:
+        """Parse a single SQL statement by the first backend supporting it."""
+
+        for backend in self.backends:
+            statements = backend.parse_statement(raw_sql)
+            if statements is not None:
+                return statements
 
-    linter = Linter(config=get_simple_config(dialect="postgres"))
-    result = linter.parse_string(raw_sql)
-    parsed = result.root_variant()
-    if not parsed or not parsed.tree:
         raise RuntimeError(f"Can't parse SQL from string: {raw_sql}")
 
-    unparsable_parts = [part for part in parsed.tree.recursive_crawl("unparsable")]
-    if not parsed or unparsable_parts:
-        errors = [
-            str(e.description)
-            for e in parsed.lexing_violations + parsed.parsing_violations
+    def parse_statement_ir(self, raw_sql: str) -> List[StatementIR]:
+        """Parse a single SQL statement into compact representations within
+        the parse budget.
+        """
+
+        with parse_budget(self.parse_timeout, self.parse_max_depth):
+            return [
+                statement
+                if isinstance(statement, StatementIR)
+                else statement_ir(statement, self.ir_types)
+                for statement in self.parse_statement(raw_sql)
+            ]
+
+    def fast_classify(self, raw_sql: str) -> Optional[FastClassification]:
+        """Classify a single statement by the fast path, if enabled."""
+
+        return fast_classify(self.lexer, raw_sql) if self.fast_path else None
+
+    def fingerprint(self, raw_sql: str) -> Optional[Fingerprint]:
+        """Get fingerprint of a single statement
+        (see `migration_lint.sql.fingerprint`).
+        """
+
+        return fingerprint(self.lexer, raw_sql, self.fingerprint_words)
+
+    def classify_migration(
+        self,
+        raw_sql: str,
+        unparsable: Optional[List[StatementSummary]] = None,
+    ) -> List[Tuple[str, StatementType]]:
+        """Classify migration statements (see `iter_classify_migration`)."""
+
+        return list(self.iter_classify_migration(raw_sql, unparsable))
+
+    def iter_classify_migration(
+        self,
+        raw_sql: str,
+        unparsable: Optional[List[StatementSummary]] = None,
+    ) -> Iterator[Tuple[str, StatementType]]:
+        """Classify migration statements, yielding results as soon as they are
+        known.
+
+        Trivial statements are classified by the fast path, the rest are parsed
+        and summarized (see `StatementSummary`), so parsed trees are dropped
+        right away. A statement matching an `only_with` rule is held back until
+        the condition is met by one of the following statements or the
+        migration ends, all the following results are held back as well to
+        keep the order.
+
+        If `unparsable` is given, summaries of the statements that can't be
+        parsed are collected there (see `is_cacheable`).
+        """
+
+        context: Set[ConditionKey] = set()
+        pending: Deque[Union[StatementSummary, Tuple[str, StatementType]]] = deque()
+        for statement_sql, summaries in self.iter_summaries(raw_sql):
+            for summary in summaries:
+                context.update(summary.context)
+                pending.append(summary)
+                if unparsable is not None and summary.unparsable:
+                    unparsable.append(summary)
+            pending.extend(self.classify_body(statement_sql))
+
+            while pending:
+                item = pending[0]
+                if isinstance(item, StatementSummary):
+                    statement_type = item.decided_type(context)
+                    if statement_type is None:
+                        break
+                    item = (item.text, statement_type)
+                pending.popleft()
+                if item[1] != StatementType.IGNORED:
+                    yield item
+
+        for item in pending:
+            if isinstance(item, StatementSummary):
+                item = (item.text, item.classify(context))
+            if item[1] != StatementType.IGNORED:
+                yield item
+
+    def iter_summaries(
+        self, raw_sql: str
+    ) -> Iterator[Tuple[str, List[StatementSummary]]]:
+        """Summarize migration statements chunk by chunk.
+
+        Yields SQL of each chunk with its statements summaries. Chunks that
+        can't be parsed are summarized as unsupported statements with their
+        location, so the rest of the migration is still classified.
+        """
+
+        if self.payload_max_rows is not None:
+            raw_sql = elide_payload(raw_sql, self.payload_max_rows)
+
+        chunks = split_statements(raw_sql)
+        if self.jobs > 1 and len(chunks) >= self.parallel_min_statements:
+            yield from self.iter_summaries_parallel(raw_sql, chunks)
+            return
+
+        fast_results = [self.fast_classify(chunk) for chunk in chunks]
+        needs_context = None in fast_results
+
+        pos = 0
+        for chunk, fast_result in zip(chunks, fast_results):
+            pos = raw_sql.index(chunk, pos)
+            summaries = self.summarize_chunk(chunk, fast_result, needs_context)
+            yield chunk, locate_unparsable(summaries, raw_sql, pos, chunk)
+            pos += len(chunk)
+
+    def iter_summaries_parallel(
+        self,
+        raw_sql: str,
+        chunks: List[str],
+    ) -> Iterator[Tuple[str, List[StatementSummary]]]:
+        """Summarize migration statements in a pool of worker processes.
+
+        Workers summarize statements by batches, results are yielded in order
+        as soon as the batches are done.
+        """
+
+        batch_size = math.ceil(len(chunks) / (self.jobs * BATCHES_PER_JOB))
+        batches = [
+            chunks[i : i + batch_size] for i in range(0, len(chunks), batch_size)
         ]
-        raise RuntimeError(
-            f"Can't parse SQL from string: {raw_sql}\n"
-            f"Errors: \n" + "\n- ".join(errors)
+        with ProcessPoolExecutor(
+            max_workers=min(self.jobs, len(batches)),
+            initializer=_init_worker,
+            initargs=(self,),
+        ) as executor:
+            pos = 0
+            for batch, (batch_summaries, hits) in zip(
+                batches, executor.map(_summarize_chunks, batches)
+            ):
+                self.rule_stats.merge(hits)
+                for chunk, summaries in zip(batch, batch_summaries):
+                    pos = raw_sql.index(chunk, pos)
+                    yield chunk, locate_unparsable(summaries, raw_sql, pos, chunk)
+                    pos += len(chunk)
+
+    def classify_body(self, raw_sql: str) -> List[Tuple[str, StatementType]]:
+        """Classify DDL statements from function or DO bodies of a statement,
+        if `scan_bodies` is enabled.
+
+        Only backward incompatible and restricted statements are returned,
+        the ones that can't be parsed are skipped.
+        """
+
+        if not self.scan_bodies:
+            return []
+
+        statements_types: List[Tuple[str, StatementType]] = []
+        for ddl_statement in body_ddl_statements(raw_sql):
+            try:
+                statements = self.parse_statement_ir(ddl_statement)
+            except RuntimeError:
+                continue
+            statements_types.extend(
+                (text, statement_type)
+                for text, statement_type in self.classify_statements(
+                    statements, context=statements
+                )
+                if statement_type in BODY_REPORTED_TYPES
+            )
+
+        return statements_types
+
+    def summarize_chunk(
+        self,
+        raw_sql: str,
+        fast_result: Optional[FastClassification],
+        needs_context: bool = True,
+    ) -> List[StatementSummary]:
+        """Summarize statements of a single chunk of migration SQL.
+
+        Statements classified by the fast path are still parsed if
+        `needs_context` is set and they may be a context for other statements.
+        A chunk that can't be parsed is summarized as a single unparsable
+        statement. Summaries of parsed statements are cached by their text,
+        context-free ones also by their fingerprints.
+        """
+
+        if fast_result is not None and not (
+            needs_context and fast_result.root_type in self.context_types
+        ):
+            return [
+                StatementSummary(
+                    text=fast_result.text,
+                    candidates=((fast_result.statement_type, None),),
+                )
+            ]
+
+        key = raw_sql.strip()
+        summaries = self.statements_cache.get(key)
+        if summaries is not None:
+            return summaries
+
+        fingerprinted = self.fingerprint(key) if self.fingerprints else None
+        shaped = None
+        if fingerprinted is not None:
+            shaped = self.shapes_cache.get(fingerprinted.shape)
+            if shaped is not None:
+                candidates, shape_case = shaped
+                text = fingerprinted.text(shape_case)
+                if text is not None:
+                    summaries = [StatementSummary(text=text, candidates=candidates)]
+                    self.statements_cache.set(key, summaries)
+                    return summaries
+
+        try:
+            statements = self.parse_statement_ir(key)
+        except ParseBudgetExceeded:
+            summaries = [
+                StatementSummary(
+                    text=key,
+                    candidates=(),
+                    unparsable=True,
+                    reason=BUDGET_EXCEEDED,
+                )
+            ]
+        except RuntimeError:
+            summaries = [StatementSummary(text=key, candidates=(), unparsable=True)]
+        else:
+            summaries = [
+                self.summarize_statement(statement) for statement in statements
+            ]
+        self.statements_cache.set(key, summaries)
+
+        if (
+            fingerprinted is not None
+            and len(summaries) == 1
+            and summaries[0].is_context_free()
+        ):
+            case = fingerprinted.case(summaries[0].text)
+            if case is not None:
+                if shaped is not None:
+                    # The case of other tokens is known by the previous ones.
+                    case = {**shaped[1], **case}
+                self.shapes_cache.set(
+                    fingerprinted.shape, (summaries[0].candidates, case)
+                )
+
+        return summaries
+
+    def summarize_statement(self, statement: Segment) -> StatementSummary:
+        """Summarize a parsed statement for the classification without its
+        tree (see `StatementSummary`).
+        """
+
+        memo = MatchMemo()
+        candidates = self.candidate_rules(statement)
+        matched = self.match_candidates(statement, candidates, memo)
+        summary_candidates = tuple(
+            (self.rules[rule_index][0], condition_key)
+            for rule_index, condition_key in matched
+        )
+        if self.check_rule_order and summary_candidates != tuple(
+            (self.rules[rule_index][0], condition_key)
+            for rule_index, condition_key in self.match_candidates(
+                statement, tuple(sorted(candidates)), memo
+            )
+        ):
+            raise RuleOrderMismatch(f"Rules order changes summary of: {statement.raw}")
+        for rule_index, _ in matched:
+            self.rule_stats.hit(rule_index)
+
+        return StatementSummary(
+            text=statement.raw_normalized(),
+            candidates=summary_candidates,
+            context=self.statement_context(statement, memo),
+        )
+
+    def match_candidates(
+        self,
+        statement: Segment,
+        candidates: Sequence[int],
+        memo: Optional[MatchMemo] = None,
+    ) -> List[Tuple[int, Optional[ConditionKey]]]:
+        """Get indexes of the candidate rules matching the statement up to
+        the first unconditional one, with the condition keys they require, in
+        the declaration order.
+
+        Conditional rules of the same category as the unconditional one are
+        dropped, as they don't change the classification, so the statement
+        types and the condition keys don't depend on the order of the rules
+        within the categories.
+        """
+
+        matched: List[Tuple[int, Optional[ConditionKey]]] = []
+        matcher = self.rules_trie.matcher(statement, memo)
+        for rule_index in candidates:
+            if not matcher.matches(rule_index):
+                continue
+            condition_index = self.rules_conditions[rule_index]
+            if condition_index is None:
+                statement_type = self.rules[rule_index][0]
+                matched = [
+                    (i, condition_key)
+                    for i, condition_key in matched
+                    if self.rules[i][0] != statement_type
+                ]
+                matched.append((rule_index, None))
+                break
+            condition_key = self.condition_key(statement, condition_index, memo)
+            if condition_key is not None:
+                matched.append((rule_index, condition_key))
+
+        matched.sort(key=lambda match: match[0])
+        return matched
+
+    def condition_key(
+        self,
+        statement: Segment,
+        condition_index: int,
+        memo: Optional[MatchMemo] = None,
+    ) -> Optional[ConditionKey]:
+        """Get the key of the condition required by the statement, if its
+        `match_by` locator matches.
+        """
+
+        match_by = find_matching_segment(
+            statement, self.conditions[condition_index].match_by, memo=memo
+        )
+        if not match_by:
+            return None
+        return condition_index, match_by.raw_normalized()
+
+    def statement_context(
+        self, statement: Segment, memo: Optional[MatchMemo] = None
+    ) -> FrozenSet[ConditionKey]:
+        """Get the condition keys provided by the statement to the other
+        statements of the same migration.
+        """
+
+        context = set()
+        for condition_index, condition in enumerate(self.conditions):
+            found_context_segment = find_matching_segment(
+                statement, condition.locator, memo=memo
+            )
+            if not found_context_segment:
+                continue
+            match_by_context = find_matching_segment(
+                found_context_segment, condition.match_by, memo=memo
+            )
+            if match_by_context:
+                context.add((condition_index, match_by_context.raw_normalized()))
+
+        return frozenset(context)
+
+    def context_keys(
+        self,
+        context: Sequence[Segment],
+        digest: Optional[str] = None,
+        memo: Optional[MatchMemo] = None,
+    ) -> FrozenSet[ConditionKey]:
+        """Get the condition keys provided by all the statements of the
+        migration, so conditions are checked by lookups.
+
+        The keys are built once per migration and cached by the digest of
+        its statements (see `context_digest`). They're only used to classify
+        statements with an explicit context (`classify_statement` and function
+        bodies scan), summaries collect the same keys statement by statement
+        (see `summarize_statement`).
+        """
+
+        if digest is None:
+            digest = context_digest(context)
+        keys = self.contexts_cache.get(digest)
+        if keys is None:
+            keys = frozenset().union(
+                *(self.statement_context(statement, memo) for statement in context)
+            )
+            self.contexts_cache.set(digest, keys)
+
+        return keys
+
+    def save_rule_stats(self) -> None:
+        """Persist hit counts of the rules for the following runs."""
+
+        self.rule_stats.save()
+
+    def cache_stats(self) -> Dict[str, Tuple[int, int]]:
+        """Get hits and misses of the session caches by their names."""
+
+        return {
+            name: (cache.hits, cache.misses)
+            for name, cache in (
+                ("statements", self.statements_cache),
+                ("fingerprints", self.shapes_cache),
+            )
+        }
+
+    def classify_statements(
+        self,
+        statements: Sequence[Segment],
+        context: Sequence[Segment],
+    ) -> List[Tuple[str, StatementType]]:
+        """Classify parsed statements, skipping the ignored ones.
+
+        Matching results are reused within the call (see `MatchMemo`).
+        """
+
+        digest = context_digest(context)
+        memo = MatchMemo()
+        statements_types: List[Tuple[str, StatementType]] = []
+        for statement in statements:
+            statement_type = self.classify_statement(
+                statement, context=context, digest=digest, memo=memo
+            )
+            if statement_type == StatementType.IGNORED:
+                continue
+            statements_types.append((statement.raw_normalized(), statement_type))
+
+        return statements_types
+
+    def classify_statement(
+        self,
+        statement: Segment,
+        context: Sequence[Segment],
+        digest: Optional[str] = None,
+        memo: Optional[MatchMemo] = None,
+    ) -> StatementType:
+        """
+        Classify an SQL statement using predefined locators.
+        `only_with` conditions are looked up in the condition keys of the
+        context (see `context_keys`).
+        :param statement: statement to classify (sqlfluff tree or its compact
+            representation)
+        :param context: all statements in the same migration
+        :param digest: precomputed digest of the context
+        :param memo: matching results of the classification pass
+        :return:
+        """
+
+        candidates = self.candidate_rules(statement)
+        rule_index = self.match_rule(statement, context, candidates, digest, memo)
+        statement_type = (
+            StatementType.UNSUPPORTED
+            if rule_index is None
+            else self.rules[rule_index][0]
         )
+        if self.check_rule_order:
+            expected_index = self.match_rule(
+                statement, context, tuple(sorted(candidates)), digest, memo
+            )
+            if statement_type != (
+                StatementType.UNSUPPORTED
+                if expected_index is None
+                else self.rules[expected_index][0]
+            ):
+                raise RuleOrderMismatch(
+                    f"Rules order changes classification of: {statement.raw}"
+                )
+        if rule_index is not None:
+            self.rule_stats.hit(rule_index)
+
+        return statement_type
+
+    def match_rule(
+        self,
+        statement: Segment,
+        context: Sequence[Segment],
+        candidates: Sequence[int],
+        digest: Optional[str] = None,
+        memo: Optional[MatchMemo] = None,
+    ) -> Optional[int]:
+        """Get index of the first candidate rule matching the statement."""
+
+        matcher = self.rules_trie.matcher(statement, memo)
+        for rule_index in candidates:
+            if not matcher.matches(rule_index):
+                continue
+            condition_index = self.rules_conditions[rule_index]
+            if condition_index is None:
+                return rule_index
+            if not context:
+                continue
+            condition_key = self.condition_key(statement, condition_index, memo)
+            if condition_key is not None and condition_key in self.context_keys(
+                context, digest, memo
+            ):
+                return rule_index
+
+        return None
+
+    def candidate_rules(self, statement: Segment) -> Tuple[int, ...]:
+        """Get indexes of the rules (see `rules`), which may match the
+        statement, in the order to try them in (see `rules_ranks`).
+
+        A locator only matches a statement containing a segment of its type
+        and all the keywords it requires (see `KeywordPrefilter`), so the
+        rules are indexed by the locator types and the required keywords
+        present in the statement. Statements of the same type and keywords
+        (e.g. all `CREATE INDEX CONCURRENTLY` statements) share the same
+        candidates.
+        """
+
+        types = segment_types(statement) & self.rules_types
+        mask = self.prefilter.statement_mask(statement)
+        candidates = self.rules_index.get((types, mask))
+        if candidates is None:
+            candidates = tuple(
+                sorted(
+                    (
+                        i
+                        for i, (_, locator) in enumerate(self.rules)
+                        if locator.type in types and self.prefilter.may_match(i, mask)
+                    ),
+                    key=self.rules_ranks.__getitem__,
+                )
+            )
+            self.rules_index[types, mask] = candidates
+
+        return candidates
+
+
+_default_session: Optional[ClassifierSession] = None
+
+
+def get_default_session() -> ClassifierSession:
+    """Get the classification session shared within the process."""
+
+    global _default_session
+    if _default_session is None:
+        _default_session = ClassifierSession()
+    return _default_session
+
+
+def classify_migration(
+    raw_sql: str,
+    cache: Optional[ClassificationCache] = None,
+    session: Optional[ClassifierSession] = None,
+) -> Sequence[Tuple[str, StatementType]]:
+    """Classify migration statements.
+
+    If `cache` is given, the result is taken from it when possible, otherwise
+    the classification result is stored there. If `session` isn't given, the
+    default one is used.
+    """
+
+    if cache is not None:
+        cached = cache.get(raw_sql)
+        if cached is not None:
+            return cached
+
+    unparsable: List[StatementSummary] = []
+    statements_types = (session or get_default_session()).classify_migration(
+        raw_sql, unparsable
+    )
+
+    if cache is not None and is_cacheable(unparsable):
+        cache.set(raw_sql, statements_types)
+
+    return statements_types
+
+
+def iter_classify_migration(
+    raw_sql: str,
+    cache: Optional[ClassificationCache] = None,
+    session: Optional[ClassifierSession] = None,
+) -> Iterator[Tuple[str, StatementType]]:
+    """Classify migration statements, yielding results as soon as they are
+    known (see `ClassifierSession.iter_classify_migration`).
+
+    If `cache` is given, results are taken from it when possible, otherwise
+    they are stored there once the migration is classified completely. If
+    `session` isn't given, the default one is used.
+    """
+
+    if cache is not None:
+        cached = cache.get(raw_sql)
+        if cached is not None:
+            yield from cached
+            return
 
-    statements = []
     statements_types = []
-    for statement in parsed.tree.recursive_crawl("statement"):
-        statements.append(statement)
+    unparsable: List[StatementSummary] = []
+    for statement_type in (session or get_default_session()).iter_classify_migration(
+        raw_sql, unparsable
+    ):
+        statements_types.append(statement_type)
+        yield statement_type
+
+    if cache is not None and is_cacheable(unparsable):
+        cache.set(raw_sql, statements_types)
+
 
-    for statement in statements:
-        statement_type = classify_statement(statement, context=statements)  # type: ignore
-        if statement_type == StatementType.IGNORED:
+def classify_migrations(
+    raw_sqls: Sequence[str],
+    cache: Optional[ClassificationCache] = None,
+    session: Optional[ClassifierSession] = None,
+    jobs: int = 1,
+    return_exceptions: bool = False,
+) -> List[Union[Sequence[Tuple[str, StatementType]], Exception]]:
+    """Classify several migrations, in a pool of `jobs` worker processes if
+    `jobs` is greater than 1.
+
+    Results are returned in the order of the given migrations. If
+    `return_exceptions` is set, classification errors are returned in place of
+    results instead of being raised.
+    """
+
+    results: List[Any] = [None] * len(raw_sqls)
+    pending = []
+    for i, raw_sql in enumerate(raw_sqls):
+        cached = cache.get(raw_sql) if cache is not None else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    session = session or get_default_session()
+    pending_sqls = [raw_sqls[i] for i in pending]
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(pending)),
+            initializer=_init_worker,
+            initargs=(session,),
+        ) as executor:
+            classified = []
+            for result, hits in executor.map(_classify_in_worker, pending_sqls):
+                session.rule_stats.merge(hits)
+                classified.append(result)
+    else:
+        classified = [_classify_safely(raw_sql, session) for raw_sql in pending_sqls]
+
+    for i, result in zip(pending, classified):
+        if isinstance(result, Exception):
+            if not return_exceptions:
+                raise result
+            results[i] = result
             continue
-        statements_types.append((statement.raw_normalized(), statement_type))
+        statements_types, cacheable = result
+        if cache is not None and cacheable:
+            cache.set(raw_sqls[i], statements_types)
+        results[i] = statements_types
 
-    return statements_types
+    return results
+
+
+def _init_worker(session: ClassifierSession) -> None:
+    # The session is unpickled here, so the dialect is loaded once per worker.
+    # Rule hits of the previous runs are already counted by the parent, so
+    # workers return only the new ones with their results.
+    global _default_session
+    session.rule_stats.take()
+    _default_session = session
+
+
+def is_cacheable(unparsable: Sequence[StatementSummary]) -> bool:
+    """Check if the classification result may be cached by the summaries of
+    its unparsable statements, i.e. there are no statements exceeding the parse
+    budget, which depends on the machine.
+    """
+
+    return not any(summary.reason == BUDGET_EXCEEDED for summary in unparsable)
+
+
+def locate_unparsable(
+    summaries: List[StatementSummary],
+    raw_sql: str,
+    pos: int,
+    chunk: str,
+) -> List[StatementSummary]:
+    """Add location of the chunk at the given position of migration SQL to
+    the text of unparsable statements.
+    """
+
+    if not any(summary.unparsable for summary in summaries):
+        return summaries
+
+    line = raw_sql.count("\n", 0, pos + len(chunk) - len(chunk.lstrip())) + 1
+    return [
+        dataclasses.replace(
+            summary, text=f"{summary.text} (line {line}, {summary.reason})"
+        )
+        if summary.unparsable
+        else summary
+        for summary in summaries
+    ]
+
+
+def render_and_parse(linter: Linter, raw_sql: str) -> Optional[ParsedVariant]:
+    """Parse SQL by the linter, returning the root variant."""
+
+    # NOTE: `Linter.parse_string` copies the config on every call, which
+    # costs more than parsing itself, so render and parse directly.
+    rendered = linter.render_string(raw_sql, "<string>", linter.config, "utf-8")
+    return linter.parse_rendered(rendered).root_variant()
+
+
+def context_digest(context: Sequence[Segment]) -> str:
+    """Get a digest of the statements of a migration."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    for statement in context:
+        digest.update(statement.raw.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _summarize_chunks(
+    chunks: List[str],
+) -> Tuple[List[List[StatementSummary]], List[int]]:
+    # Returns the summaries with the rule hits counted for them.
+    session = get_default_session()
+    summaries = [
+        session.summarize_chunk(chunk, session.fast_classify(chunk)) for chunk in chunks
+    ]
+    return summaries, session.rule_stats.take()
+
+
+def _classify_safely(
+    raw_sql: str,
+    session: Optional[ClassifierSession] = None,
+) -> Union[Tuple[List[Tuple[str, StatementType]], bool], Exception]:
+    # Returns the result with its cacheability, see `is_cacheable`.
+    unparsable: List[StatementSummary] = []
+    try:
+        statements_types = (session or get_default_session()).classify_migration(
+            raw_sql, unparsable
+        )
+    except Exception as e:
+        return e
+    return statements_types, is_cacheable(unparsable)
+
+
+def _classify_in_worker(
+    raw_sql: str,
+) -> Tuple[Union[Tuple[List[Tuple[str, StatementType]], bool], Exception], List[int]]:
+    # Returns the result of `_classify_safely` with the rule hits counted for it.
+    result = _classify_safely(raw_sql)
+    return result, get_default_session().rule_stats.take()
 
 
 def classify_statement(
@@ -59,22 +1060,4 @@ def classify_statement(
     :return:
     """
 
-    statement_operations_map = {
-        StatementType.IGNORED: IGNORED_OPERATIONS,
-        StatementType.DATA_MIGRATION: DATA_MIGRATION_OPERATIONS,
-        StatementType.BACKWARD_COMPATIBLE: BACKWARD_COMPATIBLE_OPERATIONS,
-        StatementType.BACKWARD_INCOMPATIBLE: BACKWARD_INCOMPATIBLE_OPERATIONS,
-        StatementType.RESTRICTED: RESTRICTED_OPERATIONS,
-    }
-
-    for statement_type, operations_locators in statement_operations_map.items():
-        for locator in operations_locators:
-            found_segment = find_matching_segment(
-                segment=statement,
-                locator=locator,
-                context=context,
-            )
-            if found_segment:
-                return statement_type
-
-    return StatementType.UNSUPPORTED
+    return get_default_session().classify_statement(statement, context)
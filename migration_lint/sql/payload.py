@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Tuple
+
+from migration_lint.sql.fast_path import NESTED_STATEMENT_KEYWORDS
+from migration_lint.sql.splitter import TOKEN_RE, is_blank, skip_block_comment
+
+# Default maximal number of `VALUES` rows kept as is.
+DEFAULT_PAYLOAD_MAX_ROWS = 10
+
+PAYLOAD_HINT_RE = re.compile(r"VALUES|COPY", re.IGNORECASE)
+
+# End of `COPY ... FROM stdin` data (see psql docs).
+COPY_DATA_END_RE = re.compile(r"^\\\.[ \t\r]*(?:\n|$)", re.MULTILINE)
+
+Token = Tuple[str, int, int]
+
+
+def elide_payload(raw_sql: str, max_rows: int = DEFAULT_PAYLOAD_MAX_ROWS) -> str:
+    """Elide data payload from SQL, which isn't inspected by the rules.
+
+    - `VALUES` lists with more than `max_rows` rows are truncated to the first
+      row preceded by a `/* N more rows */` comment (so it's kept in the
+      statement text); lists which rows may contain nested statements are
+      kept as is;
+    - `COPY ... FROM stdin` data is removed.
+
+    Line breaks of the elided payload are kept after the statement, so line
+    numbers of the following statements don't change.
+    """
+
+    if not PAYLOAD_HINT_RE.search(raw_sql):
+        return raw_sql
+
+    parts = []
+    last = pos = 0
+    depth = 0
+    statement_start = True
+    is_copy = from_stdin = False
+    elided_lines = 0
+    while True:
+        token = next_token(raw_sql, pos)
+        if token is None:
+            break
+
+        value, _, end = token
+        word = value.upper()
+        pos = end
+        if value == ";":
+            if elided_lines:
+                parts.append(raw_sql[last:end])
+                parts.append("\n" * elided_lines)
+                last = end
+                elided_lines = 0
+            if is_copy and from_stdin:
+                data_start = raw_sql.find("\n", end)
+                data_start = len(raw_sql) if data_start == -1 else data_start + 1
+                match = COPY_DATA_END_RE.search(raw_sql, data_start)
+                data_end = match.end() if match else len(raw_sql)
+                parts.append(raw_sql[last:data_start])
+                parts.append("\n" * raw_sql.count("\n", data_start, data_end))
+                last = pos = data_end
+            depth = 0
+            statement_start = True
+            is_copy = from_stdin = False
+            continue
+
+        if value == "(":
+            depth += 1
+        elif value == ")":
+            depth -= 1
+        elif word == "COPY" and statement_start:
+            is_copy = True
+        elif word == "STDIN" and is_copy:
+            from_stdin = True
+        elif word == "VALUES" and depth == 0:
+            rows = scan_rows(raw_sql, end)
+            if len(rows) > max_rows and not any(nested for *_, nested in rows[1:]):
+                first_start, first_end, _ = rows[0]
+                parts.append(raw_sql[last:first_start])
+                parts.append(f"/* {len(rows) - 1} more rows */ ")
+                parts.append(raw_sql[first_start:first_end])
+                last = pos = rows[-1][1]
+                elided_lines += raw_sql.count("\n", first_end, last)
+        statement_start = False
+
+    parts.append(raw_sql[last:])
+    parts.append("\n" * elided_lines)
+
+    return "".join(parts)
+
+
+def scan_rows(raw_sql: str, pos: int) -> List[Tuple[int, int, bool]]:
+    """Scan `VALUES` rows starting at the given position.
+
+    Returns the start and end positions of each row and whether the row may
+    contain a nested statement.
+    """
+
+    rows = []
+    while True:
+        token = next_token(raw_sql, pos)
+        if token is None or token[0] != "(" or not is_blank(raw_sql[pos : token[1]]):
+            break
+
+        row = scan_row(raw_sql, token[2])
+        if row is None:
+            break
+        pos, nested = row
+        rows.append((token[1], pos, nested))
+
+        token = next_token(raw_sql, pos)
+        if token is None or token[0] != "," or not is_blank(raw_sql[pos : token[1]]):
+            break
+        pos = token[2]
+
+    return rows
+
+
+def scan_row(raw_sql: str, pos: int) -> Optional[Tuple[int, bool]]:
+    """Scan a row, which content starts at the given position.
+
+    Returns the row end position and whether the row may contain a nested
+    statement, or `None` if the row isn't closed.
+    """
+
+    depth = 1
+    nested = False
+    while depth:
+        token = next_token(raw_sql, pos)
+        if token is None or token[0] == ";":
+            return None
+
+        value, _, pos = token
+        if value == "(":
+            depth += 1
+        elif value == ")":
+            depth -= 1
+        elif value.upper() in NESTED_STATEMENT_KEYWORDS:
+            nested = True
+
+    return pos, nested
+
+
+def next_token(raw_sql: str, pos: int) -> Optional[Token]:
+    """Get the next token (skipping comments) with its position."""
+
+    while True:
+        match = TOKEN_RE.search(raw_sql, pos)
+        if match is None:
+            return None
+
+        value = match.group()
+        if value.startswith("--"):
+            pos = match.end()
+        elif value == "/*":
+            pos = skip_block_comment(raw_sql, match.end())
+        elif value.startswith("$"):
+            end = raw_sql.find(value, match.end())
+            end = len(raw_sql) if end == -1 else end + len(value)
+            return value, match.start(), end
+        else:
+            return value, match.start(), match.end()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Set
+
+from migration_lint.sql.ir import Segment, StatementIR
+from migration_lint.sql.model import SegmentLocator
+
+# NOTE: most of the rules require keywords (e.g. `CONCURRENTLY`), which are
+# missing in most of the statements. Keywords are encoded as bits of
+# integers, so the rules which can't match a statement are rejected by
+# a single bitwise operation before any tree walk.
+
+
+class KeywordPrefilter:
+    """Keywords required by the rules (see `required_keywords`) and present
+    in the statements, encoded as bit masks.
+    """
+
+    def __init__(self, locators: Sequence[SegmentLocator]) -> None:
+        self.bits: Dict[str, int] = {}
+        self.masks: List[int] = []
+        for locator in locators:
+            mask = 0
+            for keyword in sorted(required_keywords(locator)):
+                mask |= self.bits.setdefault(keyword, 1 << len(self.bits))
+            self.masks.append(mask)
+
+    def statement_mask(self, statement: Segment) -> int:
+        """Get the mask of the required keywords present in the statement."""
+
+        if isinstance(statement, StatementIR):
+            keywords = statement.arrays.keyword_raws()
+        else:
+            keywords = [
+                segment.raw.upper() for segment in statement.recursive_crawl("keyword")
+            ]
+
+        mask = 0
+        for keyword in keywords:
+            mask |= self.bits.get(keyword, 0)
+        return mask
+
+    def may_match(self, rule_index: int, statement_mask: int) -> bool:
+        """Check if the statement has all the keywords required by the rule."""
+
+        return self.masks[rule_index] & ~statement_mask == 0
+
+
+def required_keywords(locator: SegmentLocator) -> Set[str]:
+    """Get keywords (in upper case) which must be present in a statement
+    matched by the locator.
+    """
+
+    if locator.inverted:
+        return set()
+
+    keywords = set()
+    if locator.type == "keyword" and locator.raw:
+        keywords.add(locator.raw.upper())
+    for child_locator in locator.children or ():
+        keywords |= required_keywords(child_locator)
+    return keywords
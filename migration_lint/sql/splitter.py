@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import re
+from typing import List, Tuple
+
+# Tokens that may contain a statement terminator that doesn't terminate
+# a statement (comments, string literals, quoted identifiers, brackets and
+# `BEGIN ATOMIC ... END` blocks). Identifiers are matched as well, so "$"
+# inside of them isn't taken for a dollar quote. Commas are matched for the
+# `VALUES` rows scan (see `migration_lint.sql.payload`).
+TOKEN_RE = re.compile(
+    r"""
+      --[^\n]*
+    | /\*
+    | [Ee]'(?:[^'\\]|\\.|'')*'?
+    | '(?:[^']|'')*'?
+    | "(?:[^"]|"")*"?
+    | \$(?:[A-Za-z_][A-Za-z0-9_]*)?\$
+    | [A-Za-z_][A-Za-z0-9_$]*
+    | [(),;]
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+def split_statements(raw_sql: str) -> List[str]:
+    """Split SQL into separate statements.
+
+    This is a cheap lexical pass that is only aware of comments, quotes,
+    dollar quotes, brackets (e.g. `CREATE RULE ... DO ALSO (...; ...)`) and
+    `BEGIN ATOMIC ... END` function bodies. Statement terminators are excluded,
+    blank statements (with whitespaces and comments only) are skipped.
+
+    If brackets or blocks of the last statement aren't closed, it's split by
+    all its terminators, so a broken statement doesn't swallow the following
+    ones.
+    """
+
+    statements = []
+    start = pos = 0
+    # Depths of brackets and `BEGIN ATOMIC` blocks (including CASE
+    # expressions inside of them, which also end with END).
+    depth = blocks = 0
+    previous_word = None
+    # Terminators inside brackets and blocks of the current statement.
+    nested_terminators: List[Tuple[int, int]] = []
+    while True:
+        match = TOKEN_RE.search(raw_sql, pos)
+        if match is None:
+            break
+
+        token = match.group()
+        word = token.upper() if token.isidentifier() else None
+        if token == ";":
+            if depth or blocks:
+                nested_terminators.append(match.span())
+            else:
+                statements.append(raw_sql[start : match.start()])
+                start = match.end()
+                nested_terminators.clear()
+            pos = match.end()
+        elif token == "(":
+            depth += 1
+            pos = match.end()
+        elif token == ")":
+            depth = max(depth - 1, 0)
+            pos = match.end()
+        elif token == "/*":
+            pos = skip_block_comment(raw_sql, match.end())
+        elif token.startswith("$"):
+            end = raw_sql.find(token, match.end())
+            pos = len(raw_sql) if end == -1 else end + len(token)
+        else:
+            if word == "ATOMIC" and previous_word == "BEGIN":
+                blocks += 1
+            elif blocks and word == "CASE":
+                blocks += 1
+            elif blocks and word == "END":
+                blocks -= 1
+            pos = match.end()
+        if not token.startswith(("--", "/*")):
+            previous_word = word
+
+    if depth or blocks:
+        for terminator_start, terminator_end in nested_terminators:
+            statements.append(raw_sql[start:terminator_start])
+            start = terminator_end
+    statements.append(raw_sql[start:])
+
+    return [statement for statement in statements if not is_blank(statement)]
+
+
+def skip_block_comment(raw_sql: str, pos: int) -> int:
+    """Get the position after the (possibly nested) block comment, which
+    content starts at the given position.
+    """
+
+    depth = 1
+    while depth:
+        end = raw_sql.find("*/", pos)
+        if end == -1:
+            return len(raw_sql)
+        nested = raw_sql.find("/*", pos, end)
+        if nested == -1:
+            depth -= 1
+            pos = end + 2
+        else:
+            depth += 1
+            pos = nested + 2
+
+    return pos
+
+
+def is_blank(raw_sql: str) -> bool:
+    """Check if SQL contains only whitespaces and comments."""
+
+    return not COMMENT_RE.sub("", raw_sql).strip()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+from typing import List, Optional, Sequence
+
+from migration_lint import logger
+from migration_lint.sql.cache import rules_digest, write_atomically
+
+# NOTE: a few rules (e.g. `ADD COLUMN` and `CREATE INDEX CONCURRENTLY`) match
+# most of the statements, but they're tried after all the rules declared
+# before them in the same category. Rules of the same category classify
+# statements the same way, so they're tried in the order of their hits in the
+# previous runs. The categories are still tried in the order of precedence.
+
+# Name of the rules statistics file in the cache directory. It doesn't have
+# the cache entries suffix, so it's never evicted.
+RULE_STATS_FILE = "rule_stats"
+
+
+class RuleOrderMismatch(RuntimeError):
+    """Classification with the rules ordered by their hits differs from the
+    one with the rules in the declaration order.
+    """
+
+
+class RuleStats:
+    """Hit counts of the classification rules (by their indexes), persisted
+    in between runs at `path`, if any.
+
+    Counts of different rules (see `rules_digest`) are never mixed.
+    """
+
+    def __init__(self, rules_count: int, path: Optional[str] = None) -> None:
+        self.path = path
+        self.digest = rules_digest()
+        self.hits = [0] * rules_count
+        if path is not None:
+            self.load()
+
+    def hit(self, rule_index: int) -> None:
+        """Count a statement classified by the rule."""
+
+        self.hits[rule_index] += 1
+
+    def merge(self, hits: Sequence[int]) -> None:
+        """Add hit counts of the rules (e.g. counted by a worker process)."""
+
+        for rule_index, rule_hits in enumerate(hits):
+            self.hits[rule_index] += rule_hits
+
+    def take(self) -> List[int]:
+        """Get hit counts of the rules, resetting them."""
+
+        hits = self.hits
+        self.hits = [0] * len(hits)
+        return hits
+
+    def ranks(self, categories: Sequence[int]) -> List[int]:
+        """Get ranks of the rules to try them in, keeping the order of the
+        categories (indexes of the rules categories in the precedence order).
+        Rules of the same category are ranked by their hits.
+        """
+
+        order = sorted(
+            range(len(self.hits)),
+            key=lambda i: (categories[i], -self.hits[i], i),
+        )
+        ranks = [0] * len(order)
+        for rank, rule_index in enumerate(order):
+            ranks[rule_index] = rank
+        return ranks
+
+    def load(self) -> None:
+        """Load hit counts of the previous runs."""
+
+        assert self.path is not None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stats = json.load(f)
+            if stats["rules"] != self.digest or len(stats["hits"]) != len(self.hits):
+                return
+            self.hits = [int(hits) for hits in stats["hits"]]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError, KeyError):
+            logger.debug(f"Dropping broken rules statistics: {self.path}")
+
+    def save(self) -> None:
+        """Store hit counts for the following runs."""
+
+        if self.path is None:
+            return
+        try:
+            write_atomically(
+                self.path,
+                json.dumps({"rules": self.digest, "hits": self.hits}).encode(),
+            )
+        except OSError as e:
+            logger.debug(f"Can't write rules statistics: {e}")
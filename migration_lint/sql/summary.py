@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import AbstractSet, FrozenSet, Optional, Tuple
+
+from migration_lint.sql.constants import StatementType
+
+# A condition key: index of `ConditionalMatch` in the session and the
+# normalized value matched by its `match_by` locator (e.g. a table name).
+ConditionKey = Tuple[int, str]
+
+
+@dataclasses.dataclass(frozen=True)
+class StatementSummary:
+    """A compact, picklable classification summary of a parsed statement.
+
+    Summaries are built where statements are parsed (e.g. in worker
+    processes), so the parsed trees never leave there.
+
+    - `text` -- normalized statement text;
+    - `candidates` -- statement types of the matched rules in the precedence
+      order, each with the condition key required by the rule (`None` for
+      unconditional rules); the last candidate is unconditional, if any;
+    - `context` -- condition keys provided by the statement to the other
+      statements of the same migration;
+    - `unparsable` -- the statement can't be parsed (it's unsupported);
+    - `reason` -- why the statement can't be parsed.
+    """
+
+    text: str
+    candidates: Tuple[Tuple[StatementType, Optional[ConditionKey]], ...]
+    context: FrozenSet[ConditionKey] = frozenset()
+    unparsable: bool = False
+    reason: str = "can't be parsed"
+
+    def classify(self, context: AbstractSet[ConditionKey]) -> StatementType:
+        """Classify the statement by the condition keys provided by all the
+        statements of the migration.
+        """
+
+        for statement_type, condition in self.candidates:
+            if condition is None or condition in context:
+                return statement_type
+
+        return StatementType.UNSUPPORTED
+
+    def decided_type(
+        self, context: AbstractSet[ConditionKey]
+    ) -> Optional[StatementType]:
+        """Classify the statement by the condition keys provided by the
+        statements seen so far, or return `None` if the classification may
+        still change with the following statements.
+        """
+
+        for statement_type, condition in self.candidates:
+            if condition is None or condition in context:
+                return statement_type
+            return None
+
+        return StatementType.UNSUPPORTED
+
+    def is_context_free(self) -> bool:
+        """Check if the classification doesn't depend on the other statements
+        of the migration, and the statement isn't a context for them.
+        """
+
+        return (
+            not self.unparsable
+            and not self.context
+            and all(condition is None for _, condition in self.candidates)
+        )
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+from migration_lint.sql.ir import SegmentArrays, Segment, StatementIR
+from migration_lint.sql.model import SegmentLocator
+from migration_lint.sql.operations import MatchMemo, find_matching_segment, locator_key
+
+# NOTE: many rules share prefixes, e.g. a lot of `alter_table_statement`
+# rules start with `ALTER COLUMN` or `ADD CONSTRAINT`. The rules are compiled
+# into a trie: the root nodes are the segments the rules look for, the child
+# nodes are the children locators in order. Each node is evaluated at most
+# once per found segment, so shared prefixes are matched once per statement.
+
+# State of a failed match.
+FAILED = object()
+
+# State of a node, which isn't evaluated yet.
+UNKNOWN = object()
+
+
+class TrieNode:
+    """A node of the rules trie.
+
+    - `locator` -- the children locator matched by the node (`None` for root
+      nodes, which match the segments by their type and raw SQL);
+    - `children` -- the child nodes by their locators keys.
+    """
+
+    __slots__ = ("locator", "children")
+
+    def __init__(self, locator: Optional[SegmentLocator] = None) -> None:
+        self.locator = locator
+        self.children: Dict[Hashable, TrieNode] = {}
+
+
+class RuleTrie:
+    """Rules (without their `only_with` conditions) compiled into a trie of
+    shared prefixes.
+
+    The rules are matched by a `TrieMatcher` the same way as by
+    `find_matching_segment`.
+    """
+
+    def __init__(self, locators: Sequence[SegmentLocator]) -> None:
+        self.roots: Dict[Hashable, TrieNode] = {}
+        self.paths: List[Tuple[TrieNode, ...]] = []
+        for locator in locators:
+            node = self.roots.setdefault(
+                (locator.type, locator.raw.upper() if locator.raw else None),
+                TrieNode(locator),
+            )
+            path = [node]
+            for child_locator in locator.children or ():
+                node = node.children.setdefault(
+                    locator_key(child_locator), TrieNode(child_locator)
+                )
+                path.append(node)
+            self.paths.append(tuple(path))
+
+    def matcher(
+        self, statement: Segment, memo: Optional[MatchMemo] = None
+    ) -> TrieMatcher:
+        """Get a matcher of the rules for the statement, reusing the results
+        of `memo`, if any.
+        """
+
+        return TrieMatcher(self, statement, memo)
+
+
+class TrieMatcher:
+    """Matches the rules of a trie against a single statement, keeping the
+    states of evaluated nodes, so every node is evaluated once.
+    """
+
+    def __init__(
+        self,
+        trie: RuleTrie,
+        statement: Segment,
+        memo: Optional[MatchMemo] = None,
+    ) -> None:
+        self.trie = trie
+        self.statement = statement
+        self.memo = memo
+        self.arrays: Optional[SegmentArrays] = (
+            statement.arrays if isinstance(statement, StatementIR) else None
+        )
+        self.found: Dict[int, List[Segment]] = {}
+        self.states: Dict[Tuple[int, int], Any] = {}
+
+    def matches(self, rule_index: int) -> bool:
+        """Check if the rule (without its `only_with` condition) matches the
+        statement.
+        """
+
+        root, *path = self.trie.paths[rule_index]
+        for i, found in enumerate(self.find(root)):
+            if self.match_path(path, i, found):
+                return True
+
+        return False
+
+    def find(self, root: TrieNode) -> List[Segment]:
+        """Find the segments matched by the root node."""
+
+        found = self.found.get(id(root))
+        if found is None:
+            assert root.locator is not None
+            raw = root.locator.raw.upper() if root.locator.raw else None
+            crawl: Iterator[Segment]
+            if self.arrays is not None and isinstance(self.statement, StatementIR):
+                crawl = self.arrays.crawl(self.statement, root.locator.type)
+            else:
+                crawl = self.statement.recursive_crawl(root.locator.type)
+            found = self.found[id(root)] = [
+                segment
+                for segment in crawl
+                if raw is None or segment.raw.upper() == raw
+            ]
+        return found
+
+    def match_path(self, path: Sequence[TrieNode], i: int, found: Segment) -> bool:
+        """Match children locators of the path against the found segment (the
+        `i`-th segment found by the root node).
+        """
+
+        min_position = None
+        for node in path:
+            key = (id(node), i)
+            state = self.states.get(key, UNKNOWN)
+            if state is UNKNOWN:
+                state = self.states[key] = self.match_node(node, found, min_position)
+            if state is FAILED:
+                return False
+            min_position = state
+
+        return True
+
+    def match_node(self, node: TrieNode, found: Segment, min_position: Any) -> Any:
+        """Match the node locator against the found segment, returning the
+        position to match the next children from.
+        """
+
+        assert node.locator is not None
+        child_found = find_matching_segment(
+            segment=found,
+            locator=node.locator,
+            min_position=min_position,
+            arrays=self.arrays,
+            memo=self.memo,
+        )
+        if (
+            not node.locator.inverted
+            and not child_found
+            or node.locator.inverted
+            and child_found
+        ):
+            return FAILED
+
+        return child_found.pos_marker if child_found else min_position
@@ -38,7 +38,7 @@ def test_analyze_no_errors():
         migrations=[Migration("one", "")],
     )
     with mock.patch(
-        "migration_lint.analyzer.compat.classify_migration"
+        "migration_lint.analyzer.compat.iter_classify_migration"
     ) as classify_mock, mock.patch(
         "migration_lint.analyzer.base.logger.info"
     ) as logger_mock:
@@ -72,7 +72,7 @@ def test_analyze_no_migrations():
         migrations=[],
     )
     with mock.patch(
-        "migration_lint.analyzer.compat.classify_migration"
+        "migration_lint.analyzer.compat.iter_classify_migration"
     ) as classify_mock, mock.patch(
         "migration_lint.analyzer.base.logger.info"
     ) as logger_mock:
@@ -88,7 +88,7 @@ def test_analyze_unsupported():
         migrations=[Migration("one", "")],
     )
     with mock.patch(
-        "migration_lint.analyzer.compat.classify_migration"
+        "migration_lint.analyzer.compat.iter_classify_migration"
     ) as classify_mock, mock.patch(
         "migration_lint.analyzer.base.logger.error"
     ) as logger_mock:
@@ -107,7 +107,7 @@ def test_analyze_restricted():
         migrations=[Migration("one", "")],
     )
     with mock.patch(
-        "migration_lint.analyzer.compat.classify_migration"
+        "migration_lint.analyzer.compat.iter_classify_migration"
     ) as classify_mock, mock.patch(
         "migration_lint.analyzer.base.logger.error"
     ) as logger_mock:
@@ -135,7 +135,7 @@ def test_analyze_incompatible():
         migrations=[Migration("", "")],
     )
     with mock.patch(
-        "migration_lint.analyzer.compat.classify_migration"
+        "migration_lint.analyzer.compat.iter_classify_migration"
     ) as classify_mock, mock.patch(
         "migration_lint.analyzer.base.logger.error"
     ) as logger_mock:
@@ -169,7 +169,7 @@ def test_analyze_incompatible_with_allowed_files():
         migrations=[Migration("one", "")],
     )
     with mock.patch(
-        "migration_lint.analyzer.compat.classify_migration"
+        "migration_lint.analyzer.compat.iter_classify_migration"
     ) as classify_mock, mock.patch(
         "migration_lint.analyzer.base.logger.info"
     ) as logger_mock:
@@ -194,7 +194,7 @@ def test_analyze_data_migration():
         migrations=[Migration("one", "")],
     )
     with mock.patch(
-        "migration_lint.analyzer.compat.classify_migration"
+        "migration_lint.analyzer.compat.iter_classify_migration"
     ) as classify_mock, mock.patch(
         "migration_lint.analyzer.base.logger.error"
     ) as logger_mock:
@@ -215,3 +215,34 @@ def test_analyze_data_migration():
                 )
             ]
         )
+
+
+def test_analyze_parallel():
+    analyzer = get_analyzer(
+        changed_files=[ExtendedSourceDiff("one")],
+        migrations=[Migration("one", "first"), Migration("two", "second")],
+    )
+    analyzer.linters = [CompatibilityLinter(jobs=2)]
+    with mock.patch(
+        "migration_lint.analyzer.compat.classify_migrations"
+    ) as classify_mock, mock.patch(
+        "migration_lint.analyzer.compat.logger.info"
+    ) as logger_mock:
+        classify_mock.return_value = [
+            [("first sql", StatementType.BACKWARD_COMPATIBLE)],
+            [("second sql", StatementType.BACKWARD_COMPATIBLE)],
+        ]
+        analyzer.analyze()
+
+    classify_mock.assert_called_once_with(
+        ["first", "second"],
+        cache=None,
+        session=None,
+        jobs=2,
+        return_exceptions=True,
+    )
+    colorized = StatementType.BACKWARD_COMPATIBLE.colorized
+    assert mock.call(f"- {colorized}: first sql") in logger_mock.call_args_list
+    assert logger_mock.call_args_list.index(
+        mock.call(f"- {colorized}: first sql")
+    ) < logger_mock.call_args_list.index(mock.call(f"- {colorized}: second sql"))
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import os
+from unittest import mock
+
+from migration_lint.sql.cache import ClassificationCache
+from migration_lint.sql.constants import StatementType
+from migration_lint.sql.parser import ClassifierSession, classify_migration
+
+SQL = "CREATE INDEX CONCURRENTLY idx ON table_name (column_name);"
+
+
+def test_cache_hit(tmp_path):
+    cache = ClassificationCache(str(tmp_path))
+
+    result = classify_migration(SQL, cache=cache)
+    assert result == [
+        (
+            "CREATE INDEX CONCURRENTLY idx ON table_name (column_name)",
+            StatementType.BACKWARD_COMPATIBLE,
+        )
+    ]
+
+    with mock.patch.object(ClassifierSession, "parse") as parse_mock:
+        assert classify_migration(SQL, cache=cache) == result
+        parse_mock.assert_not_called()
+
+
+def test_cache_key_depends_on_sqlfluff_version(tmp_path):
+    cache = ClassificationCache(str(tmp_path))
+    cache.set(SQL, [("fake sql", StatementType.RESTRICTED)])
+
+    with mock.patch("sqlfluff.__version__", "0.0.0"):
+        assert ClassificationCache(str(tmp_path)).get(SQL) is None
+
+    assert cache.get(SQL) == [("fake sql", StatementType.RESTRICTED)]
+
+
+def test_cache_broken_entry(tmp_path):
+    cache = ClassificationCache(str(tmp_path))
+    cache.set(SQL, [("fake sql", StatementType.RESTRICTED)])
+
+    with open(os.path.join(tmp_path, f"{cache.key(SQL)}.json"), "w") as f:
+        f.write("{broken")
+
+    assert cache.get(SQL) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_cache_write_failure(tmp_path):
+    cache = ClassificationCache(str(tmp_path))
+
+    with mock.patch("os.replace", side_effect=OSError("no space left")):
+        cache.set(SQL, [("fake sql", StatementType.RESTRICTED)])
+
+    assert cache.get(SQL) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_cache_eviction(tmp_path):
+    cache = ClassificationCache(str(tmp_path), max_size=100)
+    result = [("fake sql", StatementType.BACKWARD_COMPATIBLE)]
+
+    cache.set("first", result)
+    os.utime(os.path.join(tmp_path, f"{cache.key('first')}.json"), (0, 0))
+    cache.set("second", result)
+    cache.set("third", result)
+
+    assert cache.get("first") is None
+    assert cache.get("second") == result
+    assert cache.get("third") == result
+
+
+def test_cache_namespace(tmp_path):
+    cache = ClassificationCache(str(tmp_path))
+    cache.set(SQL, [("fake sql", StatementType.RESTRICTED)])
+
+    assert ClassificationCache(str(tmp_path), namespace="other").get(SQL) is None
+
+
+def test_cache_key_depends_on_package_version(tmp_path):
+    cache = ClassificationCache(str(tmp_path))
+    cache.set(SQL, [("fake sql", StatementType.RESTRICTED)])
+
+    with mock.patch(
+        "migration_lint.sql.cache.package_version", return_value="0.0.0-other"
+    ):
+        assert ClassificationCache(str(tmp_path)).get(SQL) is None
+
+    assert cache.get(SQL) == [("fake sql", StatementType.RESTRICTED)]
+
+
+def test_cache_scans_only_over_limit(tmp_path):
+    cache = ClassificationCache(str(tmp_path), max_size=100)
+    result = [("fake sql", StatementType.BACKWARD_COMPATIBLE)]
+
+    with mock.patch("os.scandir", wraps=os.scandir) as scandir_mock:
+        cache.set("first", result)
+        cache.set("second", result)
+        assert scandir_mock.call_count == 1
+
+        cache.set("third", result)
+        assert scandir_mock.call_count == 2
+
+    assert cache.size is not None and cache.size <= 100
@@ -1,155 +1,166 @@
+import logging
+from unittest import mock
+
 import pytest as pytest
 
+from migration_lint.sql.cache import ClassificationCache
 from migration_lint.sql.constants import StatementType
-from migration_lint.sql.parser import classify_migration
+from migration_lint.sql.operations import find_matching_segment
+from migration_lint.sql.parser import (
+    ClassifierSession,
+    classify_migration,
+    classify_migrations,
+    get_default_session,
+    iter_classify_migration,
+)
 
 
-@pytest.mark.parametrize(
-    "statement,expected_type",
-    [
-        (
-            "CREATE INDEX CONCURRENTLY idx ON table_name (column_name);",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        ("CREATE INDEX idx ON table_name (column_name);", StatementType.RESTRICTED),
-        (
-            "CREATE UNIQUE INDEX CONCURRENTLY idx ON table_name (column_name);",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "CREATE UNIQUE INDEX idx ON table_name (column_name);",
-            StatementType.RESTRICTED,
-        ),
-        ("DROP INDEX idx;", StatementType.RESTRICTED),
-        ("DROP INDEX CONCURRENTLY idx;", StatementType.BACKWARD_COMPATIBLE),
-        ("REINDEX INDEX CONCURRENTLY idx", StatementType.BACKWARD_COMPATIBLE),
-        ("REINDEX INDEX idx", StatementType.RESTRICTED),
-        ("ALTER INDEX idx RENAME TO new_name;", StatementType.BACKWARD_COMPATIBLE),
-        ("CREATE SEQUENCE name;", StatementType.BACKWARD_COMPATIBLE),
-        ("ALTER SEQUENCE name START 0;", StatementType.BACKWARD_COMPATIBLE),
-        ("ALTER TABLE t_name RENAME TO new_name;", StatementType.RESTRICTED),
-        (
-            "ALTER TABLE t_name ADD COLUMN c_name text NULL;",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ADD COLUMN c_name text NOT NULL;",
-            StatementType.RESTRICTED,
-        ),
-        (
-            "ALTER TABLE t_name ADD COLUMN c_name integer NOT NULL DEFAULT 0;",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ADD COLUMN c_name integer NULL DEFAULT 0;",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ADD COLUMN c_name bigserial PRIMARY KEY;",
-            StatementType.BACKWARD_INCOMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ADD COLUMN c_name UUID PRIMARY KEY;",
-            StatementType.BACKWARD_INCOMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ALTER COLUMN c_name SET NOT NULL;",
-            StatementType.BACKWARD_INCOMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ALTER COLUMN c_name DROP NOT NULL;",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ALTER COLUMN c_name SET DEFAULT 0;",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ALTER COLUMN c_name DROP DEFAULT;",
-            StatementType.BACKWARD_INCOMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name DROP CONSTRAINT c_name;",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ADD CONSTRAINT name FOREIGN KEY (c_name) REFERENCES some_table (id);",
-            StatementType.RESTRICTED,
-        ),
-        (
-            "ALTER TABLE t_name ADD CONSTRAINT name FOREIGN KEY (c_name) REFERENCES some_table (id) NOT VALID;",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        ("UPDATE t_name SET col=0", StatementType.DATA_MIGRATION),
-        ("DELETE FROM t_name WHERE col=0", StatementType.DATA_MIGRATION),
-        (
-            "INSERT INTO t_name (id, name) VALUES (1, 'foo')",
-            StatementType.DATA_MIGRATION,
-        ),
-        (
-            "ALTER TABLE t_name VALIDATE CONSTRAINT c_name;",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ALTER COLUMN c_name TYPE text;",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ALTER COLUMN c_name TYPE varchar(10);",
-            StatementType.RESTRICTED,
-        ),
-        (
-            "ALTER TABLE t_name ADD CONSTRAINT c_name UNIQUE (col);",
-            StatementType.RESTRICTED,
-        ),
-        (
-            "ALTER TABLE t_name ADD CONSTRAINT c_name UNIQUE USING INDEX i_name;",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ADD CONSTRAINT c_name PRIMARY KEY USING INDEX i_name",
-            StatementType.BACKWARD_INCOMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name RENAME COLUMN c_name TO another_name",
-            StatementType.BACKWARD_INCOMPATIBLE,
-        ),
-        (
-            """
-            CREATE TRIGGER tr_name
-            BEFORE INSERT ON t_name
-            FOR EACH ROW EXECUTE FUNCTION f_name()
-            """,
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "DROP TRIGGER t_name ON tbl_name",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            """
-            CREATE OR REPLACE FUNCTION f_name() RETURNS TRIGGER AS $$
-            BEGIN
-              NEW."new_id" := NEW."id";
-              RETURN NEW;
-            END $$ LANGUAGE plpgsql
-            """,
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "DROP FUNCTION t_name",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-        (
-            "ALTER TABLE t_name ADD COLUMN id BIGINT GENERATED BY DEFAULT AS IDENTITY",
-            StatementType.RESTRICTED,
-        ),
-        (
-            "ALTER TABLE t_name ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY",
-            StatementType.BACKWARD_COMPATIBLE,
-        ),
-    ],
-)
+STATEMENTS = [
+    (
+        "CREATE INDEX CONCURRENTLY idx ON table_name (column_name);",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    ("CREATE INDEX idx ON table_name (column_name);", StatementType.RESTRICTED),
+    (
+        "CREATE UNIQUE INDEX CONCURRENTLY idx ON table_name (column_name);",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "CREATE UNIQUE INDEX idx ON table_name (column_name);",
+        StatementType.RESTRICTED,
+    ),
+    ("DROP INDEX idx;", StatementType.RESTRICTED),
+    ("DROP INDEX CONCURRENTLY idx;", StatementType.BACKWARD_COMPATIBLE),
+    ("REINDEX INDEX CONCURRENTLY idx", StatementType.BACKWARD_COMPATIBLE),
+    ("REINDEX INDEX idx", StatementType.RESTRICTED),
+    ("ALTER INDEX idx RENAME TO new_name;", StatementType.BACKWARD_COMPATIBLE),
+    ("CREATE SEQUENCE name;", StatementType.BACKWARD_COMPATIBLE),
+    ("ALTER SEQUENCE name START 0;", StatementType.BACKWARD_COMPATIBLE),
+    ("ALTER TABLE t_name RENAME TO new_name;", StatementType.RESTRICTED),
+    (
+        "ALTER TABLE t_name ADD COLUMN c_name text NULL;",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ADD COLUMN c_name text NOT NULL;",
+        StatementType.RESTRICTED,
+    ),
+    (
+        "ALTER TABLE t_name ADD COLUMN c_name integer NOT NULL DEFAULT 0;",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ADD COLUMN c_name integer NULL DEFAULT 0;",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ADD COLUMN c_name bigserial PRIMARY KEY;",
+        StatementType.BACKWARD_INCOMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ADD COLUMN c_name UUID PRIMARY KEY;",
+        StatementType.BACKWARD_INCOMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ALTER COLUMN c_name SET NOT NULL;",
+        StatementType.BACKWARD_INCOMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ALTER COLUMN c_name DROP NOT NULL;",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ALTER COLUMN c_name SET DEFAULT 0;",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ALTER COLUMN c_name DROP DEFAULT;",
+        StatementType.BACKWARD_INCOMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name DROP CONSTRAINT c_name;",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ADD CONSTRAINT name FOREIGN KEY (c_name) REFERENCES some_table (id);",
+        StatementType.RESTRICTED,
+    ),
+    (
+        "ALTER TABLE t_name ADD CONSTRAINT name FOREIGN KEY (c_name) REFERENCES some_table (id) NOT VALID;",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    ("UPDATE t_name SET col=0", StatementType.DATA_MIGRATION),
+    ("DELETE FROM t_name WHERE col=0", StatementType.DATA_MIGRATION),
+    (
+        "INSERT INTO t_name (id, name) VALUES (1, 'foo')",
+        StatementType.DATA_MIGRATION,
+    ),
+    (
+        "ALTER TABLE t_name VALIDATE CONSTRAINT c_name;",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ALTER COLUMN c_name TYPE text;",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ALTER COLUMN c_name TYPE varchar(10);",
+        StatementType.RESTRICTED,
+    ),
+    (
+        "ALTER TABLE t_name ADD CONSTRAINT c_name UNIQUE (col);",
+        StatementType.RESTRICTED,
+    ),
+    (
+        "ALTER TABLE t_name ADD CONSTRAINT c_name UNIQUE USING INDEX i_name;",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ADD CONSTRAINT c_name PRIMARY KEY USING INDEX i_name",
+        StatementType.BACKWARD_INCOMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name RENAME COLUMN c_name TO another_name",
+        StatementType.BACKWARD_INCOMPATIBLE,
+    ),
+    (
+        """
+        CREATE TRIGGER tr_name
+        BEFORE INSERT ON t_name
+        FOR EACH ROW EXECUTE FUNCTION f_name()
+        """,
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "DROP TRIGGER t_name ON tbl_name",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        """
+        CREATE OR REPLACE FUNCTION f_name() RETURNS TRIGGER AS $$
+        BEGIN
+          NEW."new_id" := NEW."id";
+          RETURN NEW;
+        END $$ LANGUAGE plpgsql
+        """,
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "DROP FUNCTION t_name",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        "ALTER TABLE t_name ADD COLUMN id BIGINT GENERATED BY DEFAULT AS IDENTITY",
+        StatementType.RESTRICTED,
+    ),
+    (
+        "ALTER TABLE t_name ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY",
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+]
+
+
+@pytest.mark.parametrize("statement,expected_type", STATEMENTS)
 def test_classify_migration(statement: str, expected_type: StatementType):
     result = classify_migration(statement)
     assert len(result) == 1
@@ -176,54 +187,378 @@ def test_ignore_order():
     assert result[0][1] == StatementType.RESTRICTED
 
 
+CONDITIONAL_MIGRATIONS = [
+    (
+        """
+        CREATE TABLE t_name (id serial, c_name integer);
+        ALTER TABLE t_name ADD CONSTRAINT c_name CHECK (col > 0);
+        """,
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        """
+        CREATE TABLE t_name (id serial, c_name integer);
+        ALTER TABLE another_table ADD CONSTRAINT c_name CHECK (col > 0);
+        """,
+        StatementType.RESTRICTED,
+    ),
+    (
+        """
+        CREATE TABLE t_name (id serial, c_name integer);
+        ALTER TABLE t_name ADD FOREIGN KEY (c_name) REFERENCES some_table (id);
+        """,
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+    (
+        """
+        ALTER TABLE t_name VALIDATE CONSTRAINT c_name;
+        ALTER TABLE t_name ALTER COLUMN col SET NOT NULL;
+        """,
+        StatementType.BACKWARD_COMPATIBLE,
+    ),
+]
+
+
+@pytest.mark.parametrize("sql,expected_type", CONDITIONAL_MIGRATIONS)
+def test_conditionally_safe(sql: str, expected_type: StatementType):
+    result = classify_migration(sql)
+    assert len(result) == 2
+    # check the last statement type
+    assert result[-1][1] == expected_type
+
+
 @pytest.mark.parametrize(
-    "sql,expected_type",
+    "statement,expected_count",
     [
+        ("SET statement_timeout=5;", 0),
+        ("SET statement_timeout=5; DROP INDEX idx;", 1),
+        ("BEGIN; ALTER TABLE t_name ADD COLUMN c_name text NULL; COMMIT;", 1),
+    ],
+)
+def test_ignore_statements(statement: str, expected_count: int):
+    statement_types = classify_migration(statement)
+    assert len(statement_types) == expected_count
+
+
+def test_session_reused():
+    session = ClassifierSession()
+
+    with mock.patch("migration_lint.sql.parser.Linter") as linter_mock:
+        result = classify_migration("DROP INDEX idx;", session=session)
+        linter_mock.assert_not_called()
+
+    assert result == [("DROP INDEX idx", StatementType.RESTRICTED)]
+    assert get_default_session() is get_default_session()
+
+
+def test_session_config_warnings(caplog):
+    with caplog.at_level(logging.WARNING, logger="sqlfluff"):
+        session = ClassifierSession()
+        session.classify_migration("DROP INDEX idx;")
+        session.linter.get_rulepack()
+
+    assert caplog.records == []
+
+
+def test_statements_cache():
+    session = ClassifierSession(fast_path=False)
+    sql = "ALTER TABLE t_name ADD COLUMN c_name text NULL;"
+
+    with mock.patch.object(session, "parse", wraps=session.parse) as parse_mock:
+        result = classify_migration(f"BEGIN; {sql} COMMIT;", session=session)
+        assert parse_mock.call_count == 3
+
+        assert classify_migration(f"{sql} {sql}", session=session) == result * 2
+        assert parse_mock.call_count == 3
+
+    assert session.cache_stats()["statements"] == (2, 3)
+
+
+def test_classify_statements():
+    session = ClassifierSession()
+    statements = session.parse_statement(
+        "ALTER TABLE t_name ALTER COLUMN c_name TYPE text;"
+        'ALTER TABLE t_name ALTER COLUMN c_name TYPE "text";'
+        "CREATE TABLE t_name (id serial, c_name integer);"
+        "ALTER TABLE t_name ADD FOREIGN KEY (c_name) REFERENCES t_other (id);"
+    )
+    alter_table = statements[-1]
+
+    result = session.classify_statements(statements, context=statements)
+
+    # Classification depends on the migration context.
+    assert (
+        session.classify_statement(alter_table, context=[alter_table])
+        == StatementType.RESTRICTED
+    )
+    # Normalized texts are the same, but quoted type isn't matched as TEXT.
+    assert result == [
         (
-            """
-            CREATE TABLE t_name (id serial, c_name integer);
-            ALTER TABLE t_name ADD CONSTRAINT c_name CHECK (col > 0);
-            """,
+            "ALTER TABLE t_name ALTER COLUMN c_name TYPE text",
             StatementType.BACKWARD_COMPATIBLE,
         ),
         (
-            """
-            CREATE TABLE t_name (id serial, c_name integer);
-            ALTER TABLE another_table ADD CONSTRAINT c_name CHECK (col > 0);
-            """,
+            "ALTER TABLE t_name ALTER COLUMN c_name TYPE text",
+            StatementType.RESTRICTED,
+        ),
+        (
+            "CREATE TABLE t_name (id serial, c_name integer)",
+            StatementType.BACKWARD_COMPATIBLE,
+        ),
+        (
+            "ALTER TABLE t_name ADD FOREIGN KEY (c_name) REFERENCES t_other (id)",
+            StatementType.BACKWARD_COMPATIBLE,
+        ),
+    ]
+
+
+def test_candidate_rules():
+    session = ClassifierSession()
+    create_index, alter_table = session.parse_statement(
+        "CREATE INDEX CONCURRENTLY idx ON t_name (col);"
+        "ALTER TABLE t_name ADD COLUMN c_name text NULL;"
+    )
+
+    candidates = session.candidate_rules(create_index)
+    assert candidates == tuple(sorted(candidates))
+    assert {session.rules[i][1].type for i in candidates} == {"create_index_statement"}
+    assert session.candidate_rules(create_index) is candidates
+
+    # Only the candidates are matched, the precedence is kept.
+    for statement in (create_index, alter_table):
+        assert session.classify_statement(statement, context=[]) == next(
+            (
+                statement_type
+                for statement_type, locator in session.rules
+                if find_matching_segment(statement, locator, context=[])
+            ),
+            StatementType.UNSUPPORTED,
+        )
+
+
+def test_context_keys():
+    session = ClassifierSession()
+    statements = session.parse_statement_ir(
+        "CREATE TABLE t_name (id serial, c_name integer);"
+        + "".join(
+            f"ALTER TABLE {table} ADD FOREIGN KEY (c_{i}) REFERENCES t_other (id);"
+            for i in range(50)
+            for table in ("t_name", "t_another")
+        )
+    )
+
+    with mock.patch.object(
+        session, "statement_context", wraps=session.statement_context
+    ) as context_mock:
+        result = session.classify_statements(statements, context=statements)
+        # Context of each statement is indexed once per migration.
+        assert context_mock.call_count == len(statements)
+
+    assert {table for _, table in session.context_keys(statements)} == {"t_name"}
+    assert result[1:3] == [
+        (
+            "ALTER TABLE t_name ADD FOREIGN KEY (c_0) REFERENCES t_other (id)",
+            StatementType.BACKWARD_COMPATIBLE,
+        ),
+        (
+            "ALTER TABLE t_another ADD FOREIGN KEY (c_0) REFERENCES t_other (id)",
+            StatementType.RESTRICTED,
+        ),
+    ]
+    assert [statement_type for _, statement_type in result[1:]] == [
+        StatementType.BACKWARD_COMPATIBLE,
+        StatementType.RESTRICTED,
+    ] * 50
+
+
+def test_unparsable_statements():
+    session = ClassifierSession(fast_path=False)
+    sql = """DROP INDEX idx;
+    CREATE TABLE (;
+
+    ALTER TABLE t_name ADD CONSTRAINT c_name CHECK (col > 0);
+    CREATE TABLE t_name (id serial, col integer) garbage;
+    """
+
+    with mock.patch.object(session, "parse", wraps=session.parse) as parse_mock:
+        result = session.classify_migration(sql)
+        assert parse_mock.call_count == 4
+
+    assert result == [
+        ("DROP INDEX idx", StatementType.RESTRICTED),
+        ("CREATE TABLE ( (line 2, can't be parsed)", StatementType.UNSUPPORTED),
+        (
+            "ALTER TABLE t_name ADD CONSTRAINT c_name CHECK (col > 0)",
             StatementType.RESTRICTED,
         ),
+        (
+            "CREATE TABLE t_name (id serial, col integer) garbage"
+            " (line 5, can't be parsed)",
+            StatementType.UNSUPPORTED,
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "sql,expected",
+    [
         (
             """
-            CREATE TABLE t_name (id serial, c_name integer);
-            ALTER TABLE t_name ADD FOREIGN KEY (c_name) REFERENCES some_table (id);
+            CREATE FUNCTION f() RETURNS int LANGUAGE sql
+            BEGIN ATOMIC
+                SELECT CASE WHEN true THEN 1 END;
+            END;
+            DROP TABLE t_name;
             """,
-            StatementType.BACKWARD_COMPATIBLE,
+            [StatementType.BACKWARD_INCOMPATIBLE],
         ),
         (
             """
-            ALTER TABLE t_name VALIDATE CONSTRAINT c_name;
-            ALTER TABLE t_name ALTER COLUMN col SET NOT NULL;
+            CREATE RULE r_name AS ON INSERT TO t_name DO ALSO (
+                INSERT INTO a VALUES (1);
+                INSERT INTO b VALUES (2)
+            );
+            DROP TABLE t_name;
             """,
-            StatementType.BACKWARD_COMPATIBLE,
+            [StatementType.UNSUPPORTED, StatementType.BACKWARD_INCOMPATIBLE],
         ),
     ],
 )
-def test_conditionally_safe(sql: str, expected_type: StatementType):
-    result = classify_migration(sql)
-    assert len(result) == 2
-    # check the last statement type
-    assert result[-1][1] == expected_type
+def test_statements_with_nested_terminators(sql, expected):
+    result = ClassifierSession().classify_migration(sql)
+
+    # Statements nested in the function body or the rule aren't split off.
+    assert [statement_type for _, statement_type in result] == expected
+    assert result[-1][0] == "DROP TABLE t_name"
+
+
+def test_classify_migrations_parallel():
+    sqls = [statement for statement, _ in STATEMENTS[:8]]
+
+    results = classify_migrations(sqls, jobs=2)
+
+    assert results == [classify_migration(sql) for sql in sqls]
+
+
+def test_classify_migrations_parallel_text():
+    # Texts don't depend on the statements classified before by the worker.
+    sqls = [
+        "ALTER TABLE t_name ADD COLUMN c_name text NULL;",
+        "ALTER TABLE T ADD COLUMN C TEXT NULL;",
+        "ALTER TABLE T_Name ADD COLUMN C_Name text NULL;",
+        'ALTER TABLE "T" ADD COLUMN "C" TEXT NULL;',
+    ] * 4
+    session = ClassifierSession(fingerprints=False)
+
+    results = classify_migrations(sqls, jobs=4)
+
+    assert results == [session.classify_migration(sql) for sql in sqls]
+    assert results == classify_migrations(sqls)
+
+
+def test_classify_migrations_exceptions():
+    sqls = ["DROP INDEX idx;", "DROP INDEX"]
+    session = ClassifierSession()
+
+    results = classify_migrations(sqls, session=session, jobs=2)
+    assert results == [
+        [("DROP INDEX idx", StatementType.RESTRICTED)],
+        [("DROP INDEX (line 1, can't be parsed)", StatementType.UNSUPPORTED)],
+    ]
+
+    with mock.patch.object(
+        session, "classify_migration", side_effect=[[], RuntimeError]
+    ):
+        with pytest.raises(RuntimeError):
+            classify_migrations(sqls, session=session)
+
+    with mock.patch.object(
+        session, "classify_migration", side_effect=[[], RuntimeError]
+    ):
+        results = classify_migrations(sqls, session=session, return_exceptions=True)
+    assert results[0] == []
+    assert isinstance(results[1], RuntimeError)
 
 
 @pytest.mark.parametrize(
-    "statement,expected_count",
-    [
-        ("SET statement_timeout=5;", 0),
-        ("SET statement_timeout=5; DROP INDEX idx;", 1),
-        ("BEGIN; ALTER TABLE t_name ADD COLUMN c_name text NULL; COMMIT;", 1),
-    ],
+    "sql",
+    [statement for statement, _ in STATEMENTS]
+    + [sql for sql, _ in CONDITIONAL_MIGRATIONS],
 )
-def test_ignore_statements(statement: str, expected_count: int):
-    statement_types = classify_migration(statement)
-    assert len(statement_types) == expected_count
+def test_statement_summaries(sql: str):
+    session = ClassifierSession(fast_path=False)
+    statements = list(session.parse(sql).recursive_crawl("statement"))
+
+    summaries = [session.summarize_statement(statement) for statement in statements]
+    context = frozenset().union(*(summary.context for summary in summaries))
+
+    assert [summary.classify(context) for summary in summaries] == [
+        session.classify_statement(statement, context=statements)
+        for statement in statements
+    ]
+
+
+def test_classify_migration_parallel():
+    sql = ";\n".join(
+        [statement.rstrip(";") for statement, _ in STATEMENTS]
+        + [sql for sql, _ in CONDITIONAL_MIGRATIONS]
+    )
+    session = ClassifierSession(jobs=2, parallel_min_statements=10)
+
+    with mock.patch.object(
+        session,
+        "iter_summaries_parallel",
+        wraps=session.iter_summaries_parallel,
+    ) as parallel_mock:
+        result = session.classify_migration(sql)
+        parallel_mock.assert_called_once()
+
+    assert result == ClassifierSession().classify_migration(sql)
+
+
+def test_iter_classify_migration():
+    session = ClassifierSession(fast_path=False, fingerprints=False)
+    sql = """
+    DROP INDEX idx;
+    ALTER TABLE t_name ADD CONSTRAINT c_name CHECK (col > 0);
+    DROP INDEX another_idx;
+    CREATE TABLE t_name (id serial, col integer);
+    """
+
+    with mock.patch.object(session, "parse", wraps=session.parse) as parse_mock:
+        results = session.iter_classify_migration(sql)
+
+        assert next(results) == ("DROP INDEX idx", StatementType.RESTRICTED)
+        assert parse_mock.call_count == 1
+
+        # ALTER TABLE is safe only with CREATE TABLE, so it's held back.
+        assert next(results) == (
+            "ALTER TABLE t_name ADD CONSTRAINT c_name CHECK (col > 0)",
+            StatementType.BACKWARD_COMPATIBLE,
+        )
+        assert parse_mock.call_count == 4
+
+    assert list(results) == [
+        ("DROP INDEX another_idx", StatementType.RESTRICTED),
+        (
+            "CREATE TABLE t_name (id serial, col integer)",
+            StatementType.BACKWARD_COMPATIBLE,
+        ),
+    ]
+
+
+def test_iter_classify_migration_cache(tmp_path):
+    cache = ClassificationCache(str(tmp_path))
+    sql = "DROP INDEX idx; CREATE INDEX CONCURRENTLY idx ON t_name (col);"
+
+    results = iter_classify_migration(sql, cache=cache)
+    assert next(results) == ("DROP INDEX idx", StatementType.RESTRICTED)
+    assert cache.get(sql) is None
+
+    assert list(results) == [
+        (
+            "CREATE INDEX CONCURRENTLY idx ON t_name (col)",
+            StatementType.BACKWARD_COMPATIBLE,
+        )
+    ]
+    assert cache.get(sql) == classify_migration(sql)
@@ -0,0 +1,178 @@
+from unittest import mock
+
+import pytest
+
+from migration_lint.sql.constants import StatementType
+from migration_lint.sql.fast_path import fast_classify
+from migration_lint.sql.parser import ClassifierSession
+from migration_lint.sql.splitter import split_statements
+from tests.test_classify_statement import CONDITIONAL_MIGRATIONS, STATEMENTS
+
+FAST_PATH_STATEMENTS = [
+    "BEGIN",
+    "BEGIN TRANSACTION",
+    "COMMIT",
+    "COMMIT WORK",
+    "END",
+    "ROLLBACK",
+    "SET statement_timeout=5",
+    "SET LOCAL lock_timeout TO '1s'",
+    "SET search_path TO public, other",
+    "SET TIME ZONE 'UTC'",
+    "SET SESSION AUTHORIZATION DEFAULT",
+    "CREATE TABLE \"Quoted\" (id serial PRIMARY KEY, name text DEFAULT 'it''s')",
+    "CREATE TABLE IF NOT EXISTS t_name (id int) WITH (fillfactor=70)",
+    "CREATE TEMP TABLE t_name (id int)",
+    """
+    CREATE TABLE t_name (
+        id int REFERENCES other (id) ON DELETE SET NULL ON UPDATE CASCADE,
+        -- comment
+        c_name int CHECK (CASE WHEN c_name > 0 THEN true ELSE false END)
+    )
+    """,
+    "CREATE TABLE t_name AS SELECT 1",
+    "CREATE TABLE t_name (LIKE other INCLUDING ALL)",
+    "CREATE INDEX IF NOT EXISTS idx ON t_name (col) WHERE col IS NOT NULL",
+    "create unique index concurrently idx on t_name using btree (lower(col))",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx",
+    "DROP TABLE IF EXISTS t_name CASCADE",
+    "DROP SEQUENCE seq",
+    "DROP TYPE t_type",
+    "CREATE SEQUENCE seq START 1",
+    "INSERT INTO alembic_version (version_num) VALUES ('abc')",
+    "INSERT INTO t_name SELECT * FROM other",
+    "INSERT INTO t_name (id) VALUES (1) ON CONFLICT (id) DO UPDATE SET id = 2",
+    "UPDATE alembic_version SET version_num='b' WHERE version_num = 'a'",
+    "UPDATE t_name SET col = (SELECT 1)",
+    "DELETE FROM t_name WHERE id IN (SELECT id FROM other)",
+    "DELETE FROM t_name WHERE id = 1",
+    """
+    CREATE TRIGGER tr_name
+    BEFORE INSERT OR UPDATE OF col ON t_name
+    FOR EACH ROW EXECUTE FUNCTION f_name()
+    """,
+    """
+    CREATE FUNCTION f_name() RETURNS int
+    SET search_path = public
+    AS $$ SELECT 1; $$ LANGUAGE sql
+    """,
+    "ALTER TABLE t_name /* inline */ ADD COLUMN c_name text NULL -- trailing\n",
+    # Identifiers in upper case.
+    "CREATE TABLE T (Id int)",
+    """
+    CREATE TABLE T (
+        Id INT GENERATED BY DEFAULT AS IDENTITY,
+        R INT REFERENCES S.O (Id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        V VARCHAR(32) NOT NULL DEFAULT 'x',
+        J JSONB DEFAULT '{}'::JSONB,
+        TS TIMESTAMP WITH TIME ZONE DEFAULT now(),
+        CONSTRAINT Pk PRIMARY KEY (Id)
+    )
+    """,
+    "CREATE INDEX I ON T USING GIN (Col DESC NULLS LAST, lower(Col)) WHERE Col > 0",
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS Idx ON ONLY S.T (A, B)",
+    "DROP TABLE IF EXISTS S.T, U CASCADE",
+    "DROP INDEX CONCURRENTLY IF EXISTS S.I",
+    "DROP TYPE Ty, S.Ty2",
+    "DROP FUNCTION F_Name(INT)",
+    "DROP TRIGGER IF EXISTS Tr ON S.T CASCADE",
+    "CREATE SEQUENCE Seq AS BIGINT START 1 OWNED BY T.C",
+    "ALTER SEQUENCE Seq RESTART WITH 5 INCREMENT BY 2",
+    "ALTER SEQUENCE seq RESTART 5",
+    "ALTER SEQUENCE seq RESTART",
+    "CREATE TRIGGER Tr AFTER UPDATE OF Col ON T FOR EACH ROW EXECUTE PROCEDURE fn('A')",
+    "CREATE FUNCTION F_Name(a INT) RETURNS INT LANGUAGE plpgsql AS $$ x $$",
+    "SET Search_Path TO Public",
+    "INSERT INTO T (A, B) VALUES ('x', NULL), (DEFAULT, -1)",
+    "UPDATE T SET A = 'x' WHERE B IS NOT NULL AND C <> 1",
+    "DELETE FROM S.T WHERE A = 'b'",
+]
+
+INVALID_STATEMENTS = [
+    "DROP TABLE t t t t",
+    "CREATE TABLE t (id int) garbage garbage",
+    "CREATE TABLE t (id int garbage)",
+    "DROP INDEX CONCURRENTLY i garbage !",
+    "CREATE INDEX CONCURRENTLY idx ON t (a) garbage",
+    "INSERT INTO t VALUES (1) ! 2",
+    "ALTER SEQUENCE seq",
+]
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [statement for statement, _ in STATEMENTS] + FAST_PATH_STATEMENTS,
+)
+def test_fast_path_matches_rules(sql: str):
+    session = ClassifierSession(fast_path=False)
+
+    for chunk in split_statements(sql):
+        fast_result = fast_classify(session.lexer, chunk)
+        if fast_result is None:
+            continue
+
+        statements = session.parse_statement(chunk)
+        assert len(statements) == 1
+        assert fast_result.root_type == statements[0].segments[0].get_type()
+        assert fast_result.text == statements[0].raw_normalized()
+        assert fast_result.statement_type == session.classify_statement(
+            statements[0], context=statements
+        )
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [sql for sql, _ in CONDITIONAL_MIGRATIONS]
+    + ["; ".join(FAST_PATH_STATEMENTS), ";\r\n".join(FAST_PATH_STATEMENTS[:5])],
+)
+def test_fast_path_migration(sql: str):
+    fast_session = ClassifierSession()
+    session = ClassifierSession(fast_path=False)
+
+    assert fast_session.classify_migration(sql) == session.classify_migration(sql)
+
+
+def test_fast_path_skips_parsing():
+    session = ClassifierSession()
+
+    with mock.patch.object(session, "parse") as parse_mock:
+        result = session.classify_migration(
+            """
+            BEGIN;
+            SET statement_timeout = 0;
+            CREATE TABLE t_name (id serial PRIMARY KEY);
+            CREATE INDEX CONCURRENTLY idx ON t_name (id);
+            COMMIT;
+            """
+        )
+        parse_mock.assert_not_called()
+
+    assert result == [
+        (
+            "CREATE TABLE t_name (id serial PRIMARY KEY)",
+            StatementType.BACKWARD_COMPATIBLE,
+        ),
+        (
+            "CREATE INDEX CONCURRENTLY idx ON t_name (id)",
+            StatementType.BACKWARD_COMPATIBLE,
+        ),
+    ]
+
+
+@pytest.mark.parametrize("sql", INVALID_STATEMENTS)
+def test_fast_path_invalid_statements(sql: str):
+    session = ClassifierSession()
+
+    assert fast_classify(session.lexer, sql) is None
+    assert [
+        statement_type for _, statement_type in session.classify_migration(sql)
+    ] == [StatementType.UNSUPPORTED]
+
+
+def test_fast_path_normalizes_identifiers():
+    session = ClassifierSession()
+
+    fast_result = fast_classify(session.lexer, 'CREATE TABLE T ("Id" int, Name text)')
+
+    assert fast_result is not None
+    assert fast_result.text == "CREATE TABLE t (Id int, name text)"
@@ -0,0 +1,111 @@
+from unittest import mock
+
+import pytest
+
+from migration_lint.sql.constants import StatementType
+from migration_lint.sql.parser import ClassifierSession
+from tests.test_classify_statement import CONDITIONAL_MIGRATIONS, STATEMENTS
+
+
+@pytest.mark.parametrize(
+    "sql1,sql2,same",
+    [
+        (
+            "ALTER TABLE t_name ADD COLUMN c_name text NULL",
+            "alter table other add column other_name text null",
+            True,
+        ),
+        (
+            "UPDATE t_name SET c_name = 'a' WHERE id = 1",
+            "UPDATE t_other SET c_other = 'b' WHERE id = 2.5",
+            True,
+        ),
+        (
+            "ALTER TABLE t_name ADD COLUMN c_name text NULL",
+            "ALTER TABLE t_name ADD COLUMN c_name text NOT NULL",
+            False,
+        ),
+        (
+            "INSERT INTO t_name (version_num) VALUES ('a')",
+            "INSERT INTO alembic_version (version_num) VALUES ('a')",
+            False,
+        ),
+        ("DROP INDEX idx", "DROP INDEX idx1", False),
+    ],
+)
+def test_fingerprint(sql1: str, sql2: str, same: bool):
+    session = ClassifierSession()
+
+    fingerprint1 = session.fingerprint(sql1)
+    fingerprint2 = session.fingerprint(sql2)
+
+    assert (fingerprint1.shape == fingerprint2.shape) is same
+    text = session.parse_statement(sql1)[0].raw_normalized()
+    assert fingerprint1.text(fingerprint1.case(text)) == text
+
+
+def test_fingerprints_cache():
+    session = ClassifierSession(fast_path=False)
+    sql = ";\n".join(
+        f"ALTER TABLE t_{i} ADD COLUMN c_{i} text NULL" for i in range(300)
+    )
+
+    with mock.patch.object(session, "parse", wraps=session.parse) as parse_mock:
+        results = session.classify_migration(sql)
+
+    assert parse_mock.call_count == 1
+    assert results == [
+        (
+            f"ALTER TABLE t_{i} ADD COLUMN c_{i} text NULL",
+            StatementType.BACKWARD_COMPATIBLE,
+        )
+        for i in range(300)
+    ]
+
+
+# Identifiers are lowercased in the normalized text, unless they're quoted.
+MIXED_CASE_STATEMENTS = [
+    "ALTER TABLE t_name ADD COLUMN c_name text NULL",
+    "ALTER TABLE T ADD COLUMN C TEXT NULL",
+    "alter table T_Name add column C_Name text null",
+    'ALTER TABLE "T" ADD COLUMN "C" TEXT NULL',
+    "ALTER TABLE t ADD COLUMN Valid TEXT NULL",
+]
+
+
+@pytest.mark.parametrize(
+    "statements", [MIXED_CASE_STATEMENTS, MIXED_CASE_STATEMENTS[::-1]]
+)
+def test_fingerprints_case(statements):
+    session = ClassifierSession(fast_path=False)
+    sql = ";\n".join(statements)
+
+    results = session.classify_migration(sql)
+
+    assert results == ClassifierSession(
+        fast_path=False, fingerprints=False
+    ).classify_migration(sql)
+    assert session.shapes_cache.hits > 0
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        ";\n".join(statement.rstrip(";") for statement, _ in STATEMENTS),
+        # Classification of these statements depends on the table names.
+        """
+        INSERT INTO t_name (version_num) VALUES ('a');
+        INSERT INTO alembic_version (version_num) VALUES ('a');
+        CREATE TABLE t_name (id serial, c_name integer);
+        ALTER TABLE t_name ADD FOREIGN KEY (c_name) REFERENCES t_other (id);
+        ALTER TABLE t_other ADD FOREIGN KEY (c_name) REFERENCES t_name (id);
+        """,
+    ]
+    + [sql for sql, _ in CONDITIONAL_MIGRATIONS],
+)
+def test_fingerprints_classification(sql: str):
+    session = ClassifierSession(fast_path=False)
+
+    assert session.classify_migration(sql) == ClassifierSession(
+        fast_path=False, fingerprints=False
+    ).classify_migration(sql)
@@ -0,0 +1,68 @@
+import pytest
+
+from migration_lint.sql.bodies import body_ddl_statements
+from migration_lint.sql.constants import StatementType
+from migration_lint.sql.parser import ClassifierSession
+
+FUNCTION = """
+CREATE OR REPLACE FUNCTION f_name() RETURNS void AS $body$
+DECLARE
+    v text := 'drop table; $$';
+BEGIN
+    -- ALTER TABLE commented
+    IF v IS NULL THEN
+        ALTER TABLE t_name DROP COLUMN c_name;
+    END IF;
+    CREATE INDEX CONCURRENTLY idx ON t_name (col);
+    UPDATE t_name SET col = 1;
+END;
+$body$ LANGUAGE plpgsql
+"""
+
+DO = "DO $$ BEGIN CREATE INDEX idx ON t_name (col); END $$"
+
+
+@pytest.mark.parametrize(
+    "sql,expected",
+    [
+        (
+            FUNCTION,
+            [
+                "ALTER TABLE t_name DROP COLUMN c_name",
+                "CREATE INDEX CONCURRENTLY idx ON t_name (col)",
+            ],
+        ),
+        (DO, ["CREATE INDEX idx ON t_name (col)"]),
+        ("CREATE TABLE t_name (c_name text DEFAULT $$DROP TABLE t$$)", []),
+    ],
+)
+def test_body_ddl_statements(sql: str, expected: list):
+    assert body_ddl_statements(sql) == expected
+
+
+def test_bodies_are_opaque():
+    session = ClassifierSession(fast_path=False)
+
+    tree = session.parse(FUNCTION)
+
+    assert "alter_table_statement" not in tree.descendant_type_set
+    assert [
+        statement_type for _, statement_type in session.classify_migration(FUNCTION)
+    ] == [StatementType.BACKWARD_COMPATIBLE]
+
+
+@pytest.mark.parametrize("fast_path", [True, False])
+def test_scan_bodies(fast_path: bool):
+    session = ClassifierSession(fast_path=fast_path, scan_bodies=True)
+
+    result = session.classify_migration(f"{FUNCTION}; {DO}; DROP INDEX idx;")
+
+    assert [statement_type for _, statement_type in result] == [
+        StatementType.BACKWARD_COMPATIBLE,
+        StatementType.BACKWARD_INCOMPATIBLE,
+        StatementType.UNSUPPORTED,
+        StatementType.RESTRICTED,
+        StatementType.RESTRICTED,
+    ]
+    assert result[1][0] == "ALTER TABLE t_name DROP COLUMN c_name"
+    assert result[3][0] == "CREATE INDEX idx ON t_name (col)"
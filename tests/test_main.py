@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import sys
 from unittest import mock
 
 import pytest
@@ -23,3 +24,36 @@ def test_main(squawk_config: list):
     assert result.exit_code == 0, result.stdout
     assert isinstance(analyzer_mock.call_args.kwargs["loader"], LocalLoader)
     assert isinstance(analyzer_mock.call_args.kwargs["extractor"], DjangoExtractor)
+
+
+def test_main_cache_stats():
+    runner = CliRunner()
+
+    with mock.patch("migration_lint.main.Analyzer"):
+        with mock.patch("migration_lint.main.logger") as logger_mock:
+            result = runner.invoke(
+                main,
+                ["--loader=local_git", "--extractor=django", "--cache-stats"],
+            )
+
+    assert result.exit_code == 0, result.stdout
+    logger_mock.info.assert_any_call("Cache of statements: 0 hits, 0 misses.")
+
+
+def test_main_parser_backend_not_installed():
+    runner = CliRunner()
+
+    with mock.patch("migration_lint.main.Analyzer") as analyzer_mock:
+        with mock.patch.dict(sys.modules, {"pglast": None}):
+            result = runner.invoke(
+                main,
+                [
+                    "--loader=local_git",
+                    "--extractor=django",
+                    "--parser-backend=pglast",
+                ],
+            )
+
+    assert result.exit_code == 2
+    assert "`pglast` extra" in result.output
+    analyzer_mock.assert_not_called()
@@ -0,0 +1,102 @@
+import signal
+import sys
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from migration_lint.sql.budget import ParseBudgetExceeded, parse_budget
+from migration_lint.sql.cache import ClassificationCache
+from migration_lint.sql.constants import StatementType
+from migration_lint.sql.parser import (
+    ClassifierSession,
+    classify_migration,
+    classify_migrations,
+)
+
+NESTED_SELECT = "SELECT " + "(SELECT " * 30 + "1" + ")" * 30
+
+
+def test_parse_budget():
+    recursion_limit = sys.getrecursionlimit()
+
+    def recurse(depth: int) -> int:
+        return recurse(depth + 1) if depth < 100 else depth
+
+    with parse_budget(timeout=None, max_depth=200):
+        assert recurse(0) == 100
+
+    with pytest.raises(ParseBudgetExceeded, match="recursion limit exceeded"):
+        with parse_budget(timeout=None, max_depth=50):
+            recurse(0)
+
+    with pytest.raises(ParseBudgetExceeded, match="time limit exceeded"):
+        with parse_budget(timeout=0.05, max_depth=None):
+            time.sleep(1)
+
+    assert sys.getrecursionlimit() == recursion_limit
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+
+def test_parse_budget_in_thread():
+    def parse():
+        with parse_budget(timeout=0.05, max_depth=50):
+            time.sleep(0.1)
+
+    with mock.patch("migration_lint.sql.budget._warnings", set()):
+        with mock.patch("migration_lint.sql.budget.logger") as logger_mock:
+            for _ in range(2):
+                thread = threading.Thread(target=parse)
+                thread.start()
+                thread.join()
+
+    logger_mock.warning.assert_called_once_with(
+        "Parse budget isn't applied outside of the main thread."
+    )
+
+
+def test_recursion_budget_exceeded():
+    session = ClassifierSession(parse_max_depth=300)
+    sql = f"DROP INDEX idx;\n{NESTED_SELECT};\nDROP TABLE t_name;"
+
+    assert session.classify_migration(sql) == [
+        ("DROP INDEX idx", StatementType.RESTRICTED),
+        (f"{NESTED_SELECT} (line 2, parse budget exceeded)", StatementType.UNSUPPORTED),
+        ("DROP TABLE t_name", StatementType.BACKWARD_INCOMPATIBLE),
+    ]
+
+
+def test_time_budget_exceeded(tmp_path):
+    session = ClassifierSession(fast_path=False, parse_timeout=0.05)
+    cache = ClassificationCache(str(tmp_path))
+    sql = "ALTER TABLE t_name ADD COLUMN c_name text NULL;"
+
+    with mock.patch.object(session, "parse", side_effect=lambda _: time.sleep(1)):
+        result = classify_migration(sql, cache=cache, session=session)
+
+    assert result == [
+        (
+            "ALTER TABLE t_name ADD COLUMN c_name text NULL "
+            "(line 1, parse budget exceeded)",
+            StatementType.UNSUPPORTED,
+        ),
+    ]
+    # The result depends on the machine, so it isn't cached.
+    assert cache.get(sql) is None
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_budget_exceeded_not_cached(tmp_path, jobs):
+    session = ClassifierSession(parse_max_depth=300)
+    cache = ClassificationCache(str(tmp_path))
+    sqls = [f"{NESTED_SELECT};", "DROP INDEX idx;", "DROP INDEX"]
+
+    results = classify_migrations(sqls, cache=cache, session=session, jobs=jobs)
+
+    assert results[0] == [
+        (f"{NESTED_SELECT} (line 1, parse budget exceeded)", StatementType.UNSUPPORTED)
+    ]
+    assert cache.get(sqls[0]) is None
+    # Other unparsable statements don't depend on the machine.
+    assert [cache.get(sql) for sql in sqls[1:]] == results[1:]
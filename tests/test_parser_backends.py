@@ -0,0 +1,257 @@
+import json
+import os
+import sys
+from typing import Any, Dict
+from unittest import mock
+
+import pytest
+
+from migration_lint.sql.backend import (
+    ParserBackend,
+    ParserBackendUnavailable,
+    PgQueryBackend,
+)
+from migration_lint.sql.backend.pg_query import build_statement
+from migration_lint.sql.constants import StatementType
+from migration_lint.sql.parser import ClassifierSession
+
+ADD_COLUMN = "ALTER TABLE t_name ADD COLUMN c_name int NOT NULL"
+
+PGLAST_STATEMENTS = [
+    ADD_COLUMN,
+    "ALTER TABLE t_name ADD COLUMN c_name text NULL",
+    "ALTER TABLE t_name ALTER COLUMN c_name TYPE varchar(10)",
+    "ALTER TABLE t_name DROP COLUMN c_name",
+    'ALTER TABLE "T_Name" RENAME COLUMN c_name TO c_new',
+    "ALTER TABLE t_name ADD CONSTRAINT c_fk FOREIGN KEY (c_name) "
+    "REFERENCES t_other (id) NOT VALID",
+    # Names equal to keywords don't hide the keywords.
+    "ALTER TABLE t_name ADD CONSTRAINT valid FOREIGN KEY (c_name) "
+    "REFERENCES t_other (id) NOT VALID",
+    'ALTER TABLE t_name ADD CONSTRAINT "VALID" CHECK (c_name > 0) NOT VALID',
+    "ALTER TABLE t_name VALIDATE CONSTRAINT valid",
+    "ALTER TABLE t_name RENAME COLUMN valid TO not_valid",
+    "CREATE INDEX CONCURRENTLY idx ON t_name (c_name)",
+    "CREATE INDEX CONCURRENTLY valid ON t_name (valid)",
+    "CREATE TABLE t_name (id int PRIMARY KEY, c_name text NOT NULL)",
+    "DROP TABLE t_name",
+    "UPDATE t_name SET c_name = 1 WHERE id IN (SELECT id FROM t_other)",
+    "INSERT INTO t_name (id, c_name) VALUES (1, 'a'), (2, 'b')",
+    "SET statement_timeout = 0",
+    # Naked identifiers are case-folded the same way as by sqlfluff.
+    "CREATE TABLE Users (Id int, C_Name text)",
+    "CREATE TABLE public.t_name (id int)",
+    "ALTER TABLE users ADD FOREIGN KEY (c_name) REFERENCES T_Other (id)",
+    "ALTER TABLE public.T_Name ADD FOREIGN KEY (C_Name) REFERENCES t_other (Id)",
+    "ALTER TABLE T_Name VALIDATE CONSTRAINT C_Fk",
+    "ALTER TABLE t_name ALTER COLUMN C_Name SET NOT NULL",
+    "ALTER TABLE t_name ADD COLUMN c_name public.My_Type DEFAULT Now()",
+    "CREATE INDEX CONCURRENTLY Idx ON T_Name (lower(C_Name))",
+    "SET Search_Path TO Public",
+]
+
+# Migrations of `PGLAST_STATEMENTS` with `only_with` rules matching names in
+# different case.
+PGLAST_MIGRATIONS = [
+    "CREATE TABLE Users (Id int, C_Name text);\n"
+    "ALTER TABLE users ADD FOREIGN KEY (c_name) REFERENCES T_Other (id);",
+    "ALTER TABLE T_Name VALIDATE CONSTRAINT C_Fk;\n"
+    "ALTER TABLE t_name ALTER COLUMN C_Name SET NOT NULL;",
+    "CREATE TABLE public.t_name (id int);\n"
+    "ALTER TABLE public.T_Name ADD FOREIGN KEY (C_Name) REFERENCES t_other (Id);",
+]
+
+# libpg_query parse trees (in JSON format) of `PGLAST_STATEMENTS`, as returned
+# by `pglast.parser.parse_sql_json`.
+PARSE_TREES_PATH = os.path.join(os.path.dirname(__file__), "pg_query_parse_trees.json")
+
+
+@pytest.fixture
+def stub_pglast():
+    """Stub pglast module for the tests, which never parse statements by it."""
+
+    with mock.patch.dict(sys.modules, {"pglast": mock.Mock()}):
+        yield
+
+
+def add_column_parse_tree(sql: str) -> Dict[str, Any]:
+    """libpg_query parse tree of `ADD_COLUMN` (in JSON format)."""
+
+    return {
+        "version": 160001,
+        "stmts": [
+            {
+                "stmt": {
+                    "AlterTableStmt": {
+                        "relation": {
+                            "relname": "t_name",
+                            "inh": True,
+                            "relpersistence": "p",
+                            "location": sql.index("t_name"),
+                        },
+                        "cmds": [
+                            {
+                                "AlterTableCmd": {
+                                    "subtype": "AT_AddColumn",
+                                    "def": {
+                                        "ColumnDef": {
+                                            "colname": "c_name",
+                                            "typeName": {
+                                                "names": [{"String": {"sval": "int4"}}],
+                                                "typemod": -1,
+                                                "location": sql.index("int"),
+                                            },
+                                            "is_local": True,
+                                            "constraints": [
+                                                {
+                                                    "Constraint": {
+                                                        "contype": "CONSTR_NOTNULL",
+                                                        "location": sql.index("NOT"),
+                                                    }
+                                                }
+                                            ],
+                                            "location": sql.index("c_name"),
+                                        }
+                                    },
+                                    "behavior": "DROP_RESTRICT",
+                                }
+                            }
+                        ],
+                        "objtype": "OBJECT_TABLE",
+                    }
+                }
+            }
+        ],
+    }
+
+
+def test_backends_registry():
+    assert sorted(ParserBackend.names()) == ["pglast", "sqlfluff"]
+    assert ParserBackend.get("pglast") is PgQueryBackend
+
+
+@pytest.mark.usefixtures("stub_pglast")
+def test_build_statement():
+    session = ClassifierSession()
+    tokens, _ = session.lexer.lex(ADD_COLUMN)
+
+    backend = PgQueryBackend(session)
+
+    statement = build_statement(
+        ADD_COLUMN,
+        add_column_parse_tree(ADD_COLUMN),
+        tokens,
+        backend.keywords,
+        backend.reserved_keywords,
+    )
+
+    assert statement is not None
+    (root,) = statement.segments
+    assert root.get_type() == "alter_table_statement"
+    assert [(segment.get_type(), segment.raw) for segment in root.segments] == [
+        ("keyword", "ALTER"),
+        ("keyword", "TABLE"),
+        ("table_reference", "t_name"),
+        ("keyword", "ADD"),
+        ("keyword", "COLUMN"),
+        ("data_type", "int"),
+        ("keyword", "int"),
+        ("keyword", "NOT"),
+        ("keyword", "NULL"),
+    ]
+    # The same summary as for the statement parsed by sqlfluff.
+    assert session.summarize_statement(statement) == session.summarize_statement(
+        session.parse_statement(ADD_COLUMN)[0]
+    )
+
+
+def test_pglast_not_installed():
+    with mock.patch.dict(sys.modules, {"pglast": None}):
+        with pytest.raises(ParserBackendUnavailable, match="`pglast` extra"):
+            ClassifierSession(backend="pglast")
+
+
+@pytest.mark.usefixtures("stub_pglast")
+def test_fallback_backend():
+    session = ClassifierSession(backend="pglast", fast_path=False)
+    sql = f"{ADD_COLUMN};\nCREATE INDEX CONCURRENTLY idx ON t_name (c_name);"
+
+    with mock.patch.object(
+        PgQueryBackend, "parse_statement", return_value=None
+    ) as parse_statement:
+        result = session.classify_migration(sql)
+
+    assert parse_statement.call_count == 2
+    assert result == ClassifierSession(fast_path=False).classify_migration(sql)
+    assert result[0][1] == StatementType.RESTRICTED
+
+
+@pytest.mark.usefixtures("stub_pglast")
+@pytest.mark.parametrize("sql", PGLAST_STATEMENTS)
+def test_build_statement_differential(sql: str):
+    # Parse trees are checked in, so the mapping is tested without pglast.
+    with open(PARSE_TREES_PATH) as f:
+        parse_tree = json.load(f)[sql]
+    session = ClassifierSession()
+    tokens, _ = session.lexer.lex(sql)
+    backend = PgQueryBackend(session)
+
+    statement = build_statement(
+        sql, parse_tree, tokens, backend.keywords, backend.reserved_keywords
+    )
+
+    assert statement is not None
+    assert session.summarize_statement(statement) == session.summarize_statement(
+        session.parse_statement(sql)[0]
+    )
+
+
+@pytest.mark.usefixtures("stub_pglast")
+@pytest.mark.parametrize("sql", PGLAST_MIGRATIONS)
+def test_build_statement_migrations_differential(sql: str):
+    with open(PARSE_TREES_PATH) as f:
+        parse_trees = json.load(f)
+
+    def parse_statement(backend, raw_sql):
+        sql = raw_sql.strip().rstrip(";")
+        tokens, _ = backend.session.lexer.lex(sql)
+        return [
+            build_statement(
+                sql,
+                parse_trees[sql],
+                tokens,
+                backend.keywords,
+                backend.reserved_keywords,
+            )
+        ]
+
+    session = ClassifierSession(backend="pglast", fast_path=False)
+    with mock.patch.object(
+        PgQueryBackend, "parse_statement", autospec=True, side_effect=parse_statement
+    ) as parse_statement_mock:
+        result = session.classify_migration(sql)
+
+    assert parse_statement_mock.call_count == 2
+    assert result == ClassifierSession(fast_path=False).classify_migration(sql)
+
+
+@pytest.mark.parametrize("sql", PGLAST_MIGRATIONS)
+def test_pglast_backend_migrations(sql: str):
+    pytest.importorskip("pglast")
+
+    assert ClassifierSession(backend="pglast", fast_path=False).classify_migration(
+        sql
+    ) == ClassifierSession(fast_path=False).classify_migration(sql)
+
+
+@pytest.mark.parametrize("sql", PGLAST_STATEMENTS)
+def test_pglast_backend_differential(sql: str):
+    pytest.importorskip("pglast")
+
+    session = ClassifierSession(backend="pglast", fast_path=False)
+    (statement,) = session.backends[0].parse_statement(sql) or [None]
+
+    assert statement is not None
+    assert session.summarize_statement(statement) == session.summarize_statement(
+        session.backends[1].parse_statement(sql)[0]
+    )
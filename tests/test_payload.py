@@ -0,0 +1,73 @@
+import pytest
+
+from migration_lint.sql.constants import StatementType
+from migration_lint.sql.parser import ClassifierSession
+from migration_lint.sql.payload import elide_payload
+
+ROWS = ", ".join(f"({i}, 'it''s (x); {i}', now())" for i in range(20))
+
+
+@pytest.mark.parametrize(
+    "sql,expected",
+    [
+        (
+            f"INSERT INTO t_name VALUES {ROWS} ON CONFLICT DO NOTHING;",
+            "INSERT INTO t_name VALUES /* 19 more rows */ (0, 'it''s (x); 0', now())"
+            " ON CONFLICT DO NOTHING;",
+        ),
+        (
+            "INSERT INTO t_name VALUES (1), /* comment */ (2), (3);",
+            "INSERT INTO t_name VALUES /* 2 more rows */ (1);",
+        ),
+        (
+            "INSERT INTO t_name VALUES (1), (2);",
+            "INSERT INTO t_name VALUES (1), (2);",
+        ),
+        (
+            "INSERT INTO t_name VALUES\n(1),\n(2),\n(3);\nDROP INDEX idx;",
+            "INSERT INTO t_name VALUES\n/* 2 more rows */ (1);\n\n\nDROP INDEX idx;",
+        ),
+        (
+            "INSERT INTO t_name VALUES (1), (2), ((SELECT 1));",
+            "INSERT INTO t_name VALUES (1), (2), ((SELECT 1));",
+        ),
+        (
+            "CREATE FUNCTION f() AS $$ INSERT INTO t VALUES (1), (2), (3) $$;",
+            "CREATE FUNCTION f() AS $$ INSERT INTO t VALUES (1), (2), (3) $$;",
+        ),
+        (
+            "COPY t_name (a, b) FROM stdin;\n1\t'x;\n2\ty\n\\.\nDROP INDEX idx;",
+            "COPY t_name (a, b) FROM stdin;\n\n\n\nDROP INDEX idx;",
+        ),
+        (
+            "COPY t_name TO stdout; DROP INDEX idx;",
+            "COPY t_name TO stdout; DROP INDEX idx;",
+        ),
+    ],
+)
+def test_elide_payload(sql: str, expected: str):
+    assert elide_payload(sql, max_rows=2) == expected
+
+
+def test_payload_classification():
+    sql = (
+        "BEGIN;"
+        f"INSERT INTO t_name (id, name, ts) VALUES {ROWS};"
+        "COPY t_name (a, b) FROM stdin;\n1\tx\n\\.\n"
+        "COMMIT;"
+    )
+
+    result = ClassifierSession().classify_migration(sql)
+
+    assert result == [
+        (
+            "INSERT INTO t_name (id, name, ts) VALUES /* 19 more rows */"
+            " (0, it's (x); 0, now())",
+            StatementType.DATA_MIGRATION,
+        ),
+        ("COPY t_name (a, b) FROM stdin", StatementType.UNSUPPORTED),
+    ]
+    assert ClassifierSession(payload_max_rows=None).classify_migration(sql)[-1] == (
+        "1\tx\n\\.\nCOMMIT (line 2, can't be parsed)",
+        StatementType.UNSUPPORTED,
+    )
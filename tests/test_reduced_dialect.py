@@ -0,0 +1,67 @@
+from unittest import mock
+
+import pytest
+from sqlfluff.core.dialects import load_raw_dialect
+from sqlfluff.core.parser import OneOf, Ref
+
+from migration_lint.sql.dialect import reduced_dialect
+from migration_lint.sql.parser import ClassifierSession, render_and_parse
+from tests.test_classify_statement import CONDITIONAL_MIGRATIONS, STATEMENTS
+
+FULL_SESSION = ClassifierSession(fast_path=False, reduced_grammar=False)
+REDUCED_SESSION = ClassifierSession(fast_path=False)
+
+
+@pytest.mark.parametrize(
+    "sql", [sql for sql, _ in STATEMENTS] + [sql for sql, _ in CONDITIONAL_MIGRATIONS]
+)
+def test_reduced_dialect_parses_the_same(sql):
+    assert REDUCED_SESSION.reduced_linter is not None
+
+    parsed = render_and_parse(REDUCED_SESSION.reduced_linter, sql)
+
+    assert parsed is not None and parsed.tree is not None
+    assert next(parsed.tree.recursive_crawl("unparsable"), None) is None
+    assert parsed.tree.stringify() == FULL_SESSION.parse(sql).stringify()
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "CREATE VIEW v_name AS SELECT 1",
+        "COMMENT ON TABLE t_name IS 'comment'",
+        "GRANT SELECT ON t_name TO u_name",
+    ],
+)
+def test_reduced_dialect_fallback(sql):
+    assert REDUCED_SESSION.reduced_linter is not None
+
+    parsed = render_and_parse(REDUCED_SESSION.reduced_linter, sql)
+
+    assert parsed is not None and parsed.tree is not None
+    assert next(parsed.tree.recursive_crawl("unparsable"), None) is not None
+    assert REDUCED_SESSION.parse(sql).stringify() == FULL_SESSION.parse(sql).stringify()
+    assert REDUCED_SESSION.classify_migration(sql) == FULL_SESSION.classify_migration(
+        sql
+    )
+
+
+@pytest.mark.parametrize(
+    "match_grammar",
+    [
+        # Grammars without the attributes the dialect is reduced by.
+        mock.Mock(spec=OneOf, _elements=None),
+        mock.Mock(spec=OneOf, _elements=[mock.Mock(spec=Ref, _ref=None)]),
+    ],
+)
+def test_reduced_dialect_not_supported(match_grammar):
+    raw_dialect = load_raw_dialect("postgres")
+    statement = raw_dialect.get_segment("StatementSegment")
+
+    with mock.patch.object(statement, "match_grammar", match_grammar):
+        assert reduced_dialect("postgres", REDUCED_SESSION.ir_types) is None
+        session = ClassifierSession(fast_path=False)
+
+    assert session.reduced_linter is None
+    sql = "ALTER TABLE t_name ADD COLUMN c_name text NULL"
+    assert session.classify_migration(sql) == FULL_SESSION.classify_migration(sql)
@@ -0,0 +1,125 @@
+import json
+import os
+from unittest import mock
+
+import pytest
+
+from migration_lint.sql.parser import ClassifierSession, classify_migrations
+from migration_lint.sql.stats import RuleStats
+from tests.test_classify_statement import CONDITIONAL_MIGRATIONS, STATEMENTS
+
+SQL = [sql for sql, _ in STATEMENTS] + [sql for sql, _ in CONDITIONAL_MIGRATIONS]
+
+
+def test_rule_stats_reorder_within_categories(tmp_path):
+    path = str(tmp_path / "rule_stats")
+    session = ClassifierSession(fast_path=False, rule_stats_path=path)
+    (statement,) = session.parse_statement(
+        "ALTER TABLE t_name ADD COLUMN c_name integer NOT NULL DEFAULT 0;"
+    )
+    candidates = session.candidate_rules(statement)
+
+    session.classify_statement(statement, context=[])
+    (hit_rule,) = [i for i, hits in enumerate(session.rule_stats.hits) if hits]
+    assert hit_rule != min(
+        i for i in candidates if session.rules[i][0] == session.rules[hit_rule][0]
+    )
+    session.save_rule_stats()
+
+    reordered = ClassifierSession(fast_path=False, rule_stats_path=path)
+    assert reordered.rule_stats.hits == session.rule_stats.hits
+    reordered_candidates = reordered.candidate_rules(statement)
+    assert sorted(reordered_candidates) == list(candidates)
+    # The hit rule goes first within its category, the categories are kept.
+    category = [
+        i
+        for i in reordered_candidates
+        if reordered.rules[i][0] == reordered.rules[hit_rule][0]
+    ]
+    assert category[0] == hit_rule
+    precedence = [statement_type for statement_type, _ in reordered.operations]
+    assert [
+        precedence.index(reordered.rules[i][0]) for i in reordered_candidates
+    ] == sorted(precedence.index(session.rules[i][0]) for i in candidates)
+
+
+@pytest.mark.parametrize("sql", SQL)
+def test_check_rule_order(tmp_path, sql):
+    path = str(tmp_path / "rule_stats")
+    # The rules are ranked in the reversed declaration order.
+    stats = RuleStats(len(ClassifierSession(fast_path=False).rules), path)
+    stats.hits = list(range(len(stats.hits)))
+    stats.save()
+    session = ClassifierSession(
+        fast_path=False, fingerprints=False, rule_stats_path=path, check_rule_order=True
+    )
+
+    assert session.classify_migration(sql) == ClassifierSession(
+        fast_path=False, fingerprints=False
+    ).classify_migration(sql)
+    for statement in session.parse(sql).recursive_crawl("statement"):
+        session.summarize_statement(statement)
+
+
+def test_check_rule_order_of_repeated_statements():
+    session = ClassifierSession(check_rule_order=True)
+    sql = (
+        "SET statement_timeout = 0;\n"
+        "ALTER TABLE t_name ADD COLUMN c_name integer;\n"
+        "ALTER TABLE t_name ADD COLUMN c_name integer;\n"
+        "ALTER TABLE t_other ADD COLUMN c_other integer;\n"
+    )
+
+    with mock.patch.object(
+        session, "summarize_statement", wraps=session.summarize_statement
+    ) as summarize_statement:
+        session.classify_migration(sql)
+        session.classify_migration(sql)
+    # Neither the fast path nor the caches skip the check.
+    assert summarize_statement.call_count == 8
+
+
+@pytest.mark.parametrize("parallel", ["statements", "migrations"])
+def test_rule_stats_of_workers(tmp_path, parallel):
+    path = str(tmp_path / "rule_stats")
+    stats = RuleStats(len(ClassifierSession().rules), path)
+    stats.hits = [1] * len(stats.hits)
+    stats.save()
+    settings = dict(
+        statements_cache_size=0,
+        fast_path=False,
+        fingerprints=False,
+        rule_stats_path=path,
+    )
+    if parallel == "statements":
+        migrations = ["\n".join(f"{sql.rstrip().rstrip(';')};" for sql in SQL)]
+        session = ClassifierSession(jobs=2, parallel_min_statements=1, **settings)
+        classify_migrations(migrations, session=session)
+    else:
+        migrations = SQL
+        session = ClassifierSession(**settings)
+        classify_migrations(migrations, session=session, jobs=2)
+    serial = ClassifierSession(**settings)
+    classify_migrations(migrations, session=serial)
+
+    assert session.rule_stats.hits == serial.rule_stats.hits
+    assert session.rule_stats.hits != stats.hits
+
+
+def test_rule_stats_of_other_rules(tmp_path):
+    path = tmp_path / "rule_stats"
+    path.write_text(json.dumps({"rules": "other", "hits": [1, 2, 3]}))
+    assert RuleStats(3, str(path)).hits == [0, 0, 0]
+
+    path.write_text("broken")
+    assert RuleStats(3, str(path)).hits == [0, 0, 0]
+
+
+def test_rule_stats_write_failure(tmp_path):
+    stats = RuleStats(3, str(tmp_path / "rule_stats"))
+    stats.hits = [1, 2, 3]
+
+    with mock.patch("os.replace", side_effect=OSError("no space left")):
+        stats.save()
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,113 @@
+import dataclasses
+from unittest import mock
+
+import pytest
+
+from migration_lint.sql import operations
+from migration_lint.sql.constants import StatementType
+from migration_lint.sql.model import KeywordLocator, SegmentLocator
+from migration_lint.sql.operations import MatchMemo, find_matching_segment
+from migration_lint.sql.parser import ClassifierSession
+from migration_lint.sql.prefilter import KeywordPrefilter, required_keywords
+from tests.test_classify_statement import CONDITIONAL_MIGRATIONS, STATEMENTS
+
+SESSION = ClassifierSession(fast_path=False)
+
+
+def test_rule_trie_shares_prefixes():
+    trie = SESSION.rules_trie
+    alter_column_rules = [
+        path
+        for path, (_, locator) in zip(trie.paths, SESSION.rules)
+        if locator.type == "alter_table_statement"
+        and [child.raw for child in (locator.children or ())][:2] == ["ALTER", "COLUMN"]
+    ]
+
+    assert len(alter_column_rules) > 1
+    assert len({path[:3] for path in alter_column_rules}) == 1
+    assert len(trie.roots) < len(SESSION.rules)
+
+
+@pytest.mark.parametrize(
+    "sql", [sql for sql, _ in STATEMENTS] + [sql for sql, _ in CONDITIONAL_MIGRATIONS]
+)
+def test_rule_trie_equivalence(sql: str):
+    trees = list(SESSION.parse(sql).recursive_crawl("statement"))
+    statements_ir = SESSION.parse_statement_ir(sql)
+
+    for statements in (trees, statements_ir):
+        for statement in statements:
+            matcher = SESSION.rules_trie.matcher(statement)
+            assert [
+                matcher.matches(rule_index) for rule_index in range(len(SESSION.rules))
+            ] == [
+                bool(
+                    find_matching_segment(
+                        statement, dataclasses.replace(locator, only_with=None)
+                    )
+                )
+                for _, locator in SESSION.rules
+            ]
+
+            assert SESSION.classify_statement(statement, context=statements) == next(
+                (
+                    statement_type
+                    for statement_type, locator in SESSION.rules
+                    if find_matching_segment(statement, locator, context=statements)
+                ),
+                StatementType.UNSUPPORTED,
+            )
+
+
+def test_match_memo():
+    (statement,) = SESSION.parse(
+        "ALTER TABLE t_name ALTER COLUMN c_name TYPE text"
+    ).recursive_crawl("statement")
+    locator = SegmentLocator(
+        type="alter_table_statement",
+        children=[
+            SegmentLocator(type="data_type", raw="TEXT"),
+            KeywordLocator(raw="USING", inverted=True),
+        ],
+    )
+    memo = MatchMemo()
+
+    with mock.patch(
+        "migration_lint.sql.operations._find_matching_segment",
+        wraps=operations._find_matching_segment,
+    ) as find_mock:
+        found = find_matching_segment(statement, locator, memo=memo)
+        assert found is not None
+        # The statement and its children, including the inverted one.
+        assert find_mock.call_count == 3
+
+        assert find_matching_segment(statement, locator, memo=memo) is found
+        assert find_mock.call_count == 3
+
+        assert find_matching_segment(statement, locator) is found
+        assert find_mock.call_count == 6
+
+
+def test_keyword_prefilter():
+    locator = SegmentLocator(
+        type="alter_table_statement",
+        children=[
+            KeywordLocator(raw="alter"),
+            KeywordLocator(raw="COLUMN"),
+            SegmentLocator(type="data_type", raw="TEXT"),
+            KeywordLocator(raw="USING", inverted=True),
+        ],
+    )
+    assert required_keywords(locator) == {"ALTER", "COLUMN"}
+
+    prefilter = KeywordPrefilter([locator, KeywordLocator(raw="USING")])
+    for sql, expected in (
+        ("ALTER TABLE t_name ALTER COLUMN c_name TYPE text", [True, False]),
+        ("ALTER TABLE t_name ALTER c_name TYPE text USING c_name", [False, True]),
+    ):
+        for statement in (
+            *SESSION.parse(sql).recursive_crawl("statement"),
+            *SESSION.parse_statement_ir(sql),
+        ):
+            mask = prefilter.statement_mask(statement)
+            assert [prefilter.may_match(i, mask) for i in range(2)] == expected
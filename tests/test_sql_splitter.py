@@ -0,0 +1,50 @@
+import pytest
+
+from migration_lint.sql.splitter import split_statements
+
+
+@pytest.mark.parametrize(
+    "sql,expected",
+    [
+        ("SELECT 1", ["SELECT 1"]),
+        ("BEGIN; SELECT 1; COMMIT;", ["BEGIN", " SELECT 1", " COMMIT"]),
+        ("SELECT 'a;b'; SELECT 'it''s;'", ["SELECT 'a;b'", " SELECT 'it''s;'"]),
+        ("SELECT E'\\';'; SELECT 1", ["SELECT E'\\';'", " SELECT 1"]),
+        ('SELECT "a;b"', ['SELECT "a;b"']),
+        ("SELECT 1 -- comment;\n; SELECT 2", ["SELECT 1 -- comment;\n", " SELECT 2"]),
+        ("SELECT 1 /* a /* ; */ ; */", ["SELECT 1 /* a /* ; */ ; */"]),
+        (
+            "CREATE FUNCTION f() AS $body$ BEGIN; END $body$; SELECT a$b",
+            ["CREATE FUNCTION f() AS $body$ BEGIN; END $body$", " SELECT a$b"],
+        ),
+        ("CREATE FUNCTION f() AS $$ a; b $$", ["CREATE FUNCTION f() AS $$ a; b $$"]),
+        ("SELECT 1; -- comment\n;/* comment */", ["SELECT 1"]),
+        ("SELECT 'unterminated;", ["SELECT 'unterminated;"]),
+        (
+            "CREATE RULE r AS ON INSERT TO t DO ALSO (SELECT 1; SELECT 2); SELECT 3",
+            [
+                "CREATE RULE r AS ON INSERT TO t DO ALSO (SELECT 1; SELECT 2)",
+                " SELECT 3",
+            ],
+        ),
+        (
+            "CREATE FUNCTION f() RETURNS int LANGUAGE sql BEGIN /* c */ ATOMIC "
+            "SELECT CASE WHEN true THEN 1 END; SELECT 2; END; SELECT 3",
+            [
+                "CREATE FUNCTION f() RETURNS int LANGUAGE sql BEGIN /* c */ ATOMIC "
+                "SELECT CASE WHEN true THEN 1 END; SELECT 2; END",
+                " SELECT 3",
+            ],
+        ),
+        (
+            "BEGIN; SELECT atomic; END; SELECT 1)); SELECT 2",
+            ["BEGIN", " SELECT atomic", " END", " SELECT 1))", " SELECT 2"],
+        ),
+        (
+            "SELECT 1; CREATE TABLE (; SELECT (2); SELECT 3",
+            ["SELECT 1", " CREATE TABLE (", " SELECT (2)", " SELECT 3"],
+        ),
+    ],
+)
+def test_split_statements(sql: str, expected: list):
+    assert split_statements(sql) == expected
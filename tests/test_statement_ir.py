@@ -0,0 +1,149 @@
+import pickle
+from unittest import mock
+
+import pytest
+
+from migration_lint.sql.ir import (
+    SegmentArrays,
+    StatementIR,
+    contains_type,
+    statement_ir,
+)
+from migration_lint.sql.model import KeywordLocator, SegmentLocator
+from migration_lint.sql.operations import find_matching_segment
+from migration_lint.sql.parser import ClassifierSession
+from tests.test_classify_statement import CONDITIONAL_MIGRATIONS, STATEMENTS
+
+
+def test_statement_ir():
+    session = ClassifierSession()
+    sql = 'ALTER TABLE "T_Name" ADD COLUMN c_name varchar(10) DEFAULT lower(c_other)'
+    (statement,) = session.parse_statement_ir(sql)
+
+    assert isinstance(statement, StatementIR)
+    assert statement.root_type == "alter_table_statement"
+    assert statement.table == "T_Name"
+    assert statement.columns == ["c_name", "c_other"]
+    assert statement.data_types == ["varchar(10)"]
+    assert statement.keywords == [
+        (sql.index(keyword), keyword)
+        for keyword in ("ALTER", "TABLE", "ADD", "COLUMN", "varchar", "DEFAULT")
+    ]
+    assert statement.text == (
+        "ALTER TABLE T_Name ADD COLUMN c_name varchar(10) DEFAULT lower(c_other)"
+    )
+
+    restored = pickle.loads(pickle.dumps(statement))
+    assert restored.keywords == statement.keywords
+    assert session.summarize_statement(restored) == session.summarize_statement(
+        statement
+    )
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [statement for statement, _ in STATEMENTS]
+    + [sql for sql, _ in CONDITIONAL_MIGRATIONS],
+)
+def test_statement_ir_classification(sql: str):
+    session = ClassifierSession(fast_path=False)
+    statements = list(session.parse(sql).recursive_crawl("statement"))
+    statements_ir = [
+        statement_ir(statement, session.ir_types) for statement in statements
+    ]
+
+    assert [
+        session.classify_statement(statement, context=statements_ir)
+        for statement in statements_ir
+    ] == [
+        session.classify_statement(statement, context=statements)
+        for statement in statements
+    ]
+
+
+def test_segment_arrays():
+    session = ClassifierSession()
+    sql = "ALTER TABLE t_name ALTER COLUMN c_name SET NOT NULL, DROP COLUMN c_other"
+    (statement,) = session.parse_statement_ir(sql)
+    arrays = statement.arrays
+    (alter_table,) = statement.segments
+
+    assert arrays.segments[:2] == [statement, alter_table]
+    assert arrays.ends[:2] == [len(arrays.segments)] * 2
+    assert arrays.keyword_raws() == [
+        keyword.upper() for _, keyword in statement.keywords
+    ]
+    for seg_type in ("keyword", "table_reference", "alter_table_statement"):
+        assert list(arrays.crawl(statement, seg_type)) == list(
+            statement.recursive_crawl(seg_type)
+        )
+
+    assert arrays.find_keyword(alter_table, "NOT") is arrays.find_keyword(
+        statement, "NOT"
+    )
+    assert arrays.find_keyword(alter_table, "COLUMN").pos_marker == sql.index("COLUMN")
+    assert arrays.find_keyword(
+        alter_table, "COLUMN", min_position=sql.index("DROP")
+    ).pos_marker == sql.rindex("COLUMN")
+    assert (
+        arrays.find_keyword(alter_table, "NOT", min_position=sql.index("DROP")) is None
+    )
+    assert arrays.find_keyword(alter_table, "DEFAULT") is None
+
+    locator = SegmentLocator(
+        type="alter_table_statement",
+        children=[
+            KeywordLocator(raw="DROP"),
+            KeywordLocator(raw="NOT"),
+        ],
+    )
+    assert find_matching_segment(statement, locator) is None
+    locator.children[1].ignore_order = True
+    assert find_matching_segment(statement, locator) is alter_table
+
+    restored = pickle.loads(pickle.dumps(statement))
+    assert restored.arrays.raws == arrays.raws
+
+
+def test_descendant_types():
+    session = ClassifierSession()
+    sql = "CREATE TABLE t_name (id serial, c_name text NOT NULL, c_other integer)"
+    (statement,) = session.parse_statement_ir(sql)
+    (create_table,) = statement.segments
+
+    # The kept types of all the descendants (depend on the sqlfluff grammar).
+    (tree,) = session.parse_statement(sql)
+    assert statement.descendant_types == {
+        segment_type
+        for segment in tree.recursive_crawl_all()
+        if segment is not tree
+        for segment_type in segment.class_types & session.ir_types
+    }
+    assert statement.descendant_types >= create_table.types | {
+        "keyword",
+        "table_reference",
+        "data_type",
+    }
+    assert all(
+        not segment.descendant_types
+        for segment in create_table.segments
+        if segment.is_type("keyword")
+    )
+    assert contains_type(statement, "data_type")
+    assert not contains_type(statement, "select_statement")
+
+    # Inverted children of missing types are checked without crawling.
+    locator = SegmentLocator(
+        type="create_table_statement",
+        children=[SegmentLocator(type="select_statement", inverted=True)],
+    )
+    with mock.patch.object(
+        SegmentArrays,
+        "crawl",
+        autospec=True,
+        side_effect=SegmentArrays.crawl,
+    ) as crawl_mock:
+        assert find_matching_segment(statement, locator) is create_table
+        assert [call.args[2] for call in crawl_mock.call_args_list] == [
+            "create_table_statement"
+        ]